@@ -0,0 +1,85 @@
+import time
+from altscore.cms.model.debts import DebtAPIDTO
+from altscore.cms.model.clients import ClientWithSummaryDTO
+from altscore.common.fast_models import fast_reads, parse_read
+
+# Offline benchmark of altscore.cms.fast_reads(): the same synthetic pages parsed with and without
+# validation. No credentials or network needed.
+
+
+def money(amount):
+    return {"amount": f"{amount:.2f}", "currency": "USD", "display": f"$ {amount:,.2f}"}
+
+
+def debt(i, installments=12):
+    amounts = {k: money(10 + i % 7) for k in ("fees", "interest", "principal", "taxes", "total")}
+    return {
+        "debtId": f"debt-{i}", "flowId": f"flow-{i}", "tenant": "tenant", "referenceId": f"ref-{i}",
+        "status": "open", "subStatus": "current",
+        "client": {"clientId": f"client-{i % 100}", "partnerId": "partner", "externalId": f"ext-{i % 100}",
+                   "email": "client@example.com", "legalName": "Client S.A."},
+        "balance": {**amounts, "penalties": money(0)},
+        "closingBalance": money(0),
+        "schedule": [{"dueDate": f"2026-{n % 12 + 1:02d}-15", "number": n + 1, "originalAmounts": amounts}
+                     for n in range(installments)],
+        "terms": {"amortizationType": "french", "disbursementDate": "2026-01-15", "installments": installments,
+                  "fees": [{"amount": money(5), "name": "opening", "calculationType": "fixed", "tax": 0}],
+                  "interest": money(120), "interestCalculateType": "simple",
+                  "interestRate": {"period": 365, "rate": "0.24"}, "interestTax": 0.12,
+                  "principal": money(1000), "repayEvery": 30},
+        "transactions": [{"transactionId": f"tx-{i}-{n}", "breakdown": [amounts], "amount": money(100),
+                          "type": "payment", "date": "2026-02-15", "referenceId": f"pay-{i}-{n}"}
+                         for n in range(3)],
+        "createdAt": "2026-01-15T00:00:00Z", "updatedAt": "2026-02-15T00:00:00Z", "version": 4,
+        "daysPastDue": 0, "maxDaysPastDue": 3
+    }
+
+
+def client_summary(i):
+    return {
+        "client": {"clientId": f"client-{i}", "partnerId": "partner", "borrowerId": f"borrower-{i}",
+                   "externalId": f"ext-{i}", "email": "client@example.com", "legalName": "Client S.A.",
+                   "status": "active"},
+        "summary": {
+            "creditMetrics": {"assigned": money(5000), "available": money(3000), "consumed": money(2000),
+                              "utilizationPercentage": 40.0},
+            "debtInformation": {"numberOfActiveDebts": 2, "totalDebtAmount": money(2000),
+                                "totalBalanceAmount": money(1800), "totalOverdueAmount": money(0),
+                                "overdueBalanceBreakdown": {k: money(0) for k in
+                                                            ("interest", "penalties", "principal", "taxes")}},
+            "riskIndicators": {"maxDaysPastDue": 0, "numberOfOverdueDebts": 0,
+                               "oldestOverdueDate": "2026-01-01", "clientRiskCategory": "low"}
+        }
+    }
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def benchmark(model, page):
+    validated = [parse_read(model, item) for item in page]
+    with fast_reads():
+        constructed = [parse_read(model, item) for item in page]
+    # same attributes and same serialization either way
+    assert [m.dict(by_alias=True) for m in validated] == [m.dict(by_alias=True) for m in constructed]
+
+    def fast():
+        with fast_reads():
+            [parse_read(model, item) for item in page]
+
+    slow = best_of(3, lambda: [parse_read(model, item) for item in page])
+    quick = best_of(3, fast)
+    print(f"{model.__name__:>22} x {len(page):>6}: parse_obj {slow * 1000:8.1f} ms, "
+          f"fast_reads {quick * 1000:8.1f} ms, {slow / quick:4.1f}x")
+
+
+#%%
+for size in (100, 1000, 5000):
+    benchmark(DebtAPIDTO, [debt(i) for i in range(size)])
+    benchmark(ClientWithSummaryDTO, [client_summary(i) for i in range(size)])
@@ -0,0 +1,20 @@
+from altscore import AltScore
+from altscore.cms.model.dpa_simulation import record_simulations, save_recordings, conformance_report
+from decouple import config
+
+# Records server DPA simulations of the partner of the credentials into the fixtures replayed by
+# tests/test_dpa_simulation.py. Simulations do not create flows.
+
+altscore = AltScore(client_id=config("ALTSCORE_CLIENT_ID"), client_secret=config("ALTSCORE_CLIENT_SECRET"),
+                    environment=config("ALTSCORE_ENVIRONMENT"))
+# %%
+simulator = altscore.cms.dpas.local_simulator()
+requests = [
+    {"amount": {"amount": f"{amount:.2f}", "currency": simulator.currency}, "disbursementDate": date}
+    for amount in (100, 1000, 12345.67)
+    for date in ("2026-01-15", "2026-02-27", "2026-12-24")
+]
+recordings = record_simulations(altscore.cms.dpas, requests)
+# %%
+print(conformance_report(simulator, recordings).mismatches)
+save_recordings("tests/fixtures/dpa_simulations/default_product.json", simulator, recordings)
@@ -37,7 +37,9 @@ setup(
     ],
     extras_require={
         "dev": ["pytest>=7.0", "twine>=4.0.2", "pandas", "tabulate"],
-        "data-tools": ["pandas", "tabulate"]
+        "data-tools": ["pandas", "tabulate"],
+        # vectorized debt columns, DPA simulation, business calendars and Parquet/Arrow exports
+        "fast": ["numpy", "pandas", "pyarrow"]
     },
     python_requires=">=3.8",
 )
@@ -1,4 +1,3 @@
-import asyncio
 import jwt
 import httpx
 from decouple import config
@@ -10,6 +9,7 @@ from altscore.comms import CommsSync, CommsAsync
 from typing import Optional, Union
 import warnings
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
+from altscore.common.partner_context import PartnerResolver
 from loguru import logger
 
 
@@ -28,6 +28,8 @@ class AltScoreBase:
         self.tenant = tenant
         self.form_token = form_token
         self._partner_id = partner_id
+        # partner of the credentials, resolved once when partner_id is not given
+        self.partner_resolver = PartnerResolver()
         self.api_key = api_key
         self.user_token = user_token
         self._refresh_token = None
@@ -94,6 +96,10 @@ class AltScoreBase:
     def __repr__(self):
         return f"AltScore({self.tenant}, {self.environment})"
 
+    def impersonate(self, partner_id: str):
+        """Context manager: CMS and comms calls inside the block act as `partner_id`."""
+        return self.partner_resolver.impersonate(partner_id)
+
     @property
     def _altdata_base_url(self):
         return "https://data.altscore.ai"
@@ -171,13 +177,9 @@ class AltScore(AltScoreBase):
 
     @property
     def partner_id(self) -> Optional[str]:
-        if self._partner_id is None:
-            try:
-                partner_id = self.cms.partners.me().data.partner_id
-                self._partner_id = partner_id
-            except:
-                return None
-        return self._partner_id
+        if self._partner_id is not None and self.partner_resolver.impersonated is None:
+            return self._partner_id
+        return self.partner_resolver.get(lambda: self.cms.partners.me().data.partner_id)
 
 
 class AltScoreAsync(AltScoreBase):
@@ -207,13 +209,23 @@ class AltScoreAsync(AltScoreBase):
 
     @property
     def partner_id(self) -> Optional[str]:
-        if self._partner_id is None:
-            try:
-                partner_id = asyncio.run(self.cms.partners.me())
-                self._partner_id = partner_id.data.partner_id
-            except:
-                return None
-        return self._partner_id
+        """
+        The partner is read synchronously where headers are built, inside the event loop, so it
+        is never resolved here: until resolve_partner_id() has been awaited it is None and the
+        X-PARTNER-ID header is left out, as it was before the partner was cached.
+        """
+        if self._partner_id is not None and self.partner_resolver.impersonated is None:
+            return self._partner_id
+        return self.partner_resolver.peek()[1]
+
+    async def resolve_partner_id(self) -> Optional[str]:
+        if self._partner_id is not None and self.partner_resolver.impersonated is None:
+            return self._partner_id
+
+        async def resolve():
+            return (await self.cms.partners.me()).data.partner_id
+
+        return await self.partner_resolver.aget(resolve)
 
 
 def borrower_sign_up_with_form(
@@ -8,6 +8,7 @@ from altscore.altdata.helpers import build_headers
 from pydantic import BaseModel, validator, Field
 from altscore.altdata.model.common_schemas import SourceConfig
 from altscore.altdata.utils.dataframes import df_to_base64
+from altscore.altdata.utils.validation import validate_input_keys_frame
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
 from dateutil.parser import parse
 import json
@@ -85,7 +86,9 @@ class BatchSyncModule:
         return build_headers(self)
 
     def new_batch_from_dataframe(self, df, label: str,
-                                 sources_config: List[SourceConfig]):
+                                 sources_config: List[SourceConfig], validate_input_keys: bool = False):
+        if validate_input_keys:
+            validate_input_keys_frame(df).raise_if_invalid()
         with httpx.Client(base_url=self.altscore_client._altdata_base_url) as client:
             payload = df_to_batch_payload(df=df, label=label, sources_config=sources_config)
             batch_response = client.post(
@@ -134,7 +137,10 @@ class BatchAsyncModule:
     def build_headers(self):
         return build_headers(self)
 
-    async def new_batch_from_dataframe(self, df, label: str, sources_config: List[SourceConfig]):
+    async def new_batch_from_dataframe(self, df, label: str, sources_config: List[SourceConfig],
+                                       validate_input_keys: bool = False):
+        if validate_input_keys:
+            validate_input_keys_frame(df).raise_if_invalid()
         async with httpx.AsyncClient(base_url=self.altscore_client._altdata_base_url) as client:
             payload = df_to_batch_payload(df=df, label=label, sources_config=sources_config)
             batch_response = await client.post(
@@ -0,0 +1,293 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Payload fields that only tag the request and do not change what the sources return
+_NON_KEY_FIELDS = {"sourcesConfig", "timeout", "executionId", "workflowId", "batchId"}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def cache_key(payload: Dict, source_id: str, version: str) -> str:
+    """Canonical hash of the normalized input keys of a request payload and one source/version."""
+    input_keys = _normalize({k: v for k, v in payload.items() if k not in _NON_KEY_FIELDS})
+    canonical = json.dumps(
+        {"inputKeys": input_keys, "sourceId": source_id, "version": version},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheStorage:
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: str, stored_at: float, value: bytes):
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheStorage:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS altdata_cache (key TEXT PRIMARY KEY, stored_at REAL, value BLOB)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stored_at, value FROM altdata_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else (row[0], bytes(row[1]))
+
+    def set(self, key: str, stored_at: float, value: bytes):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO altdata_cache (key, stored_at, value) VALUES (?, ?, ?)",
+                (key, stored_at, sqlite3.Binary(value))
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM altdata_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM altdata_cache")
+
+    def close(self):
+        self._connection.close()
+
+
+class DirectoryCacheStorage:
+    """One gzip file per entry; the modification time of the file is the store time."""
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        self.path = path
+        self.compresslevel = compresslevel
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json.gz")
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        file_path = self._file(key)
+        try:
+            stored_at = os.path.getmtime(file_path)
+            with gzip.open(file_path, "rb") as f:
+                return stored_at, f.read()
+        except (FileNotFoundError, OSError, EOFError):
+            return None
+
+    def set(self, key: str, stored_at: float, value: bytes):
+        file_path = self._file(key)
+        # write to a temp file and rename so readers never see a partial entry
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=self.compresslevel) as f:
+            f.write(value)
+        os.utime(tmp_path, (stored_at, stored_at))
+        os.replace(tmp_path, file_path)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for file_name in os.listdir(self.path):
+            if file_name.endswith(".json.gz"):
+                os.remove(os.path.join(self.path, file_name))
+
+
+class CacheMetrics:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.by_source: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, source_key: str, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            source_counters = self.by_source.setdefault(source_key, {"hits": 0, "misses": 0, "expired": 0, "stores": 0})
+            source_counters[counter] += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "stores": self.stores,
+                "hitRatio": self.hit_ratio,
+                "bySource": {k: dict(v) for k, v in self.by_source.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.expired = self.stores = 0
+            self.by_source = {}
+
+
+class AltDataResultCache:
+    """
+    Opt-in cache of successful AltData source results, keyed by the canonical hash of the
+    normalized input keys and the source/version. Entries expire after the TTL of their source
+    (`ttl_by_source` accepts "sourceId" or "sourceId_version" keys) or `default_ttl` seconds.
+    Storage defaults to memory; SQLiteCacheStorage and DirectoryCacheStorage persist across runs.
+
+    Enable it with `altscore.altdata.requests.cache = AltDataResultCache(...)`.
+    """
+
+    def __init__(self, storage=None, default_ttl: float = 3600, ttl_by_source: Optional[Dict[str, float]] = None):
+        self.storage = storage if storage is not None else MemoryCacheStorage()
+        self.default_ttl = default_ttl
+        self.ttl_by_source = ttl_by_source or {}
+        self.metrics = CacheMetrics()
+
+    def ttl(self, source_id: str, version: str) -> float:
+        return self.ttl_by_source.get(
+            f"{source_id}_{version}", self.ttl_by_source.get(source_id, self.default_ttl)
+        )
+
+    def get(self, payload: Dict, source_id: str, version: str) -> Optional[Dict]:
+        source_key = f"{source_id}_{version}"
+        key = cache_key(payload, source_id, version)
+        entry = self.storage.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if time.time() - stored_at <= self.ttl(source_id, version):
+                self.metrics._count(source_key, "hits")
+                return json.loads(value)
+            self.metrics._count(source_key, "expired")
+            self.storage.delete(key)
+        self.metrics._count(source_key, "misses")
+        return None
+
+    def set(self, payload: Dict, source_id: str, version: str, entry: Dict):
+        value = json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8")
+        self.storage.set(cache_key(payload, source_id, version), time.time(), value)
+        self.metrics._count(f"{source_id}_{version}", "stores")
+
+    def clear(self):
+        self.storage.clear()
+
+    def lookup(self, payload: Dict) -> "CacheLookup":
+        return CacheLookup(self, payload)
+
+
+class CacheLookup:
+    """Splits a request payload into sources served from the cache and sources to request."""
+
+    def __init__(self, cache: AltDataResultCache, payload: Dict):
+        self.cache = cache
+        self.payload = payload
+        self.sources_config: List[Dict] = payload["sourcesConfig"]
+        self.hits: Dict[Tuple[str, str], Dict] = {}
+        self.missing: List[Dict] = []
+        for source in self.sources_config:
+            entry = cache.get(payload, source["sourceId"], source["version"])
+            if entry is None:
+                self.missing.append(source)
+            else:
+                self.hits[(source["sourceId"], source["version"])] = entry
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.missing
+
+    @property
+    def request_payload(self) -> Dict:
+        """The payload restricted to the sources that were not found in the cache."""
+        return {**self.payload, "sourcesConfig": self.missing}
+
+    def resolve(self, result=None, lazy: bool = False):
+        """
+        Stores the successful sources of `result` and merges them with the cache hits, as a
+        LazyRequestResult when `lazy`.
+        """
+        # imported here to avoid a circular import with data_request
+        from altscore.altdata.model.data_request import LazyRequestResult, RequestResult
+        if result is not None:
+            for source in self.missing:
+                summary = result.get_source_call_summary(source["sourceId"])
+                if summary is None or not summary.is_success:
+                    continue
+                self.cache.set(self.payload, source["sourceId"], source["version"], {
+                    "callSummary": summary.dict(by_alias=True),
+                    "data": result.get_data(source["sourceId"]),
+                    "sourceData": result.get_source_data(source["sourceId"]) if result.data.source_data else None,
+                    "requestId": result.data.request_id,
+                    "requestedAt": result.data.requested_at,
+                    "inputs": result.data.inputs,
+                })
+            if not self.hits:
+                return result
+
+        first_hit = next(iter(self.hits.values()))
+        merged = {
+            "requestId": result.data.request_id if result is not None else first_hit["requestId"],
+            "requestedAt": result.data.requested_at if result is not None else first_hit["requestedAt"],
+            "inputs": result.data.inputs if result is not None else first_hit["inputs"],
+            "data": {},
+            "sourceData": {},
+            "callSummary": [],
+        }
+        for source in self.sources_config:
+            source_id = source["sourceId"]
+            entry = self.hits.get((source_id, source["version"]))
+            if entry is not None:
+                merged["callSummary"].append(entry["callSummary"])
+                merged["data"][source_id] = entry["data"]
+                merged["sourceData"][source_id] = entry["sourceData"]
+            elif result is not None:
+                summary = result.get_source_call_summary(source_id)
+                if summary is not None:
+                    merged["callSummary"].append(summary.dict(by_alias=True))
+                merged["data"][source_id] = result.get_data(source_id)
+                if result.data.source_data:
+                    merged["sourceData"][source_id] = result.get_source_data(source_id)
+        if lazy:
+            return LazyRequestResult.from_raw(json.dumps(merged, ensure_ascii=False, default=str))
+        return RequestResult.from_api(merged)
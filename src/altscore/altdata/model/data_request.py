@@ -1,9 +1,17 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Union
+from typing import List, Optional, Dict, Union, Iterable, Iterator, AsyncIterator
 from altscore.altdata.helpers import build_headers
+from altscore.altdata.model.cache import AltDataResultCache
 from altscore.altdata.model.common_schemas import SourceConfig
+from altscore.common import fast_json
+from altscore.common.concurrency import BulkItemResult, bounded_map, bounded_map_async, pooled_limits
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
+from altscore.common.polling import PollStrategy, DEFAULT_POLL_STRATEGY
+import asyncio
+import functools
+import heapq
 import json
+import time
 import httpx
 
 
@@ -160,11 +168,11 @@ class RequestResult:
         return self.data.source_data.get(source_id, None)
 
     def to_package(self, source_id: str):
-        source_call_summary = self.get_source_call_summary(source_id).dict(by_alias=True)
+        source_call_summary = self.get_source_call_summary(source_id)
         return {
             "sourceId": source_id,
-            "version": source_call_summary["version"],
-            "isSuccess": source_call_summary["isSuccess"],
+            "version": source_call_summary.version,
+            "isSuccess": source_call_summary.is_success,
             "requestId": self.data.request_id,
             "data": self.get_data(source_id),
             "sourceData": self.get_source_data(source_id),
@@ -173,10 +181,128 @@ class RequestResult:
         }
 
 
+class _LazyEnvelope:
+    """Exposes the RequestAPIDTO fields without validating the (potentially huge) per source payloads."""
+
+    def __init__(self, result: "LazyRequestResult"):
+        self._result = result
+
+    @property
+    def request_id(self) -> str:
+        return self._result._parsed["requestId"]
+
+    @property
+    def call_summary(self) -> List[SourceCallSummary]:
+        return self._result.call_summary
+
+    @property
+    def flat_data(self) -> Dict:
+        return self._result._parsed.get("data") or {}
+
+    @property
+    def source_data(self) -> Optional[Dict]:
+        return self._result._parsed.get("sourceData")
+
+    @property
+    def inputs(self) -> Dict:
+        return self._result._parsed.get("inputs")
+
+    @property
+    def requested_at(self) -> str:
+        return self._result._parsed["requestedAt"]
+
+    def dict(self, by_alias: bool = False, **kwargs):
+        return self._result.materialize().dict(by_alias=by_alias, **kwargs)
+
+
+class LazyRequestResult(RequestResult):
+    """
+    RequestResult that keeps the raw response bytes and only parses them on first access,
+    with orjson when installed. Only the call summary goes through pydantic; source payloads
+    are returned as parsed, without building a RequestAPIDTO, unless `materialize` is called.
+    """
+
+    def __init__(self, raw: Union[bytes, str]):
+        self.raw = raw
+        self._parsed_cache: Optional[Dict] = None
+        self._call_summary: Optional[List[SourceCallSummary]] = None
+        self.data = _LazyEnvelope(self)
+
+    @classmethod
+    def from_raw(cls, raw: Union[bytes, str]):
+        return cls(raw)
+
+    @property
+    def _parsed(self) -> Dict:
+        if self._parsed_cache is None:
+            self._parsed_cache = fast_json.loads(self.raw)
+        return self._parsed_cache
+
+    @property
+    def call_summary(self) -> List[SourceCallSummary]:
+        if self._call_summary is None:
+            self._call_summary = [SourceCallSummary.parse_obj(s) for s in self._parsed.get("callSummary") or []]
+        return self._call_summary
+
+    def are_all_source_calls_success(self):
+        return all([s.is_success for s in self.call_summary])
+
+    def get_source_call_summary(self, source_id: str):
+        return next((s for s in self.call_summary if s.source_id == source_id), None)
+
+    def get_data(self, source_id: str):
+        return self.data.flat_data.get(source_id, None)
+
+    def get_source_data(self, source_id: str):
+        return (self.data.source_data or {}).get(source_id, None)
+
+    def materialize(self) -> RequestAPIDTO:
+        """Builds the fully validated RequestAPIDTO, as RequestResult.from_api would."""
+        return RequestAPIDTO.parse_obj(self._parsed)
+
+
+def _request_result(response: httpx.Response, lazy: bool = False) -> RequestResult:
+    if lazy:
+        return LazyRequestResult(response.content)
+    return RequestResult.from_api(response.json())
+
+
+def _sources_config_payload(sources_config: List[Union[Dict, SourceConfig]]) -> List[Dict]:
+    # to validate the sources config model
+    sources_config = [SourceConfig.parse_obj(s) if isinstance(s, dict) else s for s in sources_config]
+    return [s.dict(by_alias=True) for s in sources_config]
+
+
+def _request_payload(input_keys: Union[InputKeys, Dict], sources_config_payload: List[Dict],
+                     timeout: Optional[int] = None, execution_id: Optional[str] = None,
+                     workflow_id: Optional[str] = None, batch_id: Optional[str] = None) -> Dict:
+    if isinstance(input_keys, dict):
+        # to validate the input keys
+        input_keys = InputKeys.parse_obj(input_keys)
+    payload = input_keys.dict(by_alias=True, exclude_none=True)
+
+    if timeout is not None:
+        payload["timeout"] = timeout
+
+    if execution_id is not None:
+        payload["executionId"] = execution_id
+
+    if workflow_id is not None:
+        payload["workflowId"] = workflow_id
+
+    if batch_id is not None:
+        payload["batchId"] = batch_id
+
+    payload["sourcesConfig"] = sources_config_payload
+    return payload
+
+
 class RequestSyncModule:
 
     def __init__(self, altscore_client):
         self.altscore_client = altscore_client
+        # opt-in, see AltDataResultCache
+        self.cache: Optional[AltDataResultCache] = None
 
     def renew_token(self):
         self.altscore_client.renew_token()
@@ -184,63 +310,89 @@ class RequestSyncModule:
     def build_headers(self):
         return build_headers(self)
 
-    @retry_on_401
     def new_sync(self, input_keys: Union[InputKeys, Dict], sources_config: List[Union[Dict, SourceConfig]],
                  timeout: Optional[int] = None, execution_id: Optional[str] = None, workflow_id: Optional[str] = None,
-                 batch_id: Optional[str] = None):
-        if isinstance(input_keys, dict):
-            # to validate the input keys
-            input_keys = InputKeys.parse_obj(input_keys)
-        payload = input_keys.dict(by_alias=True, exclude_none=True)
-        # to validate the sources config model
-        sources_config = [SourceConfig.parse_obj(s) if isinstance(s, dict) else s for s in sources_config]
-
-        if timeout is not None:
-            payload["timeout"] = timeout
-
-        if execution_id is not None:
-            payload["executionId"] = execution_id
-
-        if workflow_id is not None:
-            payload["workflowId"] = workflow_id
+                 batch_id: Optional[str] = None, lazy: bool = False, use_cache: bool = True):
+        payload = _request_payload(
+            input_keys, _sources_config_payload(sources_config), timeout=timeout, execution_id=execution_id,
+            workflow_id=workflow_id, batch_id=batch_id
+        )
+        with httpx.Client(base_url=self.altscore_client._altdata_base_url) as client:
+            return self._send_sync(client, payload, lazy, use_cache)
+
+    def new_sync_many(self, input_keys_list: Iterable[Union[InputKeys, Dict]],
+                      sources_config: List[Union[Dict, SourceConfig]], concurrency: int = 10,
+                      timeout: Optional[int] = None, execution_id: Optional[str] = None,
+                      workflow_id: Optional[str] = None, batch_id: Optional[str] = None,
+                      adaptive: bool = True, lazy: bool = False, use_cache: bool = True) -> List[BulkItemResult]:
+        """
+        Runs one sync request per input keys over a shared connection pool, keeping at most
+        `concurrency` requests in flight (halved while the API signals overload when `adaptive`).
+        Returns one BulkItemResult per input, in input order; failures are reported per item.
+        `use_cache=False` skips the opt-in result cache.
+        """
+        return list(self._new_sync_many(
+            input_keys_list, sources_config, concurrency=concurrency, ordered=True, timeout=timeout,
+            execution_id=execution_id, workflow_id=workflow_id, batch_id=batch_id, adaptive=adaptive,
+            lazy=lazy, use_cache=use_cache
+        ))
+
+    def new_sync_many_as_completed(self, input_keys_list: Iterable[Union[InputKeys, Dict]],
+                                   sources_config: List[Union[Dict, SourceConfig]], concurrency: int = 10,
+                                   timeout: Optional[int] = None, execution_id: Optional[str] = None,
+                                   workflow_id: Optional[str] = None, batch_id: Optional[str] = None,
+                                   adaptive: bool = True, lazy: bool = False,
+                                   use_cache: bool = True) -> Iterator[BulkItemResult]:
+        """Same as new_sync_many but yields each BulkItemResult as soon as its request finishes."""
+        return self._new_sync_many(
+            input_keys_list, sources_config, concurrency=concurrency, ordered=False, timeout=timeout,
+            execution_id=execution_id, workflow_id=workflow_id, batch_id=batch_id, adaptive=adaptive,
+            lazy=lazy, use_cache=use_cache
+        )
 
-        if batch_id is not None:
-            payload["batchId"] = batch_id
+    def _new_sync_many(self, input_keys_list, sources_config, concurrency, ordered, timeout, execution_id,
+                       workflow_id, batch_id, adaptive, lazy, use_cache):
+        sources_config_payload = _sources_config_payload(sources_config)
+        with httpx.Client(base_url=self.altscore_client._altdata_base_url,
+                          limits=pooled_limits(concurrency)) as client:
+            def call(input_keys):
+                payload = _request_payload(
+                    input_keys, sources_config_payload, timeout=timeout, execution_id=execution_id,
+                    workflow_id=workflow_id, batch_id=batch_id
+                )
+                return self._send_sync(client, payload, lazy, use_cache)
+
+            yield from bounded_map(call, input_keys_list, concurrency=concurrency, ordered=ordered,
+                                   adaptive=adaptive)
+
+    def _send_sync(self, client: httpx.Client, payload: Dict, lazy: bool = False, use_cache: bool = True):
+        lookup = self.cache.lookup(payload) if self.cache is not None and use_cache else None
+        if lookup is None:
+            return self._post_sync(client, payload, lazy)
+        if lookup.is_complete:
+            return lookup.resolve(lazy=lazy)
+        return lookup.resolve(self._post_sync(client, lookup.request_payload, lazy), lazy=lazy)
 
-        payload["sourcesConfig"] = [s.dict(by_alias=True) for s in sources_config]
-        with httpx.Client(base_url=self.altscore_client._altdata_base_url) as client:
-            r = client.post(
-                url="/v1/requests/sync",
-                json=payload,
-                headers=self.build_headers(),
-                timeout=500
-                # dont confuse with the timeout in the payload, this is the timeout for the request, not the sources
-            )
-            raise_for_status_improved(r)
-            sync_data_response = r.json()
-            return RequestResult.from_api(sync_data_response)
+    @retry_on_401
+    def _post_sync(self, client: httpx.Client, payload: Dict, lazy: bool = False):
+        r = client.post(
+            url="/v1/requests/sync",
+            json=payload,
+            headers=self.build_headers(),
+            timeout=500
+            # dont confuse with the timeout in the payload, this is the timeout for the request, not the sources
+        )
+        raise_for_status_improved(r)
+        return _request_result(r, lazy)
 
     @retry_on_401
     def new_async(self, input_keys: Union[InputKeys, Dict], sources_config: List[Union[Dict, SourceConfig]],
                   execution_id: Optional[str] = None, workflow_id: Optional[str] = None,
                   batch_id: Optional[str] = None):
-        if isinstance(input_keys, dict):
-            # to validate the input keys
-            input_keys = InputKeys.parse_obj(input_keys)
-        payload = input_keys.dict(by_alias=True, exclude_none=True)
-        # to validate the sources config model
-        sources_config = [SourceConfig.parse_obj(s) if isinstance(s, dict) else s for s in sources_config]
-
-        if execution_id is not None:
-            payload["executionId"] = execution_id
-
-        if workflow_id is not None:
-            payload["workflowId"] = workflow_id
-
-        if batch_id is not None:
-            payload["batchId"] = batch_id
-
-        payload["sourcesConfig"] = [s.dict(by_alias=True) for s in sources_config]
+        payload = _request_payload(
+            input_keys, _sources_config_payload(sources_config), execution_id=execution_id,
+            workflow_id=workflow_id, batch_id=batch_id
+        )
         with httpx.Client(base_url=self.altscore_client._altdata_base_url) as client:
             r = client.post(
                 url="/v1/requests/async",
@@ -270,6 +422,8 @@ class RequestAsyncModule:
 
     def __init__(self, altscore_client):
         self.altscore_client = altscore_client
+        # opt-in, see AltDataResultCache
+        self.cache: Optional[AltDataResultCache] = None
 
     def renew_token(self):
         self.altscore_client.renew_token()
@@ -277,61 +431,92 @@ class RequestAsyncModule:
     def build_headers(self):
         return build_headers(self)
 
-    @retry_on_401_async
     async def new_sync(self, input_keys: Union[InputKeys, Dict], sources_config: List[Union[Dict, SourceConfig]],
                        timeout: Optional[int] = None, execution_id: Optional[str] = None,
-                       workflow_id: Optional[str] = None, batch_id: Optional[str] = None):
-        if isinstance(input_keys, dict):
-            # to validate the input keys
-            input_keys = InputKeys.parse_obj(input_keys)
-        payload = input_keys.dict(by_alias=True, exclude_none=True)
-        # to validate the sources config model
-        sources_config = [SourceConfig.parse_obj(s) if isinstance(s, dict) else s for s in sources_config]
-        if timeout is not None:
-            payload["timeout"] = timeout
-
-        if execution_id is not None:
-            payload["executionId"] = execution_id
-
-        if workflow_id is not None:
-            payload["workflowId"] = workflow_id
-
-        if batch_id is not None:
-            payload["batchId"] = batch_id
-
-        payload["sourcesConfig"] = [s.dict(by_alias=True) for s in sources_config]
+                       workflow_id: Optional[str] = None, batch_id: Optional[str] = None, lazy: bool = False,
+                       use_cache: bool = True):
+        payload = _request_payload(
+            input_keys, _sources_config_payload(sources_config), timeout=timeout, execution_id=execution_id,
+            workflow_id=workflow_id, batch_id=batch_id
+        )
         async with httpx.AsyncClient(base_url=self.altscore_client._altdata_base_url) as client:
-            r = await client.post(
-                url="/v1/requests/sync",
-                json=payload,
-                headers=self.build_headers(),
-                timeout=500
-            )
-            raise_for_status_improved(r)
-            sync_data_response = r.json()
-            return RequestResult.from_api(sync_data_response)
+            return await self._send_sync(client, payload, lazy, use_cache)
+
+    async def new_sync_many(self, input_keys_list: Union[Iterable[Union[InputKeys, Dict]], AsyncIterator],
+                            sources_config: List[Union[Dict, SourceConfig]], concurrency: int = 10,
+                            timeout: Optional[int] = None, execution_id: Optional[str] = None,
+                            workflow_id: Optional[str] = None, batch_id: Optional[str] = None,
+                            adaptive: bool = True, lazy: bool = False,
+                            use_cache: bool = True) -> List[BulkItemResult]:
+        """
+        Runs one sync request per input keys over a shared connection pool, keeping at most
+        `concurrency` requests in flight (halved while the API signals overload when `adaptive`).
+        Returns one BulkItemResult per input, in input order; failures are reported per item.
+        `use_cache=False` skips the opt-in result cache.
+        """
+        return [r async for r in self._new_sync_many(
+            input_keys_list, sources_config, concurrency=concurrency, ordered=True, timeout=timeout,
+            execution_id=execution_id, workflow_id=workflow_id, batch_id=batch_id, adaptive=adaptive,
+            lazy=lazy, use_cache=use_cache
+        )]
+
+    def new_sync_many_as_completed(self, input_keys_list: Union[Iterable[Union[InputKeys, Dict]], AsyncIterator],
+                                   sources_config: List[Union[Dict, SourceConfig]], concurrency: int = 10,
+                                   timeout: Optional[int] = None, execution_id: Optional[str] = None,
+                                   workflow_id: Optional[str] = None, batch_id: Optional[str] = None,
+                                   adaptive: bool = True, lazy: bool = False,
+                                   use_cache: bool = True) -> AsyncIterator[BulkItemResult]:
+        """Same as new_sync_many but yields each BulkItemResult as soon as its request finishes."""
+        return self._new_sync_many(
+            input_keys_list, sources_config, concurrency=concurrency, ordered=False, timeout=timeout,
+            execution_id=execution_id, workflow_id=workflow_id, batch_id=batch_id, adaptive=adaptive,
+            lazy=lazy, use_cache=use_cache
+        )
+
+    async def _new_sync_many(self, input_keys_list, sources_config, concurrency, ordered, timeout, execution_id,
+                             workflow_id, batch_id, adaptive, lazy, use_cache):
+        sources_config_payload = _sources_config_payload(sources_config)
+        async with httpx.AsyncClient(base_url=self.altscore_client._altdata_base_url,
+                                     limits=pooled_limits(concurrency)) as client:
+            async def call(input_keys):
+                payload = _request_payload(
+                    input_keys, sources_config_payload, timeout=timeout, execution_id=execution_id,
+                    workflow_id=workflow_id, batch_id=batch_id
+                )
+                return await self._send_sync(client, payload, lazy, use_cache)
+
+            async for r in bounded_map_async(call, input_keys_list, concurrency=concurrency, ordered=ordered,
+                                             adaptive=adaptive):
+                yield r
+
+    async def _send_sync(self, client: httpx.AsyncClient, payload: Dict, lazy: bool = False, use_cache: bool = True):
+        if self.cache is None or not use_cache:
+            return await self._post_sync(client, payload, lazy)
+        # the cache storage may be SQLite or files, its reads and writes run off the event loop
+        loop = asyncio.get_running_loop()
+        lookup = await loop.run_in_executor(None, self.cache.lookup, payload)
+        result = None if lookup.is_complete else await self._post_sync(client, lookup.request_payload, lazy)
+        return await loop.run_in_executor(None, functools.partial(lookup.resolve, result, lazy=lazy))
+
+    @retry_on_401_async
+    async def _post_sync(self, client: httpx.AsyncClient, payload: Dict, lazy: bool = False):
+        r = await client.post(
+            url="/v1/requests/sync",
+            json=payload,
+            headers=self.build_headers(),
+            timeout=500
+        )
+        raise_for_status_improved(r)
+        return _request_result(r, lazy)
 
     @retry_on_401_async
     async def new_async(self, input_keys: Union[InputKeys, Dict], sources_config: List[Union[Dict, SourceConfig]],
                         execution_id: Optional[str] = None, workflow_id: Optional[str] = None,
                         batch_id: Optional[str] = None):
-        if isinstance(input_keys, dict):
-            # to validate the input keys
-            input_keys = InputKeys.parse_obj(input_keys)
-        payload = input_keys.dict(by_alias=True, exclude_none=True)
-        # to validate the sources config model
-        sources_config = [SourceConfig.parse_obj(s) if isinstance(s, dict) else s for s in sources_config]
-
-        if execution_id is not None:
-            payload["executionId"] = execution_id
-
-        if workflow_id is not None:
-            payload["workflowId"] = workflow_id
-
-        if batch_id is not None:
-            payload["batchId"] = batch_id
-
-        payload["sourcesConfig"] = [s.dict(by_alias=True) for s in sources_config]
+        payload = _request_payload(
+            input_keys, _sources_config_payload(sources_config), execution_id=execution_id,
+            workflow_id=workflow_id, batch_id=batch_id
+        )
         async with httpx.AsyncClient(base_url=self.altscore_client._altdata_base_url) as client:
             r = await client.post(
                 url="/v1/requests/async",
@@ -356,6 +541,12 @@ class RequestAsyncModule:
             request_id=request_id
         )
 
+    def as_completed(self, handles: Iterable["AsyncRequestAsync"], timeout: Optional[float] = 600,
+                     poll_strategy: Optional[PollStrategy] = None,
+                     concurrency: int = 10, lazy: bool = False) -> AsyncIterator[BulkItemResult]:
+        return as_completed(handles, timeout=timeout, poll_strategy=poll_strategy, concurrency=concurrency,
+                            lazy=lazy)
+
 
 class RequestsBase:
 
@@ -385,25 +576,50 @@ class AsyncRequestSync(RequestsBase):
     def id(self):
         return self.request_id
 
-    @retry_on_401
-    def pull(self):
+    def pull(self, lazy: bool = False):
         with httpx.Client(base_url=self.base_url) as client:
-            r = client.get(
-                url=self._get(self.id),
-                headers=self.header_builder()
-            )
-            raise_for_status_improved(r)
-            return RequestResult.from_api(r.json())
+            return self._pull_with(client, lazy)
 
-    @retry_on_401
     def get_status(self):
         with httpx.Client(base_url=self.base_url) as client:
-            r = client.get(
-                url=self._get_status(self.id),
-                headers=self.header_builder()
-            )
-            raise_for_status_improved(r)
-            return RequestStatus.from_api(r.json())
+            return self._get_status_with(client)
+
+    @retry_on_401
+    def _get_status_with(self, client: httpx.Client):
+        r = client.get(
+            url=self._get_status(self.id),
+            headers=self.header_builder()
+        )
+        raise_for_status_improved(r)
+        return RequestStatus.from_api(r.json())
+
+    @retry_on_401
+    def _pull_with(self, client: httpx.Client, lazy: bool = False):
+        r = client.get(
+            url=self._get(self.id),
+            headers=self.header_builder()
+        )
+        raise_for_status_improved(r)
+        return _request_result(r, lazy)
+
+    def wait_for_result(self, timeout: Optional[float] = 600,
+                        poll_strategy: Optional[PollStrategy] = None, lazy: bool = False) -> RequestResult:
+        """
+        Polls the request status with backoff until it is complete and returns the result.
+        Raises TimeoutError if the request is not complete after `timeout` seconds (None waits forever).
+        """
+        poll_strategy = poll_strategy or DEFAULT_POLL_STRATEGY
+        deadline = None if timeout is None else time.monotonic() + timeout
+        attempt = 0
+        with httpx.Client(base_url=self.base_url) as client:
+            while True:
+                if self._get_status_with(client).is_complete():
+                    return self._pull_with(client, lazy)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"request {self.id} not complete after {timeout}s")
+                time.sleep(poll_strategy.next_interval(attempt, remaining))
+                attempt += 1
 
 
 class AsyncRequestAsync(RequestsBase):
@@ -419,22 +635,97 @@ class AsyncRequestAsync(RequestsBase):
     def id(self):
         return self.request_id
 
-    @retry_on_401_async
-    async def pull(self):
+    async def pull(self, lazy: bool = False):
         async with httpx.AsyncClient(base_url=self.base_url) as client:
-            r = await client.get(
-                url=self._get(self.id),
-                headers=self.header_builder()
-            )
-            raise_for_status_improved(r)
-            return RequestResult.from_api(r.json())
+            return await self._pull_with(client, lazy)
 
-    @retry_on_401_async
     async def get_status(self):
         async with httpx.AsyncClient(base_url=self.base_url) as client:
-            r = await client.get(
-                url=self._get_status(self.id),
-                headers=self.header_builder()
-            )
-            raise_for_status_improved(r)
-            return RequestStatus.from_api(r.json())
+            return await self._get_status_with(client)
+
+    @retry_on_401_async
+    async def _get_status_with(self, client: httpx.AsyncClient):
+        r = await client.get(
+            url=self._get_status(self.id),
+            headers=self.header_builder()
+        )
+        raise_for_status_improved(r)
+        return RequestStatus.from_api(r.json())
+
+    @retry_on_401_async
+    async def _pull_with(self, client: httpx.AsyncClient, lazy: bool = False):
+        r = await client.get(
+            url=self._get(self.id),
+            headers=self.header_builder()
+        )
+        raise_for_status_improved(r)
+        return _request_result(r, lazy)
+
+    async def wait_for_result(self, timeout: Optional[float] = 600,
+                              poll_strategy: Optional[PollStrategy] = None, lazy: bool = False) -> RequestResult:
+        """
+        Polls the request status with backoff until it is complete and returns the result.
+        Raises TimeoutError if the request is not complete after `timeout` seconds (None waits forever).
+        """
+        async for r in as_completed([self], timeout=timeout, poll_strategy=poll_strategy, concurrency=1,
+                                       lazy=lazy):
+            return r.unwrap()
+
+
+async def as_completed(handles: Iterable[AsyncRequestAsync], timeout: Optional[float] = 600,
+                       poll_strategy: Optional[PollStrategy] = None,
+                       concurrency: int = 10, lazy: bool = False) -> AsyncIterator[BulkItemResult]:
+    """
+    Polls many async requests from a single loop and yields a BulkItemResult (item is the handle,
+    result the RequestResult) for each one as soon as it is complete. Each request backs off on
+    its own schedule and at most `concurrency` status calls share one connection pool. Requests
+    still pending at `timeout` are yielded with a TimeoutError, as are failed polls with their error.
+    """
+    handles = list(handles)
+    if not handles:
+        return
+    poll_strategy = poll_strategy or DEFAULT_POLL_STRATEGY
+    start = time.monotonic()
+    deadline = None if timeout is None else start + timeout
+    # (next poll at, index, attempt)
+    schedule = [(start, index, 0) for index in range(len(handles))]
+    heapq.heapify(schedule)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=handles[0].base_url, limits=pooled_limits(concurrency)) as client:
+        async def poll(index):
+            handle = handles[index]
+            async with semaphore:
+                status = await handle._get_status_with(client)
+                if not status.is_complete():
+                    return None
+                return await handle._pull_with(client, lazy)
+
+        while schedule:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                for _, index, _ in sorted(schedule, key=lambda x: x[1]):
+                    yield BulkItemResult(index, handles[index], error=TimeoutError(
+                        f"request {handles[index].id} not complete after {timeout}s"
+                    ))
+                return
+            if schedule[0][0] > now:
+                wait = schedule[0][0] - now
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                await asyncio.sleep(wait)
+                continue
+
+            due = []
+            while schedule and schedule[0][0] <= now:
+                due.append(heapq.heappop(schedule))
+            outcomes = await asyncio.gather(*[poll(index) for _, index, _ in due], return_exceptions=True)
+            now = time.monotonic()
+            for (_, index, attempt), outcome in zip(due, outcomes):
+                if isinstance(outcome, BaseException):
+                    yield BulkItemResult(index, handles[index], error=outcome)
+                elif outcome is not None:
+                    yield BulkItemResult(index, handles[index], result=outcome)
+                else:
+                    remaining = None if deadline is None else deadline - now
+                    heapq.heappush(schedule, (now + poll_strategy.next_interval(attempt, remaining), index, attempt + 1))
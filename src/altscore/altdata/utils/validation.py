@@ -0,0 +1,136 @@
+from typing import Dict, List, Optional, Tuple
+
+from altscore.altdata.model.data_request import InputKeys
+
+# alias -> field name for every scalar input key, nested ones (address, location, items) are passed through
+_ALIASES: Dict[str, str] = {f.alias: name for name, f in InputKeys.__fields__.items()}
+_FIELD_NAMES: Dict[str, str] = {name: f.alias for name, f in InputKeys.__fields__.items()}
+_NESTED_KEYS = {"address", "location", "items"}
+
+DATE_KEYS = ("birthDate", "personIdExpeditionDate", "dateToAnalyze")
+EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+
+
+class InputKeysValidationReport:
+    """Row-level outcome of validate_input_keys_frame. `errors` has one row per (row, column, error)."""
+
+    def __init__(self, errors, row_count: int, unknown_columns: List[str]):
+        self.errors = errors
+        self.row_count = row_count
+        self.unknown_columns = unknown_columns
+
+    @property
+    def is_valid(self) -> bool:
+        return len(self.errors) == 0
+
+    @property
+    def invalid_rows(self) -> List:
+        return list(self.errors["row"].drop_duplicates())
+
+    def summary(self) -> Dict[Tuple[Optional[str], str], int]:
+        """Error counts by (column, error); row-level errors (no_input_keys, missing_required_keys) have column None."""
+        if self.is_valid:
+            return {}
+        counts = self.errors.groupby(["column", "error"], dropna=False).size()
+        return {(column if isinstance(column, str) else None, error): int(n) for (column, error), n in counts.items()}
+
+    def raise_if_invalid(self):
+        if not self.is_valid:
+            raise ValueError(
+                f"{len(self.invalid_rows)} of {self.row_count} rows have invalid input keys: {self.summary()}"
+            )
+
+    def __repr__(self):
+        return f"<InputKeysValidationReport rows={self.row_count} invalid_rows={len(self.invalid_rows)}>"
+
+
+def validate_input_keys_frame(df, required_any: Optional[List[List[str]]] = None,
+                              date_format: str = "%Y-%m-%d", check_emails: bool = True) -> InputKeysValidationReport:
+    """
+    Validates a DataFrame of input keys column-wise instead of building one InputKeys per row.
+
+    Columns may use the API aliases (personId) or the field names (person_id). Checks:
+    - string keys hold strings or integers, floats usually mean identifiers lost their leading zeros
+    - date keys (birthDate, personIdExpeditionDate, dateToAnalyze) match `date_format`
+    - emails look like emails when `check_emails`
+    - every row satisfies at least one group of `required_any`, where a group is a list of keys
+      that must all be present (e.g. [["personId"], ["taxId"], ["firstName", "paternalSurname"]]).
+      By default a row only needs one non empty input key.
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = {}
+    unknown_columns = []
+    for column in df.columns:
+        alias = column if column in _ALIASES else _FIELD_NAMES.get(column)
+        if alias is None:
+            unknown_columns.append(column)
+        else:
+            columns[alias] = df[column]
+
+    row_labels = df.index.to_numpy()
+    errors = []
+
+    def add_errors(mask, column, error):
+        positions = np.flatnonzero(np.asarray(mask, dtype=bool))
+        if len(positions):
+            errors.append(pd.DataFrame({"row": row_labels[positions], "column": column, "error": error}))
+
+    present = {}
+    for alias, series in columns.items():
+        missing = series.isna().to_numpy()
+        is_text = pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+        inferred = pd.api.types.infer_dtype(series, skipna=True) if is_text else None
+        # stripped once and shared by the blank, date and email checks
+        stripped = series.str.strip() if inferred == "string" else None
+        if stripped is not None:
+            missing = missing | stripped.eq("").fillna(False).to_numpy(dtype=bool)
+        elif is_text:
+            blank = series.map(lambda v: isinstance(v, str) and not v.strip(), na_action="ignore")
+            missing = missing | blank.fillna(False).to_numpy(dtype=bool)
+        present[alias] = ~missing
+
+        if alias in _NESTED_KEYS:
+            continue
+
+        if series.dtype.kind == "f":
+            non_integral = present[alias] & (np.mod(series.to_numpy(dtype=float, na_value=0), 1) != 0)
+            add_errors(non_integral, alias, "not_a_string")
+            add_errors(present[alias] & ~non_integral, alias, "float_identifier")
+        elif is_text and inferred not in ("string", "integer", "empty"):
+            wrong_type = series.map(lambda v: not isinstance(v, (str, int, np.integer)), na_action="ignore")
+            add_errors(present[alias] & wrong_type.fillna(False).to_numpy(dtype=bool), alias, "not_a_string")
+        elif not is_text and series.dtype.kind not in "iu":
+            add_errors(present[alias], alias, "not_a_string")
+
+        if (alias in DATE_KEYS or alias == "email") and stripped is None:
+            stripped = series.astype("string").str.strip()
+
+        if alias in DATE_KEYS:
+            parsed = pd.to_datetime(stripped, format=date_format, errors="coerce")
+            add_errors(present[alias] & parsed.isna().to_numpy(), alias, "invalid_date")
+
+        if alias == "email" and check_emails:
+            valid = stripped.str.fullmatch(EMAIL_PATTERN).fillna(False)
+            add_errors(present[alias] & ~valid.to_numpy(dtype=bool), alias, "invalid_email")
+
+    all_false = np.zeros(len(df), dtype=bool)
+    if required_any is None:
+        satisfied = np.logical_or.reduce(list(present.values())) if present else all_false
+        add_errors(~satisfied, None, "no_input_keys")
+    else:
+        satisfied = all_false.copy()
+        for group in required_any:
+            group_aliases = [k if k in _ALIASES else _FIELD_NAMES.get(k, k) for k in group]
+            group_present = np.ones(len(df), dtype=bool)
+            for alias in group_aliases:
+                group_present &= present.get(alias, all_false)
+            satisfied |= group_present
+        add_errors(~satisfied, None, "missing_required_keys")
+
+    if errors:
+        errors_df = pd.concat(errors, ignore_index=True)
+    else:
+        errors_df = pd.DataFrame({"row": [], "column": [], "error": []})
+    return InputKeysValidationReport(errors_df, row_count=len(df), unknown_columns=unknown_columns)
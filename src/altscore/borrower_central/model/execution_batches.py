@@ -1,11 +1,16 @@
+import asyncio
 import json
+import time
+from collections import deque
 
+from loguru import logger
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, List, cast
+from typing import Optional, Dict, List, cast, Iterator, AsyncIterator, Union, Set
 
 from altscore.borrower_central.model.generics import GenericSyncResource, GenericAsyncResource, \
     GenericSyncModule, GenericAsyncModule
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
+from altscore.common.polling import PollStrategy
 import httpx
 
 
@@ -22,6 +27,14 @@ EXECUTION_BATCH_STATUS_PAUSED = "paused"
 EXECUTION_BATCH_STATUS_CANCELLED = "cancelled"
 EXECUTION_BATCH_STATUS_FAILED = "failed"
 
+EXECUTION_BATCH_FINISHED_STATUSES = {
+    EXECUTION_BATCH_STATUS_COMPLETE,
+    EXECUTION_BATCH_STATUS_CANCELLED,
+    EXECUTION_BATCH_STATUS_FAILED,
+    EXECUTION_BATCH_STATUS_PRE_PROCESSING_FAILED,
+    EXECUTION_BATCH_STATUS_POST_PROCESSING_FAILED,
+}
+
 EXECUTION_BATCH_PHASE_RESULT_SUCCESS = "success"
 EXECUTION_BATCH_PHASE_RESULT_FATAL_ERROR = "fatal_error"
 EXECUTION_BATCH_PHASE_RESULT_UNHANDLED_ERROR = "unhandled_error"
@@ -234,6 +247,30 @@ class ExecutionBatchAsyncModule(GenericAsyncModule):
 
         return outputs
 
+    async def iter_batch_items_outputs(
+            self, execution_batch_id, parse: bool = True
+    ) -> AsyncIterator[Union[ExecutionBatchItemOutputAPIDTO, Dict]]:
+        """
+        Streams the batch items outputs package and yields one item at a time (raw dicts when not
+        `parse`), so memory does not grow with the size of the batch. Yields nothing if the outputs
+        are not generated yet.
+        """
+        execution_batch = cast(ExecutionBatchAsync, await self.retrieve(execution_batch_id))
+
+        batch_items_outputs_package_id = execution_batch.data.state.batch_items_outputs_package_id
+
+        if batch_items_outputs_package_id is None:
+            return
+
+        package = await self.altscore_client.borrower_central.store_packages.retrieve(batch_items_outputs_package_id)
+        async for item in package.iter_content_json():
+            yield ExecutionBatchItemOutputAPIDTO.parse_obj(item) if parse else item
+
+    def monitor(self, execution_batch_id: str, poll_strategy: Optional[PollStrategy] = None,
+                timeout: Optional[float] = None) -> "ExecutionBatchMonitorAsync":
+        """Monitor that polls the batch with backoff, reports throughput and ETA and yields outputs as items finish."""
+        return ExecutionBatchMonitorAsync(self, execution_batch_id, poll_strategy=poll_strategy, timeout=timeout)
+
 
 class ExecutionBatchSync(GenericSyncResource):
     def __init__(self, base_url, header_builder, renew_token, data: Dict):
@@ -290,4 +327,304 @@ class ExecutionBatchSyncModule(GenericSyncModule):
         outputs = json.loads(package.content)
         outputs = [ExecutionBatchItemOutputAPIDTO.parse_obj(result) for result in outputs]
 
-        return outputs
\ No newline at end of file
+        return outputs
+
+    def iter_batch_items_outputs(
+            self, execution_batch_id, parse: bool = True
+    ) -> Iterator[Union[ExecutionBatchItemOutputAPIDTO, Dict]]:
+        """
+        Streams the batch items outputs package and yields one item at a time (raw dicts when not
+        `parse`), so memory does not grow with the size of the batch. Yields nothing if the outputs
+        are not generated yet.
+        """
+        execution_batch = cast(ExecutionBatchSync, self.retrieve(execution_batch_id))
+
+        batch_items_outputs_package_id = execution_batch.data.state.batch_items_outputs_package_id
+
+        if batch_items_outputs_package_id is None:
+            return
+
+        package = self.altscore_client.borrower_central.store_packages.retrieve(batch_items_outputs_package_id)
+        for item in package.iter_content_json():
+            yield ExecutionBatchItemOutputAPIDTO.parse_obj(item) if parse else item
+
+    def monitor(self, execution_batch_id: str, poll_strategy: Optional[PollStrategy] = None,
+                timeout: Optional[float] = None) -> "ExecutionBatchMonitorSync":
+        """Monitor that polls the batch with backoff, reports throughput and ETA and yields outputs as items finish."""
+        return ExecutionBatchMonitorSync(self, execution_batch_id, poll_strategy=poll_strategy, timeout=timeout)
+
+
+# batches run for minutes to hours, there is no point in polling them as often as a single request
+DEFAULT_BATCH_POLL_STRATEGY = PollStrategy(initial=2, factor=1.5, max_interval=30)
+
+
+class ExecutionBatchProgress:
+    """Snapshot of an execution batch taken by a monitor poll, with throughput and ETA estimates."""
+
+    def __init__(self, batch: ExecutionBatchAPIDTO, elapsed: float, throughput: Optional[float]):
+        self.batch = batch
+        self.status = batch.status
+        summary = batch.state.batch_items_executions_summary or BatchItemsExecutionSummary()
+        self.expected = summary.expected or 0
+        self.pending = summary.pending or 0
+        self.success = summary.success or 0
+        self.failed = summary.failed or 0
+        self.elapsed = elapsed
+        # items per second over the monitor throughput window, None until two polls are available
+        self.throughput = throughput
+
+    @property
+    def done(self) -> int:
+        return self.success + self.failed
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.expected if self.expected else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until every expected item is done at the current throughput."""
+        if self.is_finished:
+            return 0.0
+        if not self.throughput:
+            return None
+        return max(self.expected - self.done, 0) / self.throughput
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in EXECUTION_BATCH_FINISHED_STATUSES
+
+    @property
+    def outputs_ready(self) -> bool:
+        return self.is_finished and not self.batch.state.batch_items_outputs_generating
+
+    def __repr__(self):
+        eta = f"{self.eta:.0f}s" if self.eta is not None else "?"
+        throughput = f"{self.throughput:.1f}/s" if self.throughput is not None else "?"
+        return f"<ExecutionBatchProgress {self.status} {self.done}/{self.expected} {throughput} eta={eta}>"
+
+
+def _item_output(item_index: int, record: Dict, parse: bool):
+    item = {
+        "itemIndex": item_index,
+        "input": record["input"] or {},
+        "output": record["output"] or {},
+        "isSuccess": bool(record["isSuccess"]),
+    }
+    return ExecutionBatchItemOutputAPIDTO.parse_obj(item) if parse else item
+
+
+class ExecutionBatchMonitorBase:
+
+    def __init__(self, module, execution_batch_id: str, poll_strategy: Optional[PollStrategy] = None,
+                 timeout: Optional[float] = None, throughput_window: float = 300):
+        self.module = module
+        self.execution_batch_id = execution_batch_id
+        self.poll_strategy = poll_strategy or DEFAULT_BATCH_POLL_STRATEGY
+        self.timeout = timeout
+        self.throughput_window = throughput_window
+        self.progress: Optional[ExecutionBatchProgress] = None
+        self._started_at = time.monotonic()
+        self._samples = deque()
+        self._listed_done = -1
+        # executions listed by earlier polls, and those of them whose output was not read yet
+        self._listed: Set[str] = set()
+        self._pending: Dict[str, int] = {}
+
+    @property
+    def _executions(self):
+        return self.module.altscore_client.borrower_central.executions
+
+    def _record(self, batch: ExecutionBatchAPIDTO) -> ExecutionBatchProgress:
+        now = time.monotonic()
+        progress = ExecutionBatchProgress(batch, now - self._started_at, None)
+        self._samples.append((now, progress.done))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.throughput_window:
+            self._samples.popleft()
+        first_at, first_done = self._samples[0]
+        if now > first_at:
+            progress.throughput = (progress.done - first_done) / (now - first_at)
+        self.progress = progress
+        return progress
+
+    def _remaining(self) -> Optional[float]:
+        if self.timeout is None:
+            return None
+        remaining = self.timeout - (time.monotonic() - self._started_at)
+        if remaining <= 0:
+            raise TimeoutError(f"execution batch {self.execution_batch_id} not finished after {self.timeout}s")
+        return remaining
+
+    def _should_list(self, progress: ExecutionBatchProgress) -> bool:
+        # listing the executions of the batch is only worth it when items finished since the last listing
+        if progress.done == self._listed_done:
+            return False
+        self._listed_done = progress.done
+        return True
+
+    def _list_params(self, page: int, per_page: int) -> Dict:
+        # newest first, so a poll only pages until it reaches executions listed by an earlier one
+        return {"execution_batch_id": self.execution_batch_id, "sort_by": "createdAt", "sort_direction": "desc",
+                "page": page, "per_page": per_page}
+
+    def _new_executions(self, executions, new: Dict[str, int]) -> Optional[bool]:
+        """
+        Adds the executions of a page not listed by an earlier poll to `new`. None if the page is not
+        of this batch, else whether it had any such execution.
+        """
+        fresh = False
+        for execution in executions:
+            meta = execution.data.execution_batch
+            if meta is None or meta.id != self.execution_batch_id:
+                logger.warning("Executions can not be listed by execution batch, outputs of batch {} will be "
+                               "read from its outputs package when it finishes", self.execution_batch_id)
+                return None
+            if execution.data.id not in self._listed:
+                new[execution.data.id] = meta.item_index
+                fresh = True
+        return fresh
+
+    def _listed_executions(self, new: Dict[str, int]) -> Dict[str, int]:
+        """The executions to read after a listing: the new ones and those still running at earlier polls."""
+        self._listed.update(new)
+        self._pending.update(new)
+        return dict(self._pending)
+
+    def _read(self, execution_id: str, item_index: int, seen: Set[int]):
+        self._pending.pop(execution_id, None)
+        seen.add(item_index)
+
+
+class ExecutionBatchMonitorSync(ExecutionBatchMonitorBase):
+    """
+    Follows an execution batch, polling its state with backoff (see ExecutionBatchSyncModule.monitor).
+    Raises TimeoutError when the batch is not finished after `timeout` seconds (None waits forever).
+    """
+
+    def poll(self) -> ExecutionBatchProgress:
+        execution_batch = cast(ExecutionBatchSync, self.module.retrieve(self.execution_batch_id))
+        if execution_batch is None:
+            raise ValueError(f"Execution batch {self.execution_batch_id} not found")
+        return self._record(execution_batch.data)
+
+    def watch(self, until_outputs_ready: bool = False) -> Iterator[ExecutionBatchProgress]:
+        """Yields a progress snapshot after every poll until the batch is finished."""
+        attempt = 0
+        while True:
+            progress = self.poll()
+            yield progress
+            if progress.outputs_ready if until_outputs_ready else progress.is_finished:
+                return
+            time.sleep(self.poll_strategy.next_interval(attempt, self._remaining()))
+            attempt += 1
+
+    def wait(self) -> ExecutionBatchProgress:
+        for progress in self.watch():
+            pass
+        return progress
+
+    def iter_outputs(self, parse: bool = True, incremental: bool = True, per_page: int = 100,
+                     concurrency: int = 10) -> Iterator[Union[ExecutionBatchItemOutputAPIDTO, Dict]]:
+        """
+        Yields the output of every item of the batch once, as soon as it is available.
+
+        While the batch runs, its executions are listed newest first after every poll in which items
+        finished, stopping at the first page already listed by an earlier poll, and only the input
+        and output of the new finished ones are downloaded. When the batch is
+        done the outputs package is streamed to yield the items that were not seen yet. With
+        `incremental` False, or if executions can not be listed by batch, only the package is read.
+        """
+        seen: Set[int] = set()
+        for progress in self.watch(until_outputs_ready=True):
+            if not incremental or not self._should_list(progress):
+                continue
+            new = self._list_new_executions(per_page)
+            if new is None:
+                incremental = False
+                continue
+            records = self._executions.collect(list(new), parts=["input", "output"], concurrency=concurrency)
+            for record in records:
+                if record["isSuccess"] is None:
+                    # still running, or its output could not be read, picked up by a later poll
+                    continue
+                self._read(record["executionId"], new[record["executionId"]], seen)
+                yield _item_output(new[record["executionId"]], record, parse)
+        for item in self.module.iter_batch_items_outputs(self.execution_batch_id, parse=False):
+            if item["itemIndex"] not in seen:
+                seen.add(item["itemIndex"])
+                yield ExecutionBatchItemOutputAPIDTO.parse_obj(item) if parse else item
+
+    def _list_new_executions(self, per_page: int) -> Optional[Dict[str, int]]:
+        new = {}
+        page = 1
+        while True:
+            executions = self._executions.query(**self._list_params(page, per_page))
+            fresh = self._new_executions(executions, new)
+            if fresh is None:
+                return None
+            if not fresh or len(executions) < per_page:
+                return self._listed_executions(new)
+            page += 1
+
+
+class ExecutionBatchMonitorAsync(ExecutionBatchMonitorBase):
+    """
+    Follows an execution batch, polling its state with backoff (see ExecutionBatchAsyncModule.monitor).
+    Raises TimeoutError when the batch is not finished after `timeout` seconds (None waits forever).
+    """
+
+    async def poll(self) -> ExecutionBatchProgress:
+        execution_batch = cast(ExecutionBatchAsync, await self.module.retrieve(self.execution_batch_id))
+        if execution_batch is None:
+            raise ValueError(f"Execution batch {self.execution_batch_id} not found")
+        return self._record(execution_batch.data)
+
+    async def watch(self, until_outputs_ready: bool = False) -> AsyncIterator[ExecutionBatchProgress]:
+        """Yields a progress snapshot after every poll until the batch is finished."""
+        attempt = 0
+        while True:
+            progress = await self.poll()
+            yield progress
+            if progress.outputs_ready if until_outputs_ready else progress.is_finished:
+                return
+            await asyncio.sleep(self.poll_strategy.next_interval(attempt, self._remaining()))
+            attempt += 1
+
+    async def wait(self) -> ExecutionBatchProgress:
+        async for progress in self.watch():
+            pass
+        return progress
+
+    async def iter_outputs(self, parse: bool = True, incremental: bool = True, per_page: int = 100,
+                           concurrency: int = 10) -> AsyncIterator[Union[ExecutionBatchItemOutputAPIDTO, Dict]]:
+        """Async counterpart of ExecutionBatchMonitorSync.iter_outputs."""
+        seen: Set[int] = set()
+        async for progress in self.watch(until_outputs_ready=True):
+            if not incremental or not self._should_list(progress):
+                continue
+            new = await self._list_new_executions(per_page)
+            if new is None:
+                incremental = False
+                continue
+            async for record in self._executions.collect(list(new), parts=["input", "output"],
+                                                         concurrency=concurrency):
+                if record["isSuccess"] is None:
+                    continue
+                self._read(record["executionId"], new[record["executionId"]], seen)
+                yield _item_output(new[record["executionId"]], record, parse)
+        async for item in self.module.iter_batch_items_outputs(self.execution_batch_id, parse=False):
+            if item["itemIndex"] not in seen:
+                seen.add(item["itemIndex"])
+                yield ExecutionBatchItemOutputAPIDTO.parse_obj(item) if parse else item
+
+    async def _list_new_executions(self, per_page: int) -> Optional[Dict[str, int]]:
+        new = {}
+        page = 1
+        while True:
+            executions = await self._executions.query(**self._list_params(page, per_page))
+            fresh = self._new_executions(executions, new)
+            if fresh is None:
+                return None
+            if not fresh or len(executions) < per_page:
+                return self._listed_executions(new)
+            page += 1
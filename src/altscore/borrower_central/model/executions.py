@@ -1,9 +1,12 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Iterator, AsyncIterator, Sequence, Tuple, Callable, \
+    Awaitable
 from altscore.borrower_central.model.generics import GenericSyncResource, GenericAsyncResource, \
     GenericSyncModule, GenericAsyncModule, convert_to_dash_case
 from altscore.borrower_central.model.attachments import AttachmentInput, AttachmentAPIDTO
 from altscore.borrower_central.model.workflows import WorkflowExecutionResponseAPIDTO
+from altscore.common.concurrency import BulkItemResult, bounded_map, bounded_map_async, pooled_limits, \
+    call_with_retries, call_with_retries_async
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
 import httpx
 import datetime as dt
@@ -215,6 +218,92 @@ class ExecutionState(BaseModel):
         return v
 
 
+class ExecutionStateConflictError(Exception):
+    """Raised when the state of an execution changed since it was read by a state session."""
+
+    def __init__(self, execution_id: str):
+        self.execution_id = execution_id
+        super().__init__(f"The state of execution {execution_id} was modified by someone else")
+
+
+# part -> path under /v1/executions/{id}, see ExecutionSyncModule.collect
+EXECUTION_PARTS = {
+    "execution": "",
+    "input": "/input",
+    "output": "/output",
+    "state": "/state",
+    "attachments": "/output/attachments",
+}
+
+
+def _check_execution_parts(parts: Sequence[str]) -> List[str]:
+    parts = list(dict.fromkeys(parts))
+    unknown = [part for part in parts if part not in EXECUTION_PARTS]
+    if unknown or not parts:
+        raise ValueError(f"Invalid parts {unknown}, must be some of {list(EXECUTION_PARTS)}")
+    return parts
+
+
+def _query_params(filters: Dict, page: int, per_page: int) -> Dict:
+    query_params = {convert_to_dash_case(k): v for k, v in filters.items() if v is not None}
+    query_params["page"] = page
+    query_params["per-page"] = per_page
+    return query_params
+
+
+def _collect_items(executions: Iterable[Tuple[str, Optional[Dict]]], parts: List[str]):
+    # one item per (execution, part); the execution itself is already known when it comes from a query
+    for position, (execution_id, execution) in enumerate(executions):
+        for part in parts:
+            yield position, execution_id, part, execution if part == "execution" else None
+
+
+async def _acollect_items(executions: AsyncIterator[Tuple[str, Optional[Dict]]], parts: List[str]):
+    position = 0
+    async for execution_id, execution in executions:
+        for part in parts:
+            yield position, execution_id, part, execution if part == "execution" else None
+        position += 1
+
+
+def _execution_record(results: List[BulkItemResult]) -> Dict:
+    """Compact record of one execution out of the results of its parts."""
+    values = {}
+    errors = {}
+    for r in results:
+        part = r.item[2]
+        if r.is_success:
+            values[part] = r.result
+        else:
+            errors[part] = repr(r.error)
+    record = {"executionId": results[0].item[1]}
+    for part in (r.item[2] for r in results):
+        value = values.get(part)
+        if part == "input":
+            record["input"] = value["input"] if value else None
+        elif part == "output":
+            record["isSuccess"] = value.get("isSuccess") if value else None
+            record["output"] = value.get("output") if value else None
+            record["customOutput"] = value.get("customOutput") if value else None
+        elif part == "state":
+            record["stateStatus"] = value.get("status") if value else None
+            record["state"] = value.get("state") if value else None
+        else:
+            record[part] = value
+    record["errors"] = errors or None
+    return record
+
+
+def _add_part_result(buffer: List[BulkItemResult], result: BulkItemResult, parts_count: int) -> Optional[Dict]:
+    # results come in input order, so the parts of one execution are contiguous
+    buffer.append(result)
+    if len(buffer) < parts_count:
+        return None
+    record = _execution_record(buffer)
+    buffer.clear()
+    return record
+
+
 class ExecutionSync(GenericSyncResource):
     input: ExecutionInputDataAPIDTO
     output: ExecutionOutputDataAPIDTO
@@ -345,6 +434,75 @@ class ExecutionSync(GenericSyncResource):
             raise_for_status_improved(response)
             return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
 
+    def state_session(self, verify: bool = True) -> "ExecutionStateSessionSync":
+        """Buffers state and output changes and writes them on flush, see ExecutionStateSessionSync."""
+        return ExecutionStateSessionSync(self, verify=verify)
+
+    def update_state(self, mutate: Callable[["ExecutionStateSessionSync"], None], max_attempts: int = 3,
+                     verify: bool = True) -> ExecutionState:
+        """
+        Reads the state, applies `mutate(session)` and writes it back, reading and applying it again
+        when someone else changed the state in between (up to `max_attempts` times). Changes are
+        detected with the ETag of the API, or with `verify` (updatedAt) when it has none; see
+        ExecutionStateSessionSync for what that does and does not guarantee.
+        """
+        for attempt in range(1, max_attempts + 1):
+            try:
+                with self.state_session(verify=verify) as session:
+                    mutate(session)
+                return session.state
+            except ExecutionStateConflictError:
+                if attempt >= max_attempts:
+                    raise
+
+    @retry_on_401
+    def _get_state_with(self, client: httpx.Client) -> Tuple[ExecutionState, Optional[str]]:
+        response = client.get(self._state(self.data.id), headers=self._header_builder(), timeout=300)
+        raise_for_status_improved(response)
+        self.state = ExecutionState.parse_obj(response.json())
+        return self.state, response.headers.get("etag")
+
+    def _put_state_with(self, client: httpx.Client, state: ExecutionState,
+                        etag: Optional[str] = None) -> Optional[str]:
+        if etag is None:
+            return self._put_state_retrying(client, state)
+        # not retry_on_401: resending an If-Match after a server error that had applied the write
+        # would report our own write as a conflict
+        try:
+            return self._send_state_with(client, state, etag)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 401:
+                raise
+            self.renew_token()
+            return self._send_state_with(client, state, etag)
+
+    @retry_on_401
+    def _put_state_retrying(self, client: httpx.Client, state: ExecutionState) -> Optional[str]:
+        # an unconditional PUT replaces the whole state, sending it again is harmless
+        return self._send_state_with(client, state)
+
+    def _send_state_with(self, client: httpx.Client, state: ExecutionState,
+                         etag: Optional[str] = None) -> Optional[str]:
+        headers = self._header_builder()
+        if etag is not None:
+            headers["If-Match"] = etag
+        response = client.put(self._state(self.data.id), headers=headers, json=state.to_api_dto(), timeout=300)
+        if response.status_code in (409, 412):
+            raise ExecutionStateConflictError(self.data.id)
+        raise_for_status_improved(response)
+        self.state = state
+        return response.headers.get("etag")
+
+    @retry_on_401
+    def _put_output_with(self, client: httpx.Client, output: CreateExecutionOutput):
+        response = client.put(
+            self._output(self.data.id),
+            headers=self._header_builder(),
+            json=output.dict(by_alias=True, exclude_none=True),
+            timeout=300
+        )
+        raise_for_status_improved(response)
+
 
 class ExecutionAsync(GenericAsyncResource):
     input: ExecutionInputDataAPIDTO
@@ -476,6 +634,242 @@ class ExecutionAsync(GenericAsyncResource):
             raise_for_status_improved(response)
             return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
 
+    def state_session(self, verify: bool = True) -> "ExecutionStateSessionAsync":
+        """Buffers state and output changes and writes them on flush, see ExecutionStateSessionSync."""
+        return ExecutionStateSessionAsync(self, verify=verify)
+
+    async def update_state(self, mutate: Callable[["ExecutionStateSessionAsync"], Optional[Awaitable]],
+                           max_attempts: int = 3, verify: bool = True) -> ExecutionState:
+        """Async counterpart of ExecutionSync.update_state, `mutate` may be a coroutine function."""
+        for attempt in range(1, max_attempts + 1):
+            try:
+                async with self.state_session(verify=verify) as session:
+                    result = mutate(session)
+                    if hasattr(result, "__await__"):
+                        await result
+                return session.state
+            except ExecutionStateConflictError:
+                if attempt >= max_attempts:
+                    raise
+
+    @retry_on_401_async
+    async def _get_state_with(self, client: httpx.AsyncClient) -> Tuple[ExecutionState, Optional[str]]:
+        response = await client.get(self._state(self.data.id), headers=self._header_builder(), timeout=300)
+        raise_for_status_improved(response)
+        self.state = ExecutionState.parse_obj(response.json())
+        return self.state, response.headers.get("etag")
+
+    async def _put_state_with(self, client: httpx.AsyncClient, state: ExecutionState,
+                              etag: Optional[str] = None) -> Optional[str]:
+        if etag is None:
+            return await self._put_state_retrying(client, state)
+        # not retry_on_401_async, see ExecutionSync._put_state_with
+        try:
+            return await self._send_state_with(client, state, etag)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 401:
+                raise
+            self.renew_token()
+            return await self._send_state_with(client, state, etag)
+
+    @retry_on_401_async
+    async def _put_state_retrying(self, client: httpx.AsyncClient, state: ExecutionState) -> Optional[str]:
+        return await self._send_state_with(client, state)
+
+    async def _send_state_with(self, client: httpx.AsyncClient, state: ExecutionState,
+                               etag: Optional[str] = None) -> Optional[str]:
+        headers = self._header_builder()
+        if etag is not None:
+            headers["If-Match"] = etag
+        response = await client.put(self._state(self.data.id), headers=headers, json=state.to_api_dto(),
+                                    timeout=300)
+        if response.status_code in (409, 412):
+            raise ExecutionStateConflictError(self.data.id)
+        raise_for_status_improved(response)
+        self.state = state
+        return response.headers.get("etag")
+
+    @retry_on_401_async
+    async def _put_output_with(self, client: httpx.AsyncClient, output: CreateExecutionOutput):
+        response = await client.put(
+            self._output(self.data.id),
+            headers=self._header_builder(),
+            json=output.dict(by_alias=True, exclude_none=True),
+            timeout=300
+        )
+        raise_for_status_improved(response)
+
+
+class ExecutionStateSessionBase:
+
+    def __init__(self, execution, verify: bool = True):
+        self.execution = execution
+        self.verify = verify
+        # the state as read, and the working copy that mutations are applied to
+        self.base: Optional[ExecutionState] = None
+        self.state: Optional[ExecutionState] = None
+        self.etag: Optional[str] = None
+        self._output: Optional[CreateExecutionOutput] = None
+
+    def _loaded(self, state: ExecutionState, etag: Optional[str]):
+        self.base = state
+        self.state = state.copy(deep=True)
+        self.etag = etag
+
+    def _require_state(self) -> ExecutionState:
+        if self.state is None:
+            raise RuntimeError("The session state is not loaded, call load() or use the session as a context manager")
+        return self.state
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._require_state().state.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self._require_state().state[key] = value
+
+    def update(self, values: Dict):
+        self._require_state().state.update(values)
+
+    def delete(self, key: str):
+        self._require_state().state.pop(key, None)
+
+    def set_status(self, status: str):
+        state = self._require_state()
+        state.status = ExecutionState.status_must_be_valid(status)
+
+    def set_callback_at(self, callback_at: dt.datetime):
+        self._require_state().callback_at = callback_at
+
+    def set_output(self, output: Dict):
+        """Replaces the output of the execution when the session is flushed."""
+        self._output = CreateExecutionOutput.parse_obj(output)
+
+    @property
+    def state_changed(self) -> bool:
+        return self.state is not None and self.state.to_api_dto() != self.base.to_api_dto()
+
+    @property
+    def is_dirty(self) -> bool:
+        return self.state_changed or self._output is not None
+
+    def _verify(self, current: ExecutionState):
+        # updatedAt is the version of the state when the API sends no ETag; the content is compared
+        # when it is missing, or after our own write, whose updatedAt we do not get back
+        if self.base.updated_at is not None and current.updated_at is not None:
+            changed = current.updated_at != self.base.updated_at
+        else:
+            changed = current.to_api_dto() != self.base.to_api_dto()
+        if changed:
+            raise ExecutionStateConflictError(self.execution.data.id)
+
+    def _written(self):
+        self.base = self.state.copy(deep=True)
+        self.base.updated_at = None
+
+
+class ExecutionStateSessionSync(ExecutionStateSessionBase):
+    """
+    Reads the state of an execution once, applies any number of changes to a local copy and writes
+    them on flush with one PUT for the state and one for the output, only for what changed.
+
+    When the API returns an ETag it is sent back as If-Match, and ExecutionStateConflictError is
+    raised instead of overwriting a state changed by someone else since it was read. Without an
+    ETag, `verify` (on by default) reads the state again right before writing and raises when its
+    updatedAt moved since it was loaded; that costs one more request per flush and still leaves a
+    window between that read and the write, which only an ETag closes. With `verify=False` and no
+    ETag the write is last one wins.
+
+    The state and the output are two separate PUTs, state first, so a flush is not atomic: if the
+    output write fails the new state is already stored, and the conflict checks only cover the
+    state. Used as a context manager, it loads on enter and flushes on a clean exit.
+    """
+
+    def __init__(self, execution: "ExecutionSync", verify: bool = True):
+        super().__init__(execution, verify)
+        self._client: Optional[httpx.Client] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client()
+        return self._client
+
+    def load(self) -> ExecutionState:
+        self._loaded(*self.execution._get_state_with(self.client))
+        return self.state
+
+    def flush(self):
+        if self.state_changed:
+            if self.etag is None and self.verify:
+                current, _ = self.execution._get_state_with(self.client)
+                self._verify(current)
+            self.etag = self.execution._put_state_with(self.client, self.state, self.etag)
+            self._written()
+        if self._output is not None:
+            self.execution._put_output_with(self.client, self._output)
+            self._output = None
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self):
+        self.load()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
+
+
+class ExecutionStateSessionAsync(ExecutionStateSessionBase):
+    """Async counterpart of ExecutionStateSessionSync."""
+
+    def __init__(self, execution: "ExecutionAsync", verify: bool = True):
+        super().__init__(execution, verify)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient()
+        return self._client
+
+    async def load(self) -> ExecutionState:
+        self._loaded(*await self.execution._get_state_with(self.client))
+        return self.state
+
+    async def flush(self):
+        if self.state_changed:
+            if self.etag is None and self.verify:
+                current, _ = await self.execution._get_state_with(self.client)
+                self._verify(current)
+            self.etag = await self.execution._put_state_with(self.client, self.state, self.etag)
+            self._written()
+        if self._output is not None:
+            await self.execution._put_output_with(self.client, self._output)
+            self._output = None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        await self.load()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                await self.flush()
+        finally:
+            await self.close()
+
 
 class ExecutionSyncModule(GenericSyncModule):
 
@@ -500,6 +894,83 @@ class ExecutionSyncModule(GenericSyncModule):
             raise_for_status_improved(response)
             return [ExecutionOutputDataAPIDTO.parse_obj(x) for x in response.json()]
 
+    def collect(self, execution_ids: Optional[Iterable[str]] = None,
+                parts: Sequence[str] = ("input", "output", "state"), concurrency: int = 10, max_retries: int = 3,
+                per_page: int = 100, **filters) -> Iterator[Dict]:
+        """
+        Fetches the parts of many executions over a shared connection pool with up to `concurrency`
+        requests in flight and yields one compact record per execution, in input order.
+
+        Executions are given by id or selected with the same filters as query (e.g. workflow_alias,
+        batch_id), which are paged lazily. `parts` are any of "execution", "input", "output", "state"
+        and "attachments". A part that does not exist yet (e.g. the output of a running execution) is
+        None, and parts that fail are reported in the "errors" field instead of aborting the run.
+        """
+        parts = _check_execution_parts(parts)
+        if execution_ids is not None and filters:
+            raise ValueError("Pass either execution_ids or filters, not both")
+        with httpx.Client(base_url=self.altscore_client._borrower_central_base_url,
+                          limits=pooled_limits(concurrency)) as client:
+            if execution_ids is None:
+                executions = ((e["id"], e) for e in self._iter_query_with(client, filters, per_page, max_retries))
+            else:
+                executions = ((execution_id, None) for execution_id in execution_ids)
+
+            def fetch(item):
+                _, execution_id, part, known = item
+                if known is not None:
+                    return known
+                return call_with_retries(self._get_part_with, client, execution_id, part, max_retries=max_retries)
+
+            buffer = []
+            for result in bounded_map(fetch, _collect_items(executions, parts), concurrency=concurrency):
+                record = _add_part_result(buffer, result, len(parts))
+                if record is not None:
+                    yield record
+
+    def collect_frame(self, execution_ids: Optional[Iterable[str]] = None,
+                      parts: Sequence[str] = ("input", "output", "state"), concurrency: int = 10,
+                      max_retries: int = 3, per_page: int = 100, **filters):
+        """Same as collect but returns a pandas DataFrame with one row per execution."""
+        import pandas as pd
+        return pd.DataFrame.from_records(list(self.collect(
+            execution_ids, parts=parts, concurrency=concurrency, max_retries=max_retries, per_page=per_page,
+            **filters
+        )))
+
+    def _iter_query_with(self, client: httpx.Client, filters: Dict, per_page: int, max_retries: int):
+        page = 1
+        while True:
+            executions = call_with_retries(self._query_page_with, client, filters, page, per_page,
+                                           max_retries=max_retries)
+            yield from executions
+            if len(executions) < per_page:
+                return
+            page += 1
+
+    @retry_on_401
+    def _query_page_with(self, client: httpx.Client, filters: Dict, page: int, per_page: int) -> List[Dict]:
+        response = client.get(
+            f"/v1/{self.resource}",
+            headers=self.build_headers(),
+            params=_query_params(filters, page, per_page),
+            timeout=120
+        )
+        raise_for_status_improved(response)
+        return response.json()
+
+    @retry_on_401
+    def _get_part_with(self, client: httpx.Client, execution_id: str, part: str):
+        response = client.get(
+            f"/v1/{self.resource}/{execution_id}{EXECUTION_PARTS[part]}",
+            headers=self.build_headers(),
+            timeout=120
+        )
+        if response.status_code == 404 and part != "execution":
+            return None
+        raise_for_status_improved(response)
+        return response.json()
+
     @retry_on_401
     def overwrite_principal(self, old_principal_id: str, new_principal_id: str, from_date: Optional[str] = None,
                              to_date: Optional[str] = None):
@@ -580,7 +1051,7 @@ class ExecutionAsyncModule(GenericAsyncModule):
             if v is not None:
                 query_params[convert_to_dash_case(k)] = v
 
-        async with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
+        async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
             response = await client.get(
                 f"/v1/{self.resource}/outputs",
                 headers=self.build_headers(),
@@ -590,6 +1061,90 @@ class ExecutionAsyncModule(GenericAsyncModule):
             raise_for_status_improved(response)
             return [ExecutionOutputDataAPIDTO.parse_obj(x) for x in response.json()]
 
+    async def collect(self, execution_ids: Optional[Iterable[str]] = None,
+                      parts: Sequence[str] = ("input", "output", "state"), concurrency: int = 10,
+                      max_retries: int = 3, per_page: int = 100, **filters) -> AsyncIterator[Dict]:
+        """
+        Fetches the parts of many executions over a shared connection pool with up to `concurrency`
+        requests in flight and yields one compact record per execution, in input order.
+
+        Executions are given by id or selected with the same filters as query (e.g. workflow_alias,
+        batch_id), which are paged lazily. `parts` are any of "execution", "input", "output", "state"
+        and "attachments". A part that does not exist yet (e.g. the output of a running execution) is
+        None, and parts that fail are reported in the "errors" field instead of aborting the run.
+        """
+        parts = _check_execution_parts(parts)
+        if execution_ids is not None and filters:
+            raise ValueError("Pass either execution_ids or filters, not both")
+        async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url,
+                                     limits=pooled_limits(concurrency)) as client:
+            async def executions():
+                if execution_ids is None:
+                    async for e in self._iter_query_with(client, filters, per_page, max_retries):
+                        yield e["id"], e
+                else:
+                    for execution_id in execution_ids:
+                        yield execution_id, None
+
+            async def fetch(item):
+                _, execution_id, part, known = item
+                if known is not None:
+                    return known
+                return await call_with_retries_async(self._get_part_with, client, execution_id, part,
+                                                     max_retries=max_retries)
+
+            buffer = []
+            async for result in bounded_map_async(fetch, _acollect_items(executions(), parts),
+                                                  concurrency=concurrency):
+                record = _add_part_result(buffer, result, len(parts))
+                if record is not None:
+                    yield record
+
+    async def collect_frame(self, execution_ids: Optional[Iterable[str]] = None,
+                            parts: Sequence[str] = ("input", "output", "state"), concurrency: int = 10,
+                            max_retries: int = 3, per_page: int = 100, **filters):
+        """Same as collect but returns a pandas DataFrame with one row per execution."""
+        import pandas as pd
+        return pd.DataFrame.from_records([r async for r in self.collect(
+            execution_ids, parts=parts, concurrency=concurrency, max_retries=max_retries, per_page=per_page,
+            **filters
+        )])
+
+    async def _iter_query_with(self, client: httpx.AsyncClient, filters: Dict, per_page: int, max_retries: int):
+        page = 1
+        while True:
+            executions = await call_with_retries_async(self._query_page_with, client, filters, page, per_page,
+                                                       max_retries=max_retries)
+            for execution in executions:
+                yield execution
+            if len(executions) < per_page:
+                return
+            page += 1
+
+    @retry_on_401_async
+    async def _query_page_with(self, client: httpx.AsyncClient, filters: Dict, page: int,
+                               per_page: int) -> List[Dict]:
+        response = await client.get(
+            f"/v1/{self.resource}",
+            headers=self.build_headers(),
+            params=_query_params(filters, page, per_page),
+            timeout=120
+        )
+        raise_for_status_improved(response)
+        return response.json()
+
+    @retry_on_401_async
+    async def _get_part_with(self, client: httpx.AsyncClient, execution_id: str, part: str):
+        response = await client.get(
+            f"/v1/{self.resource}/{execution_id}{EXECUTION_PARTS[part]}",
+            headers=self.build_headers(),
+            timeout=120
+        )
+        if response.status_code == 404 and part != "execution":
+            return None
+        raise_for_status_improved(response)
+        return response.json()
+
     @retry_on_401_async
     async def overwrite_principal(self, old_principal_id: str, new_principal_id: str, from_date: Optional[str] = None,
                                  to_date: Optional[str] = None):
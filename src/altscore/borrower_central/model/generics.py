@@ -5,10 +5,11 @@ import json
 from altscore.borrower_central.helpers import build_headers
 from altscore.borrower_central.model.attachments import AttachmentAPIDTO, AttachmentInput
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
-from typing import Dict
+from typing import Dict, Optional, Iterator, AsyncIterator, Any
 from altscore.borrower_central.utils import convert_to_dash_case
+from altscore.common.streaming import ProgressReader, ProgressCallback, DEFAULT_CHUNK_SIZE, stream_url, \
+    astream_url, download_url, adownload_url, iter_json_array, aiter_json_array, multipart_file_upload
 import mimetypes
-import aiofiles
 import urllib.parse
 from loguru import logger
 import asyncio
@@ -78,7 +79,8 @@ class GenericSyncResource(GenericBase):
             raise_for_status_improved(response)
 
     @retry_on_401
-    def upload_attachment(self, file_path: str, label: str = None, metadata: Dict = None, timeout: int = 300):
+    def upload_attachment(self, file_path: str, label: str = None, metadata: Dict = None, timeout: int = 300,
+                          progress: Optional[ProgressCallback] = None):
         file_name = os.path.basename(file_path)
         content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
         upload_url = urllib.parse.urljoin(self._get_attachments(self.data.id), "attachments/upload")
@@ -92,7 +94,8 @@ class GenericSyncResource(GenericBase):
                 response = client.post(
                     url=upload_url,
                     data=data if isinstance(data,dict) else None,
-                    files={'file': (file_name, file, content_type)},
+                    # the file object is read in chunks while the body is sent
+                    files={'file': (file_name, ProgressReader(file, os.path.getsize(file_path), progress), content_type)},
                     headers=self._header_builder(),
                     timeout=timeout,
                 )
@@ -132,6 +135,40 @@ class GenericSyncResource(GenericBase):
                 raise_for_status_improved(response)
                 self.content = response.json()
 
+    def stream_content(self, chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: int = 300) -> Iterator[bytes]:
+        """Yields the content in chunks without keeping it in memory, resuming with Range requests if cut."""
+        return stream_url(self._get_content(self.data.id), headers=self._header_builder, chunk_size=chunk_size,
+                          timeout=timeout, renew_token=self.renew_token)
+
+    def iter_content_json(self, chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: int = 300) -> Iterator[Any]:
+        """Yields the records of a JSON array content one at a time, parsing it while it downloads."""
+        return iter_json_array(self.stream_content(chunk_size=chunk_size, timeout=timeout))
+
+    def download_content(self, file_path: str, resume: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         progress: Optional[ProgressCallback] = None, timeout: int = 300) -> str:
+        """Streams the content to `file_path`, continuing a partial download of an interrupted call when `resume`."""
+        return download_url(self._get_content(self.data.id), file_path, headers=self._header_builder,
+                            chunk_size=chunk_size, resume=resume, progress=progress, timeout=timeout,
+                            renew_token=self.renew_token)
+
+    def _attachment_url(self, attachment_id: str) -> str:
+        if self.attachments is None:
+            self.get_attachments()
+        attachment = next((a for a in self.attachments or [] if a.id == attachment_id), None)
+        if attachment is None or attachment.url is None:
+            raise ValueError(f"attachment {attachment_id} not found or has no url")
+        return attachment.url
+
+    def stream_attachment(self, attachment_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          timeout: int = 300) -> Iterator[bytes]:
+        return stream_url(self._attachment_url(attachment_id), chunk_size=chunk_size, timeout=timeout)
+
+    def download_attachment(self, attachment_id: str, file_path: str, resume: bool = False,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE, progress: Optional[ProgressCallback] = None,
+                            timeout: int = 300) -> str:
+        return download_url(self._attachment_url(attachment_id), file_path, chunk_size=chunk_size, resume=resume,
+                            progress=progress, timeout=timeout)
+
     @retry_on_401
     def set_is_test(self, is_test: bool):
         with httpx.Client() as client:
@@ -192,7 +229,8 @@ class GenericAsyncResource(GenericBase):
             raise_for_status_improved(response)
 
     @retry_on_401_async
-    async def upload_attachment(self, file_path: str, label: str = None, metadata: Dict = None, timeout: int = 300):
+    async def upload_attachment(self, file_path: str, label: str = None, metadata: Dict = None, timeout: int = 300,
+                                progress: Optional[ProgressCallback] = None):
         file_name = os.path.basename(file_path)
         content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
         upload_url = urllib.parse.urljoin(self._get_attachments(self.data.id), "attachments/upload")
@@ -202,17 +240,16 @@ class GenericAsyncResource(GenericBase):
         if metadata:
             data["metadata"] = metadata
 
-        async with aiofiles.open(file_path, 'rb') as file:
-            file_content = await file.read()
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url=upload_url,
-                    data=data,
-                    files={'file': (file_name, file_content, content_type)},
-                    headers=self._header_builder(),
-                    timeout=timeout,
-                )
-                raise_for_status_improved(response)
+        # httpx reads multipart files synchronously, the body is built here so the file is read with aiofiles
+        body_headers, body = multipart_file_upload(file_path, file_name, content_type, data, progress=progress)
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                url=upload_url,
+                content=body,
+                headers={**self._header_builder(), **body_headers},
+                timeout=timeout,
+            )
+            raise_for_status_improved(response)
 
     @retry_on_401_async
     async def delete_attachment(self, attachment_id, timeout: int = 300):
@@ -248,6 +285,42 @@ class GenericAsyncResource(GenericBase):
                 raise_for_status_improved(response)
                 self.content = response.json()
 
+    def stream_content(self, chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: int = 300) -> AsyncIterator[bytes]:
+        """Yields the content in chunks without keeping it in memory, resuming with Range requests if cut."""
+        return astream_url(self._get_content(self.data.id), headers=self._header_builder, chunk_size=chunk_size,
+                           timeout=timeout, renew_token=self.renew_token)
+
+    def iter_content_json(self, chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: int = 300) -> AsyncIterator[Any]:
+        """Yields the records of a JSON array content one at a time, parsing it while it downloads."""
+        return aiter_json_array(self.stream_content(chunk_size=chunk_size, timeout=timeout))
+
+    async def download_content(self, file_path: str, resume: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                               progress: Optional[ProgressCallback] = None, timeout: int = 300) -> str:
+        """Streams the content to `file_path`, continuing a partial download of an interrupted call when `resume`."""
+        return await adownload_url(self._get_content(self.data.id), file_path, headers=self._header_builder,
+                                   chunk_size=chunk_size, resume=resume, progress=progress, timeout=timeout,
+                                   renew_token=self.renew_token)
+
+    async def _attachment_url(self, attachment_id: str) -> str:
+        if self.attachments is None:
+            await self.get_attachments()
+        attachment = next((a for a in self.attachments or [] if a.id == attachment_id), None)
+        if attachment is None or attachment.url is None:
+            raise ValueError(f"attachment {attachment_id} not found or has no url")
+        return attachment.url
+
+    async def stream_attachment(self, attachment_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                timeout: int = 300) -> AsyncIterator[bytes]:
+        async for chunk in astream_url(await self._attachment_url(attachment_id), chunk_size=chunk_size,
+                                       timeout=timeout):
+            yield chunk
+
+    async def download_attachment(self, attachment_id: str, file_path: str, resume: bool = False,
+                                  chunk_size: int = DEFAULT_CHUNK_SIZE, progress: Optional[ProgressCallback] = None,
+                                  timeout: int = 300) -> str:
+        return await adownload_url(await self._attachment_url(attachment_id), file_path, chunk_size=chunk_size,
+                                   resume=resume, progress=progress, timeout=timeout)
+
     @retry_on_401_async
     async def set_is_test(self, is_test: bool):
         async with httpx.AsyncClient() as client:
@@ -1,5 +1,7 @@
+import io
 import os
-from typing import Optional, List, Dict, Any
+import mimetypes
+from typing import Optional, List, Dict, Any, AsyncIterator, BinaryIO, Union
 import httpx
 from altscore.altdata.model.data_request import RequestResult
 from altscore.borrower_central.model.generics import GenericSyncResource, GenericAsyncResource, \
@@ -7,7 +9,76 @@ from altscore.borrower_central.model.generics import GenericSyncResource, Generi
 from pydantic import BaseModel, Field
 import datetime as dt
 from dateutil.parser import parse as parse_date
+from altscore.common.concurrency import call_with_retries, call_with_retries_async, is_overload_error
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
+from altscore.common.streaming import DEFAULT_CHUNK_SIZE, FileSource, ProgressCallback, aiter_file_chunks, \
+    iter_file_chunks, source_name, source_size
+from httpx import HTTPStatusError
+
+
+# larger attachments go through a signed URL upload instead of the API
+MAX_CLOUD_RUN_ALLOWED_SIZE = 32 * 1024 * 1024
+
+
+def _is_retryable_upload_error(e: BaseException) -> bool:
+    return is_overload_error(e) or (isinstance(e, HTTPStatusError) and e.response.status_code >= 500)
+
+
+def _rewind(source: FileSource):
+    """Returns a callable restoring a file object to its current position so a failed PUT can start over."""
+    if isinstance(source, (str, os.PathLike)):
+        return lambda: None
+    try:
+        position = source.tell()
+    except (AttributeError, OSError):
+        position = None
+
+    def rewind():
+        if position is None:
+            raise RuntimeError("the upload failed and the source cannot be rewound to retry it")
+        source.seek(position)
+
+    return rewind
+
+
+def _put_signed_url(signed_url: "UploadSignedURLAPIDTO", source: FileSource, chunk_size: int,
+                    progress: Optional[ProgressCallback], rewind):
+    """PUTs a path or a binary file object to a signed URL in `chunk_size` chunks."""
+    rewind()
+    total = source_size(source)
+    headers = {"Content-Type": signed_url.content_type}
+    if total is not None:
+        headers["Content-Length"] = str(total)
+    f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        with httpx.Client() as client:
+            response = client.put(
+                url=signed_url.signed_url,
+                headers=headers,
+                content=iter_file_chunks(f, chunk_size, total, progress),
+                timeout=900
+            )
+            raise_for_status_improved(response)
+    finally:
+        if f is not source:
+            f.close()
+
+
+async def _aput_signed_url(signed_url: "UploadSignedURLAPIDTO", source, chunk_size: int,
+                           progress: Optional[ProgressCallback], rewind, total: Optional[int]):
+    """Async counterpart of _put_signed_url, also taking an async iterator of bytes."""
+    rewind()
+    headers = {"Content-Type": signed_url.content_type}
+    if total is not None:
+        headers["Content-Length"] = str(total)
+    async with httpx.AsyncClient() as client:
+        response = await client.put(
+            url=signed_url.signed_url,
+            headers=headers,
+            content=aiter_file_chunks(source, chunk_size, total, progress),
+            timeout=900
+        )
+        raise_for_status_improved(response)
 
 
 def altdata_source_slug(source_id: str, version: str) -> str:
@@ -97,10 +168,23 @@ class PackageSync(GenericSyncResource):
         super().__init__(base_url, "/stores/packages", header_builder, renew_token, PackageAPIDTO.parse_obj(data))
 
 
-    @retry_on_401
-    def upload_attachment_with_signed_url(self, file_path: str,  label: str = None, metadata: Dict = None):
-        file_name = file_path.split("/")[-1]
+    def upload_attachment_with_signed_url(self, file_path: FileSource, label: str = None, metadata: Dict = None,
+                                          chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                          progress: Optional[ProgressCallback] = None, max_retries: int = 3):
+        """
+        Uploads a path or a binary file object through a signed URL, streaming it in `chunk_size`
+        chunks instead of reading it into memory. `progress(bytes_sent, total_bytes)` is called after
+        every chunk. A failed PUT is restarted from the first byte up to `max_retries` times.
+        """
+        signed_url = self._generate_upload_signed_url(source_name(file_path))
+        call_with_retries(
+            _put_signed_url, signed_url, file_path, chunk_size, progress, _rewind(file_path),
+            max_retries=max_retries, is_retryable=_is_retryable_upload_error
+        )
+        self._commit_signed_url_upload(signed_url, label, metadata)
 
+    @retry_on_401
+    def _generate_upload_signed_url(self, file_name: str) -> UploadSignedURLAPIDTO:
         with httpx.Client(base_url=self.base_url) as client:
             headers = self._header_builder()
             response = client.post(
@@ -110,23 +194,10 @@ class PackageSync(GenericSyncResource):
                 timeout=900
             )
             raise_for_status_improved(response)
-            signed_url = UploadSignedURLAPIDTO.parse_obj(response.json())
-
-        with open(file_path, "rb") as f:
-            content = f.read()
-
-            with httpx.Client() as client:
-                response = client.put(
-                    url=signed_url.signed_url,
-                    headers={
-                        "Content-Type": signed_url.content_type
-                    },
-                    content=content,
-                    timeout=900
-                )
-
-                raise_for_status_improved(response)
+            return UploadSignedURLAPIDTO.parse_obj(response.json())
 
+    @retry_on_401
+    def _commit_signed_url_upload(self, signed_url: UploadSignedURLAPIDTO, label: str = None, metadata: Dict = None):
         with httpx.Client(base_url=self.base_url) as client:
             headers = self._header_builder()
             response = client.post(
@@ -139,22 +210,25 @@ class PackageSync(GenericSyncResource):
             )
             raise_for_status_improved(response)
 
-    def upload_package_attachment(self, file_path: str, label: str = None, metadata: Dict = None):
-        max_cloud_run_allowed_size = 32 * 1024 * 1024
+    def upload_package_attachment(self, file_path: FileSource, label: str = None, metadata: Dict = None,
+                                  chunk_size: int = DEFAULT_CHUNK_SIZE, progress: Optional[ProgressCallback] = None):
+        file_size = source_size(file_path)
 
-        file_size = os.path.getsize(file_path)
-
-        if file_size < max_cloud_run_allowed_size:
+        if file_size is not None and file_size < MAX_CLOUD_RUN_ALLOWED_SIZE \
+                and isinstance(file_path, (str, os.PathLike)):
             self.upload_attachment(
                 file_path=file_path,
                 label=label,
-                metadata=metadata
+                metadata=metadata,
+                progress=progress
             )
         else:
             self.upload_attachment_with_signed_url(
                 file_path=file_path,
                 label=label,
-                metadata=metadata
+                metadata=metadata,
+                chunk_size=chunk_size,
+                progress=progress
             )
 
 
@@ -164,10 +238,31 @@ class PackageAsync(GenericAsyncResource):
         super().__init__(base_url, "/stores/packages", header_builder, renew_token, PackageAPIDTO.parse_obj(data))
 
 
-    @retry_on_401_async
-    async def upload_attachment_with_signed_url(self, file_path: str, label: str = None, metadata: Dict = None):
-        file_name = file_path.split("/")[-1]
+    async def upload_attachment_with_signed_url(self, file_path: Union[FileSource, AsyncIterator[bytes]],
+                                                label: str = None, metadata: Dict = None,
+                                                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                                progress: Optional[ProgressCallback] = None, max_retries: int = 3,
+                                                file_name: Optional[str] = None, file_size: Optional[int] = None):
+        """
+        Uploads a path, a binary file object or an async iterator of bytes through a signed URL,
+        streaming it in `chunk_size` chunks instead of reading it into memory. `progress(bytes_sent,
+        total_bytes)` is called after every chunk. A failed PUT is restarted from the first byte up to
+        `max_retries` times, except for async iterators which cannot be replayed.
+        """
+        is_stream = hasattr(file_path, "__aiter__")
+        if is_stream and file_name is None:
+            raise ValueError("file_name is required when uploading an async iterator")
+        signed_url = await self._generate_upload_signed_url(file_name or source_name(file_path))
+        await call_with_retries_async(
+            _aput_signed_url, signed_url, file_path, chunk_size, progress,
+            (lambda: None) if is_stream else _rewind(file_path),
+            file_size if is_stream else source_size(file_path),
+            max_retries=0 if is_stream else max_retries, is_retryable=_is_retryable_upload_error
+        )
+        await self._commit_signed_url_upload(signed_url, label, metadata)
 
+    @retry_on_401_async
+    async def _generate_upload_signed_url(self, file_name: str) -> UploadSignedURLAPIDTO:
         async with httpx.AsyncClient(base_url=self.base_url) as client:
             headers = self._header_builder()
             response = await client.post(
@@ -177,24 +272,11 @@ class PackageAsync(GenericAsyncResource):
                 timeout=900
             )
             raise_for_status_improved(response)
+            return UploadSignedURLAPIDTO.parse_obj(response.json())
 
-            signed_url = UploadSignedURLAPIDTO.parse_obj(response.json())
-
-        with open(file_path, "rb") as f:
-            content = f.read()
-
-        with httpx.Client() as client:
-            response = client.put(
-                url=signed_url.signed_url,
-                headers={
-                    "Content-Type": signed_url.content_type
-                },
-                content=content,
-                timeout=900
-            )
-
-            raise_for_status_improved(response)
-
+    @retry_on_401_async
+    async def _commit_signed_url_upload(self, signed_url: UploadSignedURLAPIDTO, label: str = None,
+                                        metadata: Dict = None):
         async with httpx.AsyncClient(base_url=self.base_url) as client:
             headers = self._header_builder()
             response = await client.post(
@@ -207,22 +289,26 @@ class PackageAsync(GenericAsyncResource):
             )
             raise_for_status_improved(response)
 
-    async def upload_package_attachment(self, file_path: str, label: str = None, metadata: Dict = None):
-        max_cloud_run_allowed_size = 32 * 1024 * 1024
-
-        file_size = os.path.getsize(file_path)
+    async def upload_package_attachment(self, file_path: FileSource, label: str = None, metadata: Dict = None,
+                                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                        progress: Optional[ProgressCallback] = None):
+        file_size = source_size(file_path)
 
-        if file_size < max_cloud_run_allowed_size:
+        if file_size is not None and file_size < MAX_CLOUD_RUN_ALLOWED_SIZE \
+                and isinstance(file_path, (str, os.PathLike)):
             await self.upload_attachment(
                 file_path=file_path,
                 label=label,
-                metadata=metadata
+                metadata=metadata,
+                progress=progress
             )
         else:
             await self.upload_attachment_with_signed_url(
                 file_path=file_path,
                 label=label,
-                metadata=metadata
+                metadata=metadata,
+                chunk_size=chunk_size,
+                progress=progress
             )
 
 
@@ -236,6 +322,70 @@ class PackagesSyncModule(GenericSyncModule):
                          update_data_model=None,
                          resource="stores/packages")
 
+    def upload_attachment_content(self, package_id: str, file_name: str, content: Union[bytes, BinaryIO],
+                                  label: str = None, metadata: Dict = None, content_type: Optional[str] = None):
+        """
+        Uploads in-memory content (bytes or a binary file object such as a BytesIO) as an attachment
+        of the package, without writing it to disk or retrieving the package first. Large content is
+        streamed through a signed URL upload, like PackageSync.upload_attachment_with_signed_url.
+        """
+        content_type = content_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        source = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+        size = source_size(source)
+        if size is not None and size < MAX_CLOUD_RUN_ALLOWED_SIZE:
+            self._upload_attachment_multipart(package_id, file_name, source, content_type, label, metadata)
+        else:
+            signed_url = self._generate_upload_signed_url(file_name)
+            call_with_retries(
+                _put_signed_url, signed_url, source, DEFAULT_CHUNK_SIZE, None, _rewind(source),
+                max_retries=3, is_retryable=_is_retryable_upload_error
+            )
+            self._commit_signed_url_upload(package_id, signed_url, label, metadata)
+
+    @retry_on_401
+    def _upload_attachment_multipart(self, package_id: str, file_name: str, content: BinaryIO, content_type: str,
+                                     label: str = None, metadata: Dict = None):
+        data = {}
+        if label:
+            data["label"] = label
+        if metadata:
+            data["metadata"] = metadata
+        with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
+            response = client.post(
+                f"/v1/{self.resource}/{package_id}/attachments/upload",
+                data=data,
+                files={"file": (file_name, content, content_type)},
+                headers=self.build_headers(),
+                timeout=900
+            )
+            raise_for_status_improved(response)
+
+    @retry_on_401
+    def _generate_upload_signed_url(self, file_name: str) -> UploadSignedURLAPIDTO:
+        with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
+            response = client.post(
+                f"/v1/stores/packages/commands/attachments/generate-upload-signed-url",
+                json=GenerateAttachmentUploadSignedURL(file_name=file_name).dict(),
+                headers=self.build_headers(),
+                timeout=900
+            )
+            raise_for_status_improved(response)
+            return UploadSignedURLAPIDTO.parse_obj(response.json())
+
+    @retry_on_401
+    def _commit_signed_url_upload(self, package_id: str, signed_url: UploadSignedURLAPIDTO, label: str = None,
+                                  metadata: Dict = None):
+        with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
+            response = client.post(
+                f"/v1/stores/packages/commands/attachments/commit-signed-url-upload",
+                json=CommitAttachmentSignedURUpload(
+                    package_id=package_id, attachment_file_name=signed_url.file_name, metadata=metadata, label=label
+                ).dict(),
+                headers=self.build_headers(),
+                timeout=900
+            )
+            raise_for_status_improved(response)
+
     @retry_on_401
     def retrieve_package_by_alias(self, alias: str, data_age: Optional[dt.timedelta] = None) -> Optional[PackageSync]:
         packages = self.query(alias=alias, sort_by="createdAt", sort_order="desc")
@@ -375,6 +525,71 @@ class PackagesAsyncModule(GenericAsyncModule):
                          update_data_model=None,
                          resource="/stores/packages")
 
+    async def upload_attachment_content(self, package_id: str, file_name: str, content: Union[bytes, BinaryIO],
+                                        label: str = None, metadata: Dict = None,
+                                        content_type: Optional[str] = None):
+        """
+        Uploads in-memory content (bytes or a binary file object such as a BytesIO) as an attachment
+        of the package, without writing it to disk or retrieving the package first. Large content is
+        streamed through a signed URL upload, like PackageAsync.upload_attachment_with_signed_url.
+        """
+        content_type = content_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        source = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+        size = source_size(source)
+        if size is not None and size < MAX_CLOUD_RUN_ALLOWED_SIZE:
+            await self._upload_attachment_multipart(package_id, file_name, source, content_type, label, metadata)
+        else:
+            signed_url = await self._generate_upload_signed_url(file_name)
+            await call_with_retries_async(
+                _aput_signed_url, signed_url, source, DEFAULT_CHUNK_SIZE, None, _rewind(source), size,
+                max_retries=3, is_retryable=_is_retryable_upload_error
+            )
+            await self._commit_signed_url_upload(package_id, signed_url, label, metadata)
+
+    @retry_on_401_async
+    async def _upload_attachment_multipart(self, package_id: str, file_name: str, content: BinaryIO,
+                                           content_type: str, label: str = None, metadata: Dict = None):
+        data = {}
+        if label:
+            data["label"] = label
+        if metadata:
+            data["metadata"] = metadata
+        async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
+            response = await client.post(
+                f"/v1/{self.resource}/{package_id}/attachments/upload",
+                data=data,
+                files={"file": (file_name, content, content_type)},
+                headers=self.build_headers(),
+                timeout=900
+            )
+            raise_for_status_improved(response)
+
+    @retry_on_401_async
+    async def _generate_upload_signed_url(self, file_name: str) -> UploadSignedURLAPIDTO:
+        async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
+            response = await client.post(
+                f"/v1/stores/packages/commands/attachments/generate-upload-signed-url",
+                json=GenerateAttachmentUploadSignedURL(file_name=file_name).dict(),
+                headers=self.build_headers(),
+                timeout=900
+            )
+            raise_for_status_improved(response)
+            return UploadSignedURLAPIDTO.parse_obj(response.json())
+
+    @retry_on_401_async
+    async def _commit_signed_url_upload(self, package_id: str, signed_url: UploadSignedURLAPIDTO,
+                                        label: str = None, metadata: Dict = None):
+        async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
+            response = await client.post(
+                f"/v1/stores/packages/commands/attachments/commit-signed-url-upload",
+                json=CommitAttachmentSignedURUpload(
+                    package_id=package_id, attachment_file_name=signed_url.file_name, metadata=metadata, label=label
+                ).dict(),
+                headers=self.build_headers(),
+                timeout=900
+            )
+            raise_for_status_improved(response)
+
     @retry_on_401_async
     async def retrieve_package_by_alias(
             self, alias: str, data_age: Optional[dt.timedelta] = None
@@ -0,0 +1,225 @@
+import asyncio
+import copy
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+class WorkflowRevisionMismatchError(ValueError):
+    """Raised when the published revision of a workflow is not the revision guarded in the cache."""
+
+    def __init__(self, alias: str, version: str, expected_revision_id: str, published_revision_id: Optional[str]):
+        self.alias = alias
+        self.version = version
+        self.expected_revision_id = expected_revision_id
+        self.published_revision_id = published_revision_id
+        super().__init__(
+            f"Workflow {alias}/{version} is guarded to revision {expected_revision_id} "
+            f"but revision {published_revision_id} is published"
+        )
+
+
+class CachedWorkflow:
+
+    def __init__(self, data, fetched_at: float):
+        # WorkflowDataAPIDTO
+        self.data = data
+        self.fetched_at = fetched_at
+
+    @property
+    def workflow_id(self) -> str:
+        return self.data.id
+
+    @property
+    def published_revision_id(self) -> Optional[str]:
+        return self.data.published_revision_id
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def copy(self) -> "CachedWorkflow":
+        """A copy with its own definition, so changes made by the caller do not reach the cache."""
+        return CachedWorkflow(copy.deepcopy(self.data), self.fetched_at)
+
+
+class WorkflowDefinitionCache:
+    """
+    Resolves workflow alias/version to the workflow definition once and keeps it for `ttl` seconds.
+    After the TTL the cached definition is still served while it is refreshed in the background;
+    only entries older than `max_stale` seconds are fetched again before answering. Revisions are
+    immutable and cached for the life of the cache.
+
+    A revision guard can be set per alias/version: executions through the cache then fail with
+    WorkflowRevisionMismatchError instead of running a revision other than the expected one. It
+    does not run that revision, the API only executes the published one; it only refuses to run
+    another.
+
+    Entries and revisions are returned as copies, callers may modify them freely.
+
+    The cache is opt-in and not shared by default: entries are keyed by alias/version only, so one
+    instance must only serve clients of the same tenant and environment. Set it on the workflows
+    modules that should share it, e.g.
+    `altscore.borrower_central.workflows.definitions = WorkflowDefinitionCache()`.
+    """
+
+    def __init__(self, ttl: float = 300, max_stale: float = 3600):
+        if max_stale < ttl:
+            raise ValueError("max_stale must be greater than or equal to ttl")
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._entries: Dict[Tuple[str, str], CachedWorkflow] = {}
+        self._revisions: Dict[Tuple[str, str], object] = {}
+        self._guards: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        # asyncio locks belong to the loop they were created for, one set per event loop
+        self._async_fetch_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = \
+            weakref.WeakKeyDictionary()
+        self._refreshing = set()
+        # keeps background refresh tasks referenced until they finish
+        self._tasks = set()
+
+    def guard_revision(self, alias: str, version: str, revision_id: str):
+        """Executions of alias/version through the cache fail unless `revision_id` is the published revision."""
+        with self._lock:
+            self._guards[(alias, version)] = revision_id
+
+    def unguard_revision(self, alias: str, version: str):
+        with self._lock:
+            self._guards.pop((alias, version), None)
+
+    def guarded_revision_id(self, alias: str, version: str) -> Optional[str]:
+        return self._guards.get((alias, version))
+
+    def check_revision_guard(self, alias: str, version: str, entry: CachedWorkflow):
+        expected = self._guards.get((alias, version))
+        if expected is not None and expected != entry.published_revision_id:
+            raise WorkflowRevisionMismatchError(alias, version, expected, entry.published_revision_id)
+
+    def invalidate(self, alias: str, version: str):
+        with self._lock:
+            self._entries.pop((alias, version), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revisions.clear()
+
+    def _lookup(self, key: Tuple[str, str]) -> Tuple[Optional[CachedWorkflow], bool]:
+        """The cached entry, if it can be served, and whether it should be refreshed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.age() > self.max_stale:
+                return None, False
+            self.hits += 1
+        return entry.copy(), entry.age() > self.ttl
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _store(self, key: Tuple[str, str], data) -> Optional[CachedWorkflow]:
+        if data is None:
+            # unknown workflows are not cached, they may be created at any time, and a deleted one
+            # must not be served from a previous fetch
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        entry = CachedWorkflow(copy.deepcopy(data), time.monotonic())
+        with self._lock:
+            self._entries[key] = entry
+        # the caller keeps the fetched definition, the cache its own copy
+        return CachedWorkflow(data, entry.fetched_at)
+
+    def _start_refresh(self, key: Tuple[str, str]) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def _end_refresh(self, key: Tuple[str, str]):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def get(self, alias: str, version: str, fetch: Callable[[], Optional[object]]) -> Optional[CachedWorkflow]:
+        """Cached definition of alias/version, `fetch` returns the WorkflowDataAPIDTO or None."""
+        key = (alias, version)
+        entry, stale = self._lookup(key)
+        if entry is not None:
+            if stale and self._start_refresh(key):
+                threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+            return entry
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            # another thread may have fetched it while this one waited
+            entry, _ = self._lookup(key)
+            if entry is not None:
+                return entry
+            self._miss()
+            return self._store(key, fetch())
+
+    def _refresh(self, key: Tuple[str, str], fetch: Callable[[], Optional[object]]):
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            logger.warning("Could not refresh workflow {}/{}: {!r}", key[0], key[1], e)
+        finally:
+            self._end_refresh(key)
+
+    async def aget(self, alias: str, version: str,
+                   fetch: Callable[[], Awaitable[Optional[object]]]) -> Optional[CachedWorkflow]:
+        """Async counterpart of get, `fetch` is a coroutine function."""
+        key = (alias, version)
+        entry, stale = self._lookup(key)
+        if entry is not None:
+            if stale and self._start_refresh(key):
+                task = asyncio.ensure_future(self._arefresh(key, fetch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return entry
+        with self._lock:
+            loop_locks = self._async_fetch_locks.setdefault(asyncio.get_running_loop(), {})
+            fetch_lock = loop_locks.setdefault(key, asyncio.Lock())
+        async with fetch_lock:
+            entry, _ = self._lookup(key)
+            if entry is not None:
+                return entry
+            self._miss()
+            return self._store(key, await fetch())
+
+    async def _arefresh(self, key: Tuple[str, str], fetch: Callable[[], Awaitable[Optional[object]]]):
+        try:
+            self._store(key, await fetch())
+        except Exception as e:
+            logger.warning("Could not refresh workflow {}/{}: {!r}", key[0], key[1], e)
+        finally:
+            self._end_refresh(key)
+
+    def get_revision(self, workflow_id: str, revision_id: str, fetch: Callable[[], object]):
+        key = (workflow_id, revision_id)
+        revision = self._revisions.get(key)
+        if revision is None:
+            revision = fetch()
+            with self._lock:
+                self._revisions[key] = copy.deepcopy(revision)
+            return revision
+        return copy.deepcopy(revision)
+
+    async def aget_revision(self, workflow_id: str, revision_id: str, fetch: Callable[[], Awaitable[object]]):
+        key = (workflow_id, revision_id)
+        revision = self._revisions.get(key)
+        if revision is None:
+            revision = await fetch()
+            with self._lock:
+                self._revisions[key] = copy.deepcopy(revision)
+            return revision
+        return copy.deepcopy(revision)
@@ -0,0 +1,363 @@
+import contextlib
+import http.server
+import importlib
+import json
+import os
+import statistics
+import threading
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+# node types that only mark the boundaries of the graph and run nothing
+_BOUNDARY_NODE_TYPES = {"start", "end"}
+_HANDLER_NAMES = ("handler", "lambda_handler", "main")
+
+Handler = Union[Callable[[Any, "SandboxContext"], Any], str]
+
+
+def load_workflow_bundle(source: Union[str, os.PathLike, Dict]) -> Dict:
+    """Reads a workflow bundle in the workflows_v2 export shape from a dict or a JSON file."""
+    if isinstance(source, dict):
+        return source
+    with open(source, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _node_type(node: Dict) -> str:
+    return str(node.get("type") or node.get("nodeType") or "").lower()
+
+
+def _task_key(node: Dict) -> str:
+    task = node.get("task")
+    if isinstance(task, dict):
+        task = task.get("alias") or task.get("id")
+    return task or node.get("taskAlias") or node.get("taskId") or node["id"]
+
+
+def _edges(workflow: Dict) -> List[Tuple[str, str]]:
+    return [
+        (edge.get("source", edge.get("from")), edge.get("target", edge.get("to")))
+        for edge in workflow.get("edges") or []
+    ]
+
+
+def _tasks_by_key(bundle: Dict) -> Dict[str, Dict]:
+    tasks = bundle.get("tasks") or {}
+    if isinstance(tasks, list):
+        return {t.get("alias") or t.get("id"): t for t in tasks}
+    return tasks
+
+
+def _plan(bundle: Dict, allow_task_code: bool = False) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    (node id, task key, task code) of every task node, in topological order of the edges. The
+    code is only read from the bundle when `allow_task_code` is set.
+    """
+    workflow = bundle.get("workflow", bundle)
+    nodes = {node["id"]: node for node in workflow.get("nodes") or []}
+    edges = [(s, t) for s, t in _edges(workflow) if s in nodes and t in nodes]
+    order = list(nodes)
+    if edges:
+        incoming = {node_id: 0 for node_id in nodes}
+        outgoing: Dict[str, List[str]] = {node_id: [] for node_id in nodes}
+        for source, target in edges:
+            incoming[target] += 1
+            outgoing[source].append(target)
+        ready = [node_id for node_id in nodes if incoming[node_id] == 0]
+        order = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for target in outgoing[node_id]:
+                incoming[target] -= 1
+                if incoming[target] == 0:
+                    ready.append(target)
+        if len(order) != len(nodes):
+            raise ValueError("The workflow graph has a cycle, the sandbox only runs acyclic graphs")
+    tasks = _tasks_by_key(bundle)
+    plan = []
+    for node_id in order:
+        node = nodes[node_id]
+        if _node_type(node) in _BOUNDARY_NODE_TYPES:
+            continue
+        task_key = _task_key(node)
+        code = (tasks.get(task_key) or {}).get("code") if allow_task_code else None
+        plan.append((node_id, task_key, code))
+    return plan
+
+
+class SandboxContext:
+    """Passed to every handler: the stubbed AltScore client and the outputs of the steps that already ran."""
+
+    def __init__(self, client, node_id: str, workflow_input: Any, outputs: Dict[str, Any]):
+        self.client = client
+        self.node_id = node_id
+        self.workflow_input = workflow_input
+        self.outputs = outputs
+
+
+class _Recordings:
+    """
+    Recorded responses: each recording is {"method", "path", "status", "json"} and is matched by
+    method and path. Repeated calls cycle through the recordings of the same call; calls that
+    were never recorded get a 501 so a handler can not reach the AltScore API by accident.
+    """
+
+    def __init__(self, recordings: List[Dict]):
+        self._by_call: Dict[Tuple[str, str], List[Dict]] = {}
+        for recording in recordings:
+            key = (recording.get("method", "GET").upper(), recording["path"])
+            self._by_call.setdefault(key, []).append(recording)
+        self._calls: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def reply(self, method: str, path: str) -> Tuple[int, Any]:
+        key = (method, path)
+        replies = self._by_call.get(key)
+        if not replies:
+            return 501, {"message": f"No recorded response for {method} {path}"}
+        with self._lock:
+            reply = replies[self._calls.get(key, 0) % len(replies)]
+            self._calls[key] = self._calls.get(key, 0) + 1
+        return reply.get("status", 200), reply.get("json")
+
+
+class _RecordingsHandler(http.server.BaseHTTPRequestHandler):
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        status, body = self.server.recordings.reply(self.command, urllib.parse.urlsplit(self.path).path)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def _serving(recordings: List[Dict]):
+    """Serves `recordings` on a loopback port for the duration of the block, yields its base url."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _RecordingsHandler)
+    server.daemon_threads = True
+    server.recordings = _Recordings(recordings)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _stubbed_client(base_url: str):
+    """
+    An AltScore client with placeholder credentials whose every API lives at `base_url`. The SDK
+    modules open their own httpx clients on each call from these base urls, so pointing them at
+    the recordings server stubs the client without touching httpx for the rest of the process.
+    """
+    from altscore import AltScore
+
+    class SandboxAltScore(AltScore):
+        _altdata_base_url = _borrower_central_base_url = _cms_base_url = _webhooks_base_url = base_url
+
+    return SandboxAltScore(api_key="sandbox", partner_id="sandbox")
+
+
+# handlers compiled from task code or imported from "module:function", once per worker process
+_RESOLVED_HANDLERS: Dict[Tuple[str, str], Callable] = {}
+
+
+def _resolve_handler(task_key: str, handler: Optional[Handler], code: Optional[str]) -> Callable:
+    if callable(handler):
+        return handler
+    if handler is not None:
+        cache_key = ("import", handler)
+        if cache_key not in _RESOLVED_HANDLERS:
+            module_name, _, function_name = handler.partition(":")
+            _RESOLVED_HANDLERS[cache_key] = getattr(importlib.import_module(module_name), function_name or "handler")
+        return _RESOLVED_HANDLERS[cache_key]
+    if code is not None:
+        cache_key = ("code", code)
+        if cache_key not in _RESOLVED_HANDLERS:
+            namespace: Dict[str, Any] = {}
+            exec(compile(code, f"<task {task_key}>", "exec"), namespace)
+            function = next((namespace[n] for n in _HANDLER_NAMES if callable(namespace.get(n))), None)
+            if function is None:
+                raise ValueError(f"Task {task_key} code does not define any of {_HANDLER_NAMES}")
+            _RESOLVED_HANDLERS[cache_key] = function
+        return _RESOLVED_HANDLERS[cache_key]
+    raise ValueError(f"No handler registered for task {task_key}")
+
+
+def _run_workflow(plan: List[Tuple[str, str, Optional[str]]], handlers: Dict[str, Handler],
+                  recordings: List[Dict], workflow_input: Any):
+    """Runs one input through every step, in a worker process. Returns (output, timings, error)."""
+    timings: Dict[str, float] = {}
+    outputs: Dict[str, Any] = {}
+    data = workflow_input
+    with _serving(recordings) as base_url:
+        client = _stubbed_client(base_url)
+        for node_id, task_key, code in plan:
+            started_at = time.perf_counter()
+            try:
+                handler = _resolve_handler(task_key, handlers.get(node_id, handlers.get(task_key)), code)
+                data = handler(data, SandboxContext(client, node_id, workflow_input, outputs))
+            except Exception:
+                timings[node_id] = time.perf_counter() - started_at
+                return None, timings, f"{node_id}: {traceback.format_exc()}"
+            timings[node_id] = time.perf_counter() - started_at
+            outputs[node_id] = data
+    return data, timings, None
+
+
+class SandboxRunResult:
+
+    def __init__(self, index: int, workflow_input: Any, output: Any, timings: Dict[str, float],
+                 error: Optional[str]):
+        self.index = index
+        self.input = workflow_input
+        self.output = output
+        # seconds spent in each step, by node id
+        self.timings = timings
+        self.error = error
+
+    @property
+    def is_success(self) -> bool:
+        return self.error is None
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.timings.values())
+
+    def __repr__(self):
+        status = "ok" if self.is_success else "error"
+        return f"<SandboxRunResult {self.index} {status} {self.total_time * 1000:.1f}ms>"
+
+
+class SandboxReport:
+    """Results of a sandbox run with per-step timing statistics, in seconds."""
+
+    def __init__(self, results: List[SandboxRunResult], wall_time: float):
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def errors(self) -> List[SandboxRunResult]:
+        return [r for r in self.results if not r.is_success]
+
+    @property
+    def throughput(self) -> float:
+        return len(self.results) / self.wall_time if self.wall_time else 0.0
+
+    def step_stats(self) -> Dict[str, Dict[str, float]]:
+        samples: Dict[str, List[float]] = {}
+        for result in self.results:
+            for node_id, seconds in result.timings.items():
+                samples.setdefault(node_id, []).append(seconds)
+        stats = {}
+        for node_id, values in samples.items():
+            values.sort()
+            stats[node_id] = {
+                "count": len(values),
+                "mean": statistics.fmean(values),
+                "p50": values[int(0.50 * (len(values) - 1))],
+                "p95": values[int(0.95 * (len(values) - 1))],
+                "max": values[-1],
+                "total": sum(values),
+            }
+        return stats
+
+    def to_frame(self):
+        """Step statistics as a pandas DataFrame, slowest steps first."""
+        import pandas as pd
+        frame = pd.DataFrame.from_dict(self.step_stats(), orient="index")
+        return frame.sort_values("total", ascending=False) if len(frame) else frame
+
+    def __repr__(self):
+        return (f"<SandboxReport runs={len(self.results)} errors={len(self.errors)} "
+                f"wall_time={self.wall_time:.2f}s throughput={self.throughput:.1f}/s>")
+
+
+class WorkflowSandbox:
+    """
+    Runs a workflow locally, without calling the AltScore API, to iterate on its task logic and
+    profile it.
+
+    The server side lambdas are not available locally, so every task node needs a handler: a
+    callable `handler(data, context)` or a "module:function" string (picklable, for process
+    pools). Handlers are looked up by node id first and then by task alias. Each handler receives
+    the output of the previous step (the workflow input for the first one) and a SandboxContext
+    whose `client` is an AltScore client that replays `recordings` instead of calling the
+    AltScore API; calls that were never recorded get a 501. Each run serves the recordings on a
+    loopback port and only that client points at it, the rest of the process is untouched.
+
+    The workflows_v2 export does not carry task code. Bundles that add a `code` field to their
+    tasks, defining `handler`, `lambda_handler` or `main`, can run it for the tasks without a
+    handler with `allow_task_code=True`; the code is executed as is, only enable it for bundles
+    you trust.
+
+    Task nodes run in topological order of the edges; branch conditions are not evaluated, every
+    node of the graph runs.
+    """
+
+    def __init__(self, bundle: Union[str, os.PathLike, Dict], handlers: Optional[Dict[str, Handler]] = None,
+                 recordings: Optional[Union[str, os.PathLike, List[Dict]]] = None,
+                 allow_task_code: bool = False):
+        self.bundle = load_workflow_bundle(bundle)
+        self.plan = _plan(self.bundle, allow_task_code)
+        self.handlers = handlers or {}
+        if recordings is not None and not isinstance(recordings, list):
+            with open(recordings, "r", encoding="utf-8") as f:
+                recordings = json.load(f)
+        self.recordings = recordings or []
+
+    @classmethod
+    def from_export(cls, workflows_v2_module, workflow_id: str, handlers: Optional[Dict[str, Handler]] = None,
+                    recordings: Optional[Union[str, os.PathLike, List[Dict]]] = None):
+        """Builds a sandbox from `altscore.borrower_central.workflows_v2.export(workflow_id)`."""
+        return cls(workflows_v2_module.export(workflow_id), handlers=handlers, recordings=recordings)
+
+    @property
+    def steps(self) -> List[str]:
+        return [node_id for node_id, _, _ in self.plan]
+
+    def run(self, workflow_input: Any) -> SandboxRunResult:
+        """Runs one input in this process, which makes it easy to profile with cProfile."""
+        output, timings, error = _run_workflow(self.plan, self.handlers, self.recordings, workflow_input)
+        return SandboxRunResult(0, workflow_input, output, timings, error)
+
+    def run_many(self, inputs: Iterable[Any], processes: Optional[int] = None) -> SandboxReport:
+        """
+        Runs every input through the workflow in a process pool of `processes` workers (all CPUs by
+        default, 0 runs them in this process) and returns the results with per-step timings.
+        Handlers must be picklable to run in a pool: module level functions or "module:function".
+        """
+        inputs = list(inputs)
+        started_at = time.perf_counter()
+        if processes == 0:
+            outcomes = [_run_workflow(self.plan, self.handlers, self.recordings, workflow_input)
+                        for workflow_input in inputs]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [
+                    executor.submit(_run_workflow, self.plan, self.handlers, self.recordings, workflow_input)
+                    for workflow_input in inputs
+                ]
+                outcomes = [future.result() for future in futures]
+        wall_time = time.perf_counter() - started_at
+        results = [
+            SandboxRunResult(index, workflow_input, output, timings, error)
+            for index, (workflow_input, (output, timings, error)) in enumerate(zip(inputs, outcomes))
+        ]
+        return SandboxReport(results, wall_time)
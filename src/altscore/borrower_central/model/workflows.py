@@ -1,9 +1,15 @@
+import importlib.util
+import io
 import httpx
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Iterator, AsyncIterator, Callable, Union
+from altscore.common.checkpoint import Checkpoint
+from altscore.common.concurrency import BulkItemResult, RateLimiter, bounded_map, bounded_map_async, \
+    call_with_retries, call_with_retries_async, is_unsent_error, pooled_limits
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
 from altscore.borrower_central.model.generics import GenericSyncResource, GenericAsyncResource, \
     GenericSyncModule, GenericAsyncModule
+from altscore.borrower_central.model.workflow_cache import WorkflowDefinitionCache
 
 
 class WorkflowSchedule(BaseModel):
@@ -226,6 +232,147 @@ class WorkflowAsync(GenericAsyncResource):
             raise_for_status_improved(response)
 
 
+def _execute_url(workflow_id: Optional[str] = None, workflow_alias: Optional[str] = None,
+                 workflow_version: Optional[str] = None) -> str:
+    if workflow_id is not None:
+        return f"/v1/workflows/{workflow_id}/execute"
+    elif workflow_alias is not None and workflow_version is not None:
+        return f"/v1/workflows/{workflow_alias}/{workflow_version}/execute"
+    raise ValueError("You must provide a workflow id or a workflow alias and version")
+
+
+def _execute_headers(headers: Dict, execution_mode: Optional[str] = None, batch_id: Optional[str] = None,
+                     tags: Optional[List[str]] = None) -> Dict:
+    if execution_mode is not None:
+        headers["X-Execution-Mode"] = execution_mode
+    if batch_id is not None:
+        headers["X-Batch-Id"] = batch_id
+    if tags is not None:
+        headers["x-tags"] = ",".join(tags)
+    return headers
+
+
+_DATAFRAME_FORMATS = ["csv", "xlsx", "json", "parquet"]
+# execute_batch accepts at most this many raw packages
+_MAX_BATCH_RAW_PACKAGES = 5
+# rows serialized at a time by _DataFrameCSVStream
+_CSV_STREAM_ROWS = 10_000
+
+
+class _DataFrameCSVStream(io.RawIOBase):
+    """
+    Binary file object reading the CSV of a dataframe, serialized `rows` rows at a time as it is
+    read, so the whole CSV is never held in memory. It can only be rewound to the start, which is
+    enough to restart a failed upload, and its size is unknown.
+    """
+
+    def __init__(self, dataframe, export_params: Dict, rows: int = _CSV_STREAM_ROWS):
+        self._dataframe = dataframe
+        self._export_params = dict(export_params)
+        self._encoding = self._export_params.pop("encoding", None) or "utf-8"
+        self._header = self._export_params.pop("header", True)
+        self._rows = rows
+        self._start = 0
+        self._position = 0
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._pending and self._start < max(len(self._dataframe), 1):
+            chunk = self._dataframe.iloc[self._start:self._start + self._rows]
+            header = self._header if self._start == 0 else False
+            self._pending = chunk.to_csv(header=header, **self._export_params).encode(self._encoding)
+            self._start += self._rows
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        self._position += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR and offset == 0:
+            return self._position
+        if whence == io.SEEK_SET and offset == 0:
+            self._start, self._position, self._pending = 0, 0, b""
+            return 0
+        raise io.UnsupportedOperation("the CSV stream can only be rewound to the start")
+
+
+def _default_export_params(output_format: str, export_params: Optional[Dict]) -> Dict:
+    if export_params is not None:
+        return export_params
+    if output_format in ["csv", "xlsx"]:
+        return {"index": False}
+    if output_format == "json":
+        return {"orient": "records"}
+    return {}
+
+
+def _dataframe_content(dataframe, output_format: str, export_params: Optional[Dict] = None):
+    """
+    The dataframe as a binary file object for upload_attachment_content. A CSV that may not fit
+    the direct upload is streamed as it is uploaded, other formats are serialized into a BytesIO,
+    which is uploaded without copying it into bytes.
+    """
+    from altscore.borrower_central.model.store_packages import MAX_CLOUD_RUN_ALLOWED_SIZE
+
+    export_params = _default_export_params(output_format, export_params)
+    if output_format == "csv" and dataframe.memory_usage(deep=True).sum() >= MAX_CLOUD_RUN_ALLOWED_SIZE:
+        return _DataFrameCSVStream(dataframe, export_params)
+
+    buffer = io.BytesIO()
+    if output_format == "csv":
+        dataframe.to_csv(buffer, **export_params)
+    elif output_format == "json":
+        dataframe.to_json(buffer, **export_params)
+    elif output_format == "xlsx":
+        try:
+            dataframe.to_excel(buffer, **export_params)
+        except ImportError:
+            raise ImportError("Excel export requires openpyxl. Install with 'pip install openpyxl'")
+    elif output_format == "parquet":
+        try:
+            dataframe.to_parquet(buffer, **export_params)
+        except ImportError:
+            raise ImportError(
+                "Parquet export requires pyarrow or fastparquet. Install with \"pip install 'altscore[fast]'\"")
+    buffer.seek(0)
+    return buffer
+
+
+def _default_dataframe_format() -> str:
+    """Parquet, typed and compressed, when pyarrow is installed; CSV otherwise."""
+    return "parquet" if importlib.util.find_spec("pyarrow") is not None else "csv"
+
+
+def _dataframe_files(dataframe, output_format: Optional[str], export_params: Optional[Dict] = None,
+                     max_rows_per_file: Optional[int] = None):
+    """Yields (file_name, content) for the whole dataframe or for slices of at most `max_rows_per_file` rows."""
+    import uuid
+
+    if output_format is None:
+        output_format = _default_dataframe_format()
+    if output_format not in _DATAFRAME_FORMATS:
+        raise ValueError(f"Invalid output_format. Must be one of: {', '.join(_DATAFRAME_FORMATS)}")
+    if max_rows_per_file is None or len(dataframe) <= max_rows_per_file:
+        yield f"{uuid.uuid4()}.{output_format}", _dataframe_content(dataframe, output_format, export_params)
+        return
+    n_files = -(-len(dataframe) // max_rows_per_file)
+    if n_files > _MAX_BATCH_RAW_PACKAGES:
+        raise ValueError(
+            f"max_rows_per_file={max_rows_per_file} splits the dataframe in {n_files} files, "
+            f"a batch accepts at most {_MAX_BATCH_RAW_PACKAGES}")
+    for start in range(0, len(dataframe), max_rows_per_file):
+        chunk = dataframe.iloc[start:start + max_rows_per_file]
+        yield f"{uuid.uuid4()}.{output_format}", _dataframe_content(chunk, output_format, export_params)
+
+
+def _default_checkpoint_key(index: int, workflow_input: Dict):
+    return index
+
+
 class WorkflowsSyncModule(GenericSyncModule):
 
     def __init__(self, altscore_client):
@@ -235,9 +382,40 @@ class WorkflowsSyncModule(GenericSyncModule):
                          create_data_model=CreateWorkflowDTO,
                          update_data_model=UpdateWorkflowDTO,
                          resource="workflows")
+        # opt-in WorkflowDefinitionCache used by retrieve_by_alias_version, execute and retrieve_revision
+        self.definitions: Optional[WorkflowDefinitionCache] = None
+
+    def retrieve_by_alias_version(self, alias: str, version: str, use_cache: bool = True):
+        if self.definitions is None or not use_cache:
+            return self._retrieve_by_alias_version(alias, version)
+        entry = self.definitions.get(alias, version, lambda: self._fetch_definition(alias, version))
+        if entry is None:
+            return None
+        return self.sync_resource(
+            base_url=self.altscore_client._borrower_central_base_url,
+            header_builder=self.build_headers,
+            renew_token=self.renew_token,
+            data=entry.data
+        )
+
+    def _fetch_definition(self, alias: str, version: str) -> Optional[WorkflowDataAPIDTO]:
+        workflow = self._retrieve_by_alias_version(alias, version)
+        return None if workflow is None else workflow.data
+
+    def _cached_execute_url(self, workflow_id: Optional[str] = None, workflow_alias: Optional[str] = None,
+                            workflow_version: Optional[str] = None) -> str:
+        # executing by id skips the alias resolution; alias and version are still sent if the workflow is unknown
+        if workflow_id is None and self.definitions is not None and workflow_alias is not None \
+                and workflow_version is not None:
+            entry = self.definitions.get(workflow_alias, workflow_version,
+                                         lambda: self._fetch_definition(workflow_alias, workflow_version))
+            if entry is not None:
+                self.definitions.check_revision_guard(workflow_alias, workflow_version, entry)
+                workflow_id = entry.workflow_id
+        return _execute_url(workflow_id, workflow_alias, workflow_version)
 
     @retry_on_401
-    def retrieve_by_alias_version(self, alias: str, version: str):
+    def _retrieve_by_alias_version(self, alias: str, version: str):
         query_params = {
             "alias": alias,
             "version": version
@@ -262,7 +440,6 @@ class WorkflowsSyncModule(GenericSyncModule):
                 return None
             return res[0]
 
-    @retry_on_401
     def execute(self, workflow_input: Dict,
                 workflow_id: Optional[str] = None,
                 workflow_alias: Optional[str] = None,
@@ -272,39 +449,109 @@ class WorkflowsSyncModule(GenericSyncModule):
                 tags: Optional[List[str]] = None,
                 batch: Optional[bool] = False
                 ):
-        headers = self.build_headers()
-        if execution_mode is not None:
-            headers["X-Execution-Mode"] = execution_mode
-        if batch_id is not None:
-            headers["X-Batch-Id"] = batch_id
-
-        if tags is not None:
-            tags = ",".join(tags)
-            headers["x-tags"] = tags
-
-        if workflow_id is not None:
-            with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
-                response = client.post(
-                    f"/v1/workflows/{workflow_id}/execute",
-                    json=workflow_input,
-                    headers=headers,
-                    timeout=900
-                )
-                raise_for_status_improved(response)
-                return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
-
-        elif workflow_alias is not None and workflow_version is not None:
-            with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
-                response = client.post(
-                    f"/v1/workflows/{workflow_alias}/{workflow_version}/execute",
-                    json=workflow_input,
-                    headers=headers,
-                    timeout=900
-                )
-                raise_for_status_improved(response)
-                return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
-        else:
-            raise ValueError("You must provide a workflow id or a workflow alias and version")
+        url = self._cached_execute_url(workflow_id, workflow_alias, workflow_version)
+        with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
+            return self._post_execute_retrying(client, url, workflow_input, execution_mode, batch_id, tags)
+
+    @retry_on_401
+    def _post_execute_retrying(self, *args):
+        return self._post_execute(*args)
+
+    def _post_execute_once(self, *args):
+        # not retry_on_401: its 5xx retries would run the decision again
+        try:
+            return self._post_execute(*args)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 401:
+                raise
+            self.renew_token()
+            return self._post_execute(*args)
+
+    def _post_execute(self, client: httpx.Client, url: str, workflow_input: Dict,
+                      execution_mode: Optional[str] = None, batch_id: Optional[str] = None,
+                      tags: Optional[List[str]] = None) -> WorkflowExecutionResponseAPIDTO:
+        response = client.post(
+            url,
+            json=workflow_input,
+            headers=_execute_headers(self.build_headers(), execution_mode, batch_id, tags),
+            timeout=900
+        )
+        raise_for_status_improved(response)
+        return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
+
+    def execute_many(self, inputs: Iterable[Dict],
+                     workflow_id: Optional[str] = None,
+                     workflow_alias: Optional[str] = None,
+                     workflow_version: Optional[str] = None,
+                     concurrency: int = 10,
+                     rate: Optional[float] = None,
+                     max_retries: int = 3,
+                     checkpoint_path: Optional[str] = None,
+                     checkpoint_key: Optional[Callable[[int, Dict], Any]] = None,
+                     execution_mode: Optional[str] = None,
+                     batch_id: Optional[str] = None,
+                     tags: Optional[List[str]] = None,
+                     ordered: bool = False) -> Iterator[BulkItemResult]:
+        """
+        Execute a workflow once per input, keeping up to `concurrency` executions in flight.
+
+        Inputs are pulled lazily from any iterable and results are yielded as they complete.
+        Executions are not idempotent, so only requests that surely did not run (429 and failures
+        to connect) are retried, with backoff. Timeouts, dropped connections and 5xx are reported
+        on the item, since the execution may have run.
+
+        Args:
+            inputs: Iterable of workflow inputs
+            workflow_id: ID of the workflow to execute
+            workflow_alias: Alias of the workflow (required if workflow_id not provided)
+            workflow_version: Version of the workflow (required if workflow_id not provided)
+            concurrency: Maximum number of executions in flight
+            rate: Maximum number of executions started per second
+            max_retries: Retries per input for requests that did not run (429, failures to connect)
+            checkpoint_path: JSON lines file recording the inputs that already succeeded. Running
+                again with the same inputs and path skips them
+            checkpoint_key: Function of (index, input) identifying an input in the checkpoint,
+                defaults to its position in `inputs`
+            execution_mode: Optional X-Execution-Mode header
+            batch_id: Optional X-Batch-Id header
+            tags: List of tags for the executions
+            ordered: Yield results in input order instead of completion order
+
+        Returns:
+            Iterator of BulkItemResult, with the position in `inputs` as index, the input as item
+            and the WorkflowExecutionResponseAPIDTO as result
+        """
+        url = self._cached_execute_url(workflow_id, workflow_alias, workflow_version)
+        rate_limiter = RateLimiter(rate) if rate else None
+        checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        key_of = checkpoint_key or _default_checkpoint_key
+
+        def pending():
+            for index, workflow_input in enumerate(inputs):
+                if checkpoint is None or not checkpoint.is_done(key_of(index, workflow_input)):
+                    yield index, workflow_input
+
+        try:
+            with httpx.Client(base_url=self.altscore_client._borrower_central_base_url,
+                              limits=pooled_limits(concurrency)) as client:
+                def run(item):
+                    index, workflow_input = item
+                    if rate_limiter is not None:
+                        rate_limiter.acquire()
+                    result = call_with_retries(
+                        self._post_execute_once, client, url, workflow_input, execution_mode, batch_id, tags,
+                        max_retries=max_retries, is_retryable=is_unsent_error
+                    )
+                    if checkpoint is not None:
+                        checkpoint.mark_done(key_of(index, workflow_input), result.execution_id)
+                    return result
+
+                for r in bounded_map(run, pending(), concurrency=concurrency, ordered=ordered):
+                    index, workflow_input = r.item
+                    yield BulkItemResult(index, workflow_input, result=r.result, error=r.error)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
 
     @retry_on_401
     def execute_batch(self,
@@ -396,9 +643,16 @@ class WorkflowsSyncModule(GenericSyncModule):
             )
             raise_for_status_improved(response)
 
-    @retry_on_401
     def retrieve_revision(self, workflow_id: str, revision_id: str) -> WorkflowRevisionDataAPIDTO:
-        """Retrieve a specific workflow revision."""
+        """Retrieve a specific workflow revision, from the definitions cache when it is enabled."""
+        if self.definitions is None:
+            return self._retrieve_revision(workflow_id, revision_id)
+        return self.definitions.get_revision(
+            workflow_id, revision_id, lambda: self._retrieve_revision(workflow_id, revision_id)
+        )
+
+    @retry_on_401
+    def _retrieve_revision(self, workflow_id: str, revision_id: str) -> WorkflowRevisionDataAPIDTO:
         with httpx.Client(base_url=self.altscore_client._borrower_central_base_url) as client:
             response = client.get(
                 f"/v1/workflows/{workflow_id}/revisions/{revision_id}",
@@ -420,16 +674,18 @@ class WorkflowsSyncModule(GenericSyncModule):
                                      max_concurrent_dispatches=1,
                                      max_item_execution_runs=2,
                                      custom_input=None,
-                                     output_format="csv",
+                                     output_format=None,
                                      export_params=None,
                                      tags=None,
                                      debug=False,
-                                     billable=True):
+                                     billable=True,
+                                     max_rows_per_file=None):
         """
         Execute a batch workflow with data from a pandas DataFrame.
 
-        This method handles converting the dataframe to the specified format (CSV, XLSX, JSON, or Parquet),
-        uploading it as a package attachment, and executing the batch workflow with the package.
+        This method handles converting the dataframe to the specified format (CSV, XLSX, JSON, or Parquet)
+        in memory, uploading it as a package attachment, and executing the batch workflow with the package.
+        Nothing is written to disk, and large CSV frames are serialized a slice at a time as they are uploaded.
 
         Args:
             dataframe: Pandas DataFrame containing the data to process
@@ -443,93 +699,48 @@ class WorkflowsSyncModule(GenericSyncModule):
             max_concurrent_dispatches: Maximum number of concurrent dispatches
             max_item_execution_runs: Maximum number of execution runs per item
             custom_input: Custom input for the workflow
-            output_format: Format for the dataframe export ("csv", "xlsx", "json", or "parquet")
+            output_format: Format for the dataframe export ("csv", "xlsx", "json", or "parquet"), by default
+                "parquet" when pyarrow is installed and "csv" otherwise
             export_params: Additional parameters to pass to the pandas export function
             tags: List of tags for the execution
             debug: Whether to run in debug mode
             billable: Whether the execution is billable
+            max_rows_per_file: Split the dataframe in files of at most this many rows, each in its own
+                package (up to 5), so very large frames are never serialized at once
 
         Returns:
             Execution response
         """
-        import os
-        import tempfile
         import uuid
 
-        # Validate the output format
-        valid_formats = ["csv", "xlsx", "json", "parquet"]
-        if output_format not in valid_formats:
-            raise ValueError(f"Invalid output_format. Must be one of: {', '.join(valid_formats)}")
-
-        # Set default export parameters
-        if export_params is None:
-            if output_format == "csv":
-                export_params = {"index": False}
-            elif output_format == "xlsx":
-                export_params = {"index": False}
-            elif output_format == "json":
-                export_params = {"orient": "records"}
-            elif output_format == "parquet":
-                export_params = {}
-
-        # Set default file name with appropriate extension
-        file_name = f"{uuid.uuid4()}.{output_format}"
-
-        temp_dir = tempfile.gettempdir()
-        temp_file_path = os.path.join(temp_dir, file_name)
-
-        # Export dataframe to the specified format
-        if output_format == "csv":
-            dataframe.to_csv(temp_file_path, **export_params)
-        elif output_format == "xlsx":
-            try:
-                dataframe.to_excel(temp_file_path, **export_params)
-            except ImportError:
-                raise ImportError("Excel export requires openpyxl. Install with 'pip install openpyxl'")
-        elif output_format == "json":
-            dataframe.to_json(temp_file_path, **export_params)
-        elif output_format == "parquet":
-            try:
-                dataframe.to_parquet(temp_file_path, **export_params)
-            except ImportError:
-                raise ImportError(
-                    "Parquet export requires pyarrow or fastparquet. Install with 'pip install pyarrow' or 'pip install fastparquet'")
-
-        try:
-            # Create a package with minimal content
-            package_data = {
-                "alias": alias or f'batch-{uuid.uuid4()}',
-            }
-
-            # Create the package
-            package_id = self.altscore_client.borrower_central.store_packages.create(package_data)
-
-            # Retrieve the package to upload attachment
-            package = self.altscore_client.borrower_central.store_packages.retrieve(package_id)
-
-            # Upload the file as an attachment
-            package.upload_package_attachment(temp_file_path)
-
-            # Execute batch with the package_id
-            return self.execute_batch(
-                workflow_id=workflow_id,
-                workflow_alias=workflow_alias,
-                workflow_version=workflow_version,
-                label=label,
-                description=description,
-                max_executions_per_second=max_executions_per_second,
-                max_concurrent_dispatches=max_concurrent_dispatches,
-                max_item_execution_runs=max_item_execution_runs,
-                raw_package_ids=[package_id],
-                custom_input=custom_input,
-                tags=tags,
-                debug=debug,
-                billable=billable
-            )
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+        store_packages = self.altscore_client.borrower_central.store_packages
+        package_alias = alias or f'batch-{uuid.uuid4()}'
+        chunked = max_rows_per_file is not None and len(dataframe) > max_rows_per_file
+        package_ids = []
+        # Each file is serialized and uploaded before the next one is built
+        for i, (file_name, content) in enumerate(
+                _dataframe_files(dataframe, output_format, export_params, max_rows_per_file)):
+            # Create a package with minimal content and attach the file without retrieving the package
+            package_id = store_packages.create({"alias": f"{package_alias}-{i}" if chunked else package_alias})
+            store_packages.upload_attachment_content(package_id, file_name, content)
+            package_ids.append(package_id)
+
+        # Execute batch with the package ids
+        return self.execute_batch(
+            workflow_id=workflow_id,
+            workflow_alias=workflow_alias,
+            workflow_version=workflow_version,
+            label=label,
+            description=description,
+            max_executions_per_second=max_executions_per_second,
+            max_concurrent_dispatches=max_concurrent_dispatches,
+            max_item_execution_runs=max_item_execution_runs,
+            raw_package_ids=package_ids,
+            custom_input=custom_input,
+            tags=tags,
+            debug=debug,
+            billable=billable
+        )
 
 
 class WorkflowsAsyncModule(GenericAsyncModule):
@@ -541,9 +752,39 @@ class WorkflowsAsyncModule(GenericAsyncModule):
                          create_data_model=CreateWorkflowDTO,
                          update_data_model=UpdateWorkflowDTO,
                          resource="workflows")
+        # opt-in WorkflowDefinitionCache used by retrieve_by_alias_version, execute and retrieve_revision
+        self.definitions: Optional[WorkflowDefinitionCache] = None
+
+    async def retrieve_by_alias_version(self, alias: str, version: str, use_cache: bool = True):
+        if self.definitions is None or not use_cache:
+            return await self._retrieve_by_alias_version(alias, version)
+        entry = await self.definitions.aget(alias, version, lambda: self._fetch_definition(alias, version))
+        if entry is None:
+            return None
+        return self.async_resource(
+            base_url=self.altscore_client._borrower_central_base_url,
+            header_builder=self.build_headers,
+            renew_token=self.renew_token,
+            data=entry.data
+        )
+
+    async def _fetch_definition(self, alias: str, version: str) -> Optional[WorkflowDataAPIDTO]:
+        workflow = await self._retrieve_by_alias_version(alias, version)
+        return None if workflow is None else workflow.data
+
+    async def _cached_execute_url(self, workflow_id: Optional[str] = None, workflow_alias: Optional[str] = None,
+                                  workflow_version: Optional[str] = None) -> str:
+        if workflow_id is None and self.definitions is not None and workflow_alias is not None \
+                and workflow_version is not None:
+            entry = await self.definitions.aget(workflow_alias, workflow_version,
+                                                lambda: self._fetch_definition(workflow_alias, workflow_version))
+            if entry is not None:
+                self.definitions.check_revision_guard(workflow_alias, workflow_version, entry)
+                workflow_id = entry.workflow_id
+        return _execute_url(workflow_id, workflow_alias, workflow_version)
 
     @retry_on_401_async
-    async def retrieve_by_alias_version(self, alias: str, version: str):
+    async def _retrieve_by_alias_version(self, alias: str, version: str):
         query_params = {
             "alias": alias,
             "version": version
@@ -568,7 +809,6 @@ class WorkflowsAsyncModule(GenericAsyncModule):
                 return None
             return res[0]
 
-    @retry_on_401_async
     async def execute(self,
                       workflow_input: Dict,
                       workflow_id: Optional[str] = None,
@@ -578,39 +818,93 @@ class WorkflowsAsyncModule(GenericAsyncModule):
                       batch_id: Optional[str] = None,
                       tags: Optional[List[str]] = None
                       ):
-        headers = self.build_headers()
-        if execution_mode is not None:
-            headers["X-Execution-Mode"] = execution_mode
-        if batch_id is not None:
-            headers["X-Batch-Id"] = batch_id
-
-        if tags is not None:
-            tags = ",".join(tags)
-            headers["x-tags"] = tags
-
-        if workflow_id is not None:
-            async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
-                response = await client.post(
-                    f"/v1/workflows/{workflow_id}/execute",
-                    json=workflow_input,
-                    headers=headers,
-                    timeout=900
-                )
-                raise_for_status_improved(response)
-                return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
-
-        elif workflow_alias is not None and workflow_version is not None:
-            async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
-                response = await client.post(
-                    f"/v1/workflows/{workflow_alias}/{workflow_version}/execute",
-                    json=workflow_input,
-                    headers=headers,
-                    timeout=900
-                )
-                raise_for_status_improved(response)
-                return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
-        else:
-            raise ValueError("You must provide a workflow id or a workflow alias and version")
+        url = await self._cached_execute_url(workflow_id, workflow_alias, workflow_version)
+        async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
+            return await self._post_execute_retrying(client, url, workflow_input, execution_mode, batch_id, tags)
+
+    @retry_on_401_async
+    async def _post_execute_retrying(self, *args):
+        return await self._post_execute(*args)
+
+    async def _post_execute_once(self, *args):
+        # not retry_on_401_async: its 5xx retries would run the decision again
+        try:
+            return await self._post_execute(*args)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 401:
+                raise
+            self.renew_token()
+            return await self._post_execute(*args)
+
+    async def _post_execute(self, client: httpx.AsyncClient, url: str, workflow_input: Dict,
+                            execution_mode: Optional[str] = None, batch_id: Optional[str] = None,
+                            tags: Optional[List[str]] = None) -> WorkflowExecutionResponseAPIDTO:
+        response = await client.post(
+            url,
+            json=workflow_input,
+            headers=_execute_headers(self.build_headers(), execution_mode, batch_id, tags),
+            timeout=900
+        )
+        raise_for_status_improved(response)
+        return WorkflowExecutionResponseAPIDTO.parse_obj(response.json())
+
+    async def execute_many(self, inputs: Union[Iterable[Dict], AsyncIterator[Dict]],
+                           workflow_id: Optional[str] = None,
+                           workflow_alias: Optional[str] = None,
+                           workflow_version: Optional[str] = None,
+                           concurrency: int = 10,
+                           rate: Optional[float] = None,
+                           max_retries: int = 3,
+                           checkpoint_path: Optional[str] = None,
+                           checkpoint_key: Optional[Callable[[int, Dict], Any]] = None,
+                           execution_mode: Optional[str] = None,
+                           batch_id: Optional[str] = None,
+                           tags: Optional[List[str]] = None,
+                           ordered: bool = False) -> AsyncIterator[BulkItemResult]:
+        """
+        Execute a workflow once per input, keeping up to `concurrency` executions in flight.
+
+        Same as WorkflowsSyncModule.execute_many, `inputs` may also be an async iterable.
+        """
+        url = await self._cached_execute_url(workflow_id, workflow_alias, workflow_version)
+        rate_limiter = RateLimiter(rate) if rate else None
+        checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        key_of = checkpoint_key or _default_checkpoint_key
+
+        async def pending():
+            index = 0
+            if hasattr(inputs, "__aiter__"):
+                async for workflow_input in inputs:
+                    if checkpoint is None or not checkpoint.is_done(key_of(index, workflow_input)):
+                        yield index, workflow_input
+                    index += 1
+            else:
+                for workflow_input in inputs:
+                    if checkpoint is None or not checkpoint.is_done(key_of(index, workflow_input)):
+                        yield index, workflow_input
+                    index += 1
+
+        try:
+            async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url,
+                                         limits=pooled_limits(concurrency)) as client:
+                async def run(item):
+                    index, workflow_input = item
+                    if rate_limiter is not None:
+                        await rate_limiter.acquire_async()
+                    result = await call_with_retries_async(
+                        self._post_execute_once, client, url, workflow_input, execution_mode, batch_id, tags,
+                        max_retries=max_retries, is_retryable=is_unsent_error
+                    )
+                    if checkpoint is not None:
+                        await checkpoint.mark_done_async(key_of(index, workflow_input), result.execution_id)
+                    return result
+
+                async for r in bounded_map_async(run, pending(), concurrency=concurrency, ordered=ordered):
+                    index, workflow_input = r.item
+                    yield BulkItemResult(index, workflow_input, result=r.result, error=r.error)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
 
     @retry_on_401_async
     async def execute_batch(self,
@@ -702,9 +996,16 @@ class WorkflowsAsyncModule(GenericAsyncModule):
             )
             raise_for_status_improved(response)
 
-    @retry_on_401_async
     async def retrieve_revision(self, workflow_id: str, revision_id: str) -> WorkflowRevisionDataAPIDTO:
-        """Retrieve a specific workflow revision."""
+        """Retrieve a specific workflow revision, from the definitions cache when it is enabled."""
+        if self.definitions is None:
+            return await self._retrieve_revision(workflow_id, revision_id)
+        return await self.definitions.aget_revision(
+            workflow_id, revision_id, lambda: self._retrieve_revision(workflow_id, revision_id)
+        )
+
+    @retry_on_401_async
+    async def _retrieve_revision(self, workflow_id: str, revision_id: str) -> WorkflowRevisionDataAPIDTO:
         async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url) as client:
             response = await client.get(
                 f"/v1/workflows/{workflow_id}/revisions/{revision_id}",
@@ -726,16 +1027,18 @@ class WorkflowsAsyncModule(GenericAsyncModule):
                                            max_concurrent_dispatches=1,
                                            max_item_execution_runs=2,
                                            custom_input=None,
-                                           output_format="csv",
+                                           output_format=None,
                                            export_params=None,
                                            tags=None,
                                            debug=False,
-                                           billable=True):
+                                           billable=True,
+                                           max_rows_per_file=None):
         """
         Execute a batch workflow with data from a pandas DataFrame asynchronously.
 
-        This method handles converting the dataframe to the specified format (CSV, XLSX, JSON, or Parquet),
-        uploading it as a package attachment, and executing the batch workflow with the package.
+        This method handles converting the dataframe to the specified format (CSV, XLSX, JSON, or Parquet)
+        in memory, uploading it as a package attachment, and executing the batch workflow with the package.
+        Nothing is written to disk, and large CSV frames are serialized a slice at a time as they are uploaded.
 
         Args:
             dataframe: Pandas DataFrame containing the data to process
@@ -749,90 +1052,45 @@ class WorkflowsAsyncModule(GenericAsyncModule):
             max_concurrent_dispatches: Maximum number of concurrent dispatches
             max_item_execution_runs: Maximum number of execution runs per item
             custom_input: Custom input for the workflow
-            output_format: Format for the dataframe export ("csv", "xlsx", "json", or "parquet")
+            output_format: Format for the dataframe export ("csv", "xlsx", "json", or "parquet"), by default
+                "parquet" when pyarrow is installed and "csv" otherwise
             export_params: Additional parameters to pass to the pandas export function
             tags: List of tags for the execution
             debug: Whether to run in debug mode
             billable: Whether the execution is billable
+            max_rows_per_file: Split the dataframe in files of at most this many rows, each in its own
+                package (up to 5), so very large frames are never serialized at once
 
         Returns:
             Execution response
         """
-        import os
-        import tempfile
         import uuid
 
-        # Validate the output format
-        valid_formats = ["csv", "xlsx", "json", "parquet"]
-        if output_format not in valid_formats:
-            raise ValueError(f"Invalid output_format. Must be one of: {', '.join(valid_formats)}")
-
-        # Set default export parameters
-        if export_params is None:
-            if output_format == "csv":
-                export_params = {"index": False}
-            elif output_format == "xlsx":
-                export_params = {"index": False}
-            elif output_format == "json":
-                export_params = {"orient": "records"}
-            elif output_format == "parquet":
-                export_params = {}
-
-        # Set default file name with appropriate extension
-        file_name = f"{uuid.uuid4()}.{output_format}"
-
-        temp_dir = tempfile.gettempdir()
-        temp_file_path = os.path.join(temp_dir, file_name)
-
-        # Export dataframe to the specified format
-        if output_format == "csv":
-            dataframe.to_csv(temp_file_path, **export_params)
-        elif output_format == "xlsx":
-            try:
-                dataframe.to_excel(temp_file_path, **export_params)
-            except ImportError:
-                raise ImportError("Excel export requires openpyxl. Install with 'pip install openpyxl'")
-        elif output_format == "json":
-            dataframe.to_json(temp_file_path, **export_params)
-        elif output_format == "parquet":
-            try:
-                dataframe.to_parquet(temp_file_path, **export_params)
-            except ImportError:
-                raise ImportError(
-                    "Parquet export requires pyarrow or fastparquet. Install with 'pip install pyarrow' or 'pip install fastparquet'")
-
-        try:
-            # Create a package with minimal content
-            package_data = {
-                "alias": alias or f'batch-{uuid.uuid4()}',
-            }
-
-            # Create the package
-            package_id = await self.altscore_client.borrower_central.store_packages.create(package_data)
-
-            # Retrieve the package to upload attachment
-            package = await self.altscore_client.borrower_central.store_packages.retrieve(package_id)
-
-            # Upload the file as an attachment
-            await package.upload_package_attachment(temp_file_path)
-
-            # Execute batch with the package_id
-            return await self.execute_batch(
-                workflow_id=workflow_id,
-                workflow_alias=workflow_alias,
-                workflow_version=workflow_version,
-                label=label,
-                description=description,
-                max_executions_per_second=max_executions_per_second,
-                max_concurrent_dispatches=max_concurrent_dispatches,
-                max_item_execution_runs=max_item_execution_runs,
-                raw_package_ids=[package_id],
-                custom_input=custom_input,
-                tags=tags,
-                debug=debug,
-                billable=billable
-            )
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+        store_packages = self.altscore_client.borrower_central.store_packages
+        package_alias = alias or f'batch-{uuid.uuid4()}'
+        chunked = max_rows_per_file is not None and len(dataframe) > max_rows_per_file
+        package_ids = []
+        # Each file is serialized and uploaded before the next one is built
+        for i, (file_name, content) in enumerate(
+                _dataframe_files(dataframe, output_format, export_params, max_rows_per_file)):
+            # Create a package with minimal content and attach the file without retrieving the package
+            package_id = await store_packages.create({"alias": f"{package_alias}-{i}" if chunked else package_alias})
+            await store_packages.upload_attachment_content(package_id, file_name, content)
+            package_ids.append(package_id)
+
+        # Execute batch with the package ids
+        return await self.execute_batch(
+            workflow_id=workflow_id,
+            workflow_alias=workflow_alias,
+            workflow_version=workflow_version,
+            label=label,
+            description=description,
+            max_executions_per_second=max_executions_per_second,
+            max_concurrent_dispatches=max_concurrent_dispatches,
+            max_item_execution_runs=max_item_execution_runs,
+            raw_package_ids=package_ids,
+            custom_input=custom_input,
+            tags=tags,
+            debug=debug,
+            billable=billable
+        )
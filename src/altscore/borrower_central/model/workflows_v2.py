@@ -1,10 +1,31 @@
+import hashlib
+import json
+import os
 import httpx
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Union
+from altscore.common.concurrency import bounded_map, bounded_map_async
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
 from altscore.borrower_central.helpers import build_headers
 
 _BASE_PATH = "/v2/workflows"
 
+# server assigned fields of an export that do not change what a workflow does
+_VOLATILE_KEYS = {
+    "createdAt", "updatedAt", "createdBy", "updatedBy", "publishedRevisionId", "revisionId", "status",
+    "lockToken",
+}
+
+WORKFLOW_SYNC_UNCHANGED = "unchanged"
+WORKFLOW_SYNC_INVALID = "invalid"
+WORKFLOW_SYNC_VALID = "valid"
+WORKFLOW_SYNC_PUBLISHED = "published"
+WORKFLOW_SYNC_IMPORTED = "imported"
+WORKFLOW_SYNC_EXISTS = "exists"
+WORKFLOW_SYNC_PUBLISH_FAILED = "publish_failed"
+WORKFLOW_SYNC_FAILED = "failed"
+
+_ID_PLACEHOLDER = "<id>"
+
 
 def _import_payload(
     workflow_data: Dict[str, Any],
@@ -24,6 +45,173 @@ def _import_payload(
     }
 
 
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in _VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def _is_id_key(key: Any) -> bool:
+    return isinstance(key, str) and (key == "id" or key.endswith("Id"))
+
+
+def _collect_ids(value: Any, ids: set):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if _is_id_key(k) and isinstance(v, str):
+                ids.add(v)
+            _collect_ids(v, ids)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_ids(v, ids)
+
+
+def _strip_ids(value: Any, ids: set) -> Any:
+    """
+    Drops the id fields (id and *Id) at every level and replaces the places that refer to one of
+    those ids, like edges between nodes, with a placeholder. A dict keyed by ids becomes the
+    sorted list of its values.
+    """
+    if isinstance(value, dict):
+        if value and all(k in ids for k in value):
+            return sorted((_strip_ids(v, ids) for v in value.values()),
+                          key=lambda v: json.dumps(v, sort_keys=True, default=str))
+        return {(_ID_PLACEHOLDER if k in ids else k): _strip_ids(v, ids)
+                for k, v in value.items() if not _is_id_key(k)}
+    if isinstance(value, list):
+        return [_strip_ids(v, ids) for v in value]
+    if isinstance(value, str) and value in ids:
+        return _ID_PLACEHOLDER
+    return value
+
+
+def workflow_bundle_hash(bundle: Dict[str, Any]) -> str:
+    """
+    Canonical hash of an exported bundle, ignoring the ids assigned by the environment it was
+    exported from (of the workflow, its nodes and tasks), timestamps and publication state.
+    """
+    bundle = _strip_volatile(bundle)
+    ids = set()
+    _collect_ids(bundle, ids)
+    bundle = _strip_ids(bundle, ids)
+    # the alias is derived from the label
+    workflow = {k: v for k, v in (bundle.get("workflow") or {}).items() if k != "alias"}
+    canonical = json.dumps({**bundle, "workflow": workflow}, sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def load_workflow_bundles(source: Union[str, os.PathLike, Iterable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Bundles from a directory of exported *.json files (sorted by name) or an iterable of dicts."""
+    if isinstance(source, (str, os.PathLike)):
+        bundles = []
+        for file_name in sorted(os.listdir(source)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(source, file_name), "r", encoding="utf-8") as f:
+                    bundles.append(json.load(f))
+        return bundles
+    return list(source)
+
+
+def _imported_workflow_id(response: Dict[str, Any]) -> Optional[str]:
+    return response.get("id") or response.get("workflowId") or (response.get("workflow") or {}).get("id")
+
+
+def _is_alias_exists(e: Exception) -> bool:
+    return isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 409
+
+
+class WorkflowSyncResult:
+    """Outcome of sync_workflows for one local bundle."""
+
+    def __init__(self, label: str, status: str, workflow_id: Optional[str] = None,
+                 findings: Optional[List[Any]] = None, error: Optional[BaseException] = None):
+        self.label = label
+        self.status = status
+        self.workflow_id = workflow_id
+        self.findings = findings or []
+        self.error = error
+
+    @property
+    def is_success(self) -> bool:
+        return self.status not in (WORKFLOW_SYNC_INVALID, WORKFLOW_SYNC_EXISTS, WORKFLOW_SYNC_PUBLISH_FAILED,
+                                   WORKFLOW_SYNC_FAILED)
+
+    def __repr__(self):
+        return f"WorkflowSyncResult({self.label!r}, {self.status}, workflow_id={self.workflow_id})"
+
+
+class _WorkflowSyncItem:
+
+    def __init__(self, bundle: Dict[str, Any], workflow_ids: Dict[str, str]):
+        self.bundle = bundle
+        workflow = bundle.get("workflow") or {}
+        self.label = workflow.get("label") or ""
+        # the id in the bundle is the one of the environment it was exported from
+        self.workflow_id = workflow_ids.get(self.label)
+        self.needs_publish = False
+        self.result: Optional[WorkflowSyncResult] = None
+
+    def fail(self, status: str, error: Optional[BaseException] = None, findings: Optional[List[Any]] = None):
+        self.result = WorkflowSyncResult(self.label, status, self.workflow_id, findings=findings, error=error)
+
+
+def _sync_items(source, workflow_ids: Optional[Dict[str, str]]) -> List[_WorkflowSyncItem]:
+    return [_WorkflowSyncItem(bundle, workflow_ids or {}) for bundle in load_workflow_bundles(source)]
+
+
+def _is_draft(exported: Dict[str, Any]) -> bool:
+    status = (exported.get("workflow") or {}).get("status") or exported.get("status")
+    return str(status or "").upper() == "DRAFT"
+
+
+def _after_export(item: _WorkflowSyncItem, r, publish: bool):
+    # a workflow that can not be exported is treated as changed, the import tells whether it exists
+    if r.is_success and workflow_bundle_hash(r.result) == workflow_bundle_hash(item.bundle):
+        if publish and _is_draft(r.result):
+            # imported by an earlier sync whose publish failed
+            item.needs_publish = True
+        else:
+            item.result = WorkflowSyncResult(item.label, WORKFLOW_SYNC_UNCHANGED, item.workflow_id)
+
+
+def _after_validate(item: _WorkflowSyncItem, r):
+    if not r.is_success:
+        item.fail(WORKFLOW_SYNC_FAILED, error=r.error)
+    elif not r.result.get("valid", False):
+        item.fail(WORKFLOW_SYNC_INVALID, findings=r.result.get("findings"))
+
+
+def _after_import(item: _WorkflowSyncItem, r, publish: bool):
+    if r.is_success:
+        item.workflow_id = _imported_workflow_id(r.result) or item.workflow_id
+        item.result = WorkflowSyncResult(item.label, WORKFLOW_SYNC_IMPORTED, item.workflow_id)
+        item.needs_publish = publish and item.workflow_id is not None
+    elif _is_alias_exists(r.error):
+        # import can not update a workflow, changed workflows that already exist are reported
+        item.fail(WORKFLOW_SYNC_EXISTS, error=r.error)
+    else:
+        item.fail(WORKFLOW_SYNC_FAILED, error=r.error)
+
+
+def _after_publish(item: _WorkflowSyncItem, r):
+    if r.is_success:
+        item.result = WorkflowSyncResult(item.label, WORKFLOW_SYNC_PUBLISHED, item.workflow_id)
+    else:
+        # the workflow exists in DRAFT, a sync passing its id in workflow_ids publishes it
+        item.fail(WORKFLOW_SYNC_PUBLISH_FAILED, error=r.error)
+
+
+def _to_import(items: List[_WorkflowSyncItem]) -> List[_WorkflowSyncItem]:
+    return [item for item in items if item.result is None and not item.needs_publish]
+
+
+def _to_publish(items: List[_WorkflowSyncItem]) -> List[_WorkflowSyncItem]:
+    return [item for item in items if item.needs_publish]
+
+
 class WorkflowsV2SyncModule:
     """Workflows V2 authoring surface.
 
@@ -132,6 +320,53 @@ class WorkflowsV2SyncModule:
             return response.json()
 
 
+    def sync_workflows(
+        self,
+        source: Union[str, os.PathLike, Iterable[Dict[str, Any]]],
+        workflow_ids: Optional[Dict[str, str]] = None,
+        concurrency: int = 8,
+        dry_run: bool = False,
+        publish: bool = True
+    ) -> List[WorkflowSyncResult]:
+        """Push many exported bundles, skipping the ones already up to date.
+
+        `source` is a directory of exported *.json bundles or an iterable of
+        bundles. Workflows with a known id in this environment (`workflow_ids`
+        by label) are exported and compared by hash, unchanged ones are
+        skipped. The rest are validated in parallel and the valid ones
+        imported and published, `concurrency` calls at a time. With `dry_run`
+        nothing is imported.
+
+        Import has no update: a changed workflow whose alias already exists
+        is reported with status "exists" instead of being overwritten. A
+        workflow imported but not published is reported with status
+        "publish_failed" and its new id; passing that id in `workflow_ids` on
+        the next sync publishes it instead of importing it again.
+        """
+        items = _sync_items(source, workflow_ids)
+
+        known = [item for item in items if item.workflow_id]
+        for r in bounded_map(lambda item: self.export(item.workflow_id), known, concurrency=concurrency):
+            _after_export(r.item, r, publish and not dry_run)
+
+        pending = _to_import(items)
+        for r in bounded_map(lambda item: self.validate(item.bundle["workflow"], item.bundle.get("tasks")),
+                             pending, concurrency=concurrency):
+            _after_validate(r.item, r)
+
+        pending = _to_import(items)
+        if dry_run:
+            for item in pending:
+                item.result = WorkflowSyncResult(item.label, WORKFLOW_SYNC_VALID, item.workflow_id)
+            return [item.result for item in items]
+        for r in bounded_map(lambda item: self.import_workflow(item.bundle), pending, concurrency=concurrency):
+            _after_import(r.item, r, publish)
+        for r in bounded_map(lambda item: self.publish(item.workflow_id), _to_publish(items),
+                             concurrency=concurrency):
+            _after_publish(r.item, r)
+        return [item.result for item in items]
+
+
 class WorkflowsV2AsyncModule:
     """Async counterpart of WorkflowsV2SyncModule."""
 
@@ -203,3 +438,46 @@ class WorkflowsV2AsyncModule:
             response = await client.post(url, headers=self.build_headers(), json=payload, timeout=60)
             raise_for_status_improved(response)
             return response.json()
+
+    async def sync_workflows(
+        self,
+        source: Union[str, os.PathLike, Iterable[Dict[str, Any]]],
+        workflow_ids: Optional[Dict[str, str]] = None,
+        concurrency: int = 8,
+        dry_run: bool = False,
+        publish: bool = True
+    ) -> List[WorkflowSyncResult]:
+        """Async counterpart of WorkflowsV2SyncModule.sync_workflows."""
+        items = _sync_items(source, workflow_ids)
+
+        async def export(item: _WorkflowSyncItem):
+            return await self.export(item.workflow_id)
+
+        known = [item for item in items if item.workflow_id]
+        async for r in bounded_map_async(export, known, concurrency=concurrency):
+            _after_export(r.item, r, publish and not dry_run)
+
+        async def validate(item: _WorkflowSyncItem):
+            return await self.validate(item.bundle["workflow"], item.bundle.get("tasks"))
+
+        pending = _to_import(items)
+        async for r in bounded_map_async(validate, pending, concurrency=concurrency):
+            _after_validate(r.item, r)
+
+        pending = _to_import(items)
+        if dry_run:
+            for item in pending:
+                item.result = WorkflowSyncResult(item.label, WORKFLOW_SYNC_VALID, item.workflow_id)
+            return [item.result for item in items]
+
+        async def import_workflow(item: _WorkflowSyncItem):
+            return await self.import_workflow(item.bundle)
+
+        async def publish_workflow(item: _WorkflowSyncItem):
+            return await self.publish(item.workflow_id)
+
+        async for r in bounded_map_async(import_workflow, pending, concurrency=concurrency):
+            _after_import(r.item, r, publish)
+        async for r in bounded_map_async(publish_workflow, _to_publish(items), concurrency=concurrency):
+            _after_publish(r.item, r)
+        return [item.result for item in items]
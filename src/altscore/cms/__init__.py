@@ -4,12 +4,17 @@ from altscore.cms.model.dpas import DPAFlowsAsyncModule, DPAFlowsSyncModule
 from altscore.cms.model.debts import DebtsAsyncModule, DebtsSyncModule
 from altscore.cms.model.disbursements import DisbursementSyncModule, DisbursementAsyncModule
 from altscore.cms.model.payment_orders import PaymentOrdersAsyncModule, PaymentOrdersSyncModule
+from altscore.cms.model.portfolio import PORTFOLIO_ENTITIES, PortfolioExportAsync, PortfolioExportResult, \
+    PortfolioExportSync, PortfolioSnapshotWriter
 from altscore.cms.helpers import build_headers
+from altscore.common.fast_models import fast_reads
+from typing import Optional, Sequence
 
 
 class CMSSync:
 
     def __init__(self, altscore_client):
+        self.altscore_client = altscore_client
         self.clients = ClientsSyncModule(altscore_client)
         self.partners = PartnersSyncModule(altscore_client)
         self.dpas = DPAFlowsSyncModule(altscore_client)
@@ -17,13 +22,63 @@ class CMSSync:
         self.payment_orders = PaymentOrdersSyncModule(altscore_client)
         self.disbursements = DisbursementSyncModule(altscore_client)
 
+    def fast_reads(self, enabled: bool = True):
+        """
+        Context manager under which CMS reads build their models without pydantic validation
+        (construct_model instead of parse_obj), trusting the JSON of the server. Same attribute
+        names; only GET reads are affected, create and update responses are always validated.
+        Applies to the calls made in the current thread or task and in bounded_map workers.
+
+            with altscore.cms.fast_reads():
+                debts = altscore.cms.debts.retrieve_all(status="active")
+        """
+        return fast_reads(enabled)
+
+    def export_portfolio(self, partner_id: Optional[str], output_dir: str,
+                         include: Sequence[str] = PORTFOLIO_ENTITIES, concurrency: int = 8,
+                         product_families: Sequence[str] = ("dpa",), file_format: str = "auto",
+                         chunk_rows: int = 50_000, per_page: int = 100, max_retries: int = 3) -> PortfolioExportResult:
+        """
+        Writes a columnar snapshot of the portfolio of a partner (the partner of the credentials
+        when None) to `output_dir`: one folder per entity of `include` with Parquet parts when
+        pyarrow is installed, CSV parts otherwise. Listings are paged in parallel and rows are
+        written in chunks of `chunk_rows`, so memory does not grow with the portfolio. Pages and
+        items that fail are reported in the errors of the result instead of aborting the export.
+        """
+        writer = PortfolioSnapshotWriter(output_dir, file_format=file_format, chunk_rows=chunk_rows)
+        return PortfolioExportSync(
+            self.altscore_client, partner_id, include, concurrency, product_families, per_page, max_retries
+        ).run(writer)
+
 
 class CMSAsync:
 
     def __init__(self, altscore_client):
+        self.altscore_client = altscore_client
         self.clients = ClientsAsyncModule(altscore_client)
         self.partners = PartnersAsyncModule(altscore_client)
         self.dpas = DPAFlowsAsyncModule(altscore_client)
         self.debts = DebtsAsyncModule(altscore_client)
         self.payment_orders = PaymentOrdersAsyncModule(altscore_client)
         self.disbursements = DisbursementAsyncModule(altscore_client)
+
+    def fast_reads(self, enabled: bool = True):
+        """Same as CMSSync.fast_reads, for the calls awaited in the current task."""
+        return fast_reads(enabled)
+
+    async def export_portfolio(self, partner_id: Optional[str], output_dir: str,
+                               include: Sequence[str] = PORTFOLIO_ENTITIES, concurrency: int = 8,
+                               product_families: Sequence[str] = ("dpa",), file_format: str = "auto",
+                               chunk_rows: int = 50_000, per_page: int = 100,
+                               max_retries: int = 3) -> PortfolioExportResult:
+        """
+        Writes a columnar snapshot of the portfolio of a partner (the partner of the credentials
+        when None) to `output_dir`: one folder per entity of `include` with Parquet parts when
+        pyarrow is installed, CSV parts otherwise. Listings are paged in parallel and rows are
+        written in chunks of `chunk_rows`, so memory does not grow with the portfolio. Pages and
+        items that fail are reported in the errors of the result instead of aborting the export.
+        """
+        writer = PortfolioSnapshotWriter(output_dir, file_format=file_format, chunk_rows=chunk_rows)
+        return await PortfolioExportAsync(
+            self.altscore_client, partner_id, include, concurrency, product_families, per_page, max_retries
+        ).run(writer)
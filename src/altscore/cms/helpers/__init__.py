@@ -13,7 +13,9 @@ def build_headers(module, partner_id: Optional[str] = None):
         return headers
     elif isinstance(partner_id, str):
         headers["X-PARTNER-ID"] = partner_id
-    # if it reaches here when querying the partner it will trigger an infinite recursion
-    elif isinstance(module.altscore_client.partner_id, str):
-        headers["X-PARTNER-ID"] = module.altscore_client.partner_id
+    else:
+        # if it reaches here when querying the partner it will trigger an infinite recursion
+        resolved_partner_id = module.altscore_client.partner_id
+        if isinstance(resolved_partner_id, str):
+            headers["X-PARTNER-ID"] = resolved_partner_id
     return headers
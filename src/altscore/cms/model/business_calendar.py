@@ -0,0 +1,150 @@
+import calendar
+import datetime as dt
+import time
+from typing import Dict, Iterable, Optional, Sequence, Union
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("Business calendars require numpy. Install with \"pip install 'altscore[fast]'\"")
+from altscore.cms.model.calendars import DPACalendarAPIDTO
+
+_WEEKDAYS = {name.lower(): i for i, name in enumerate(calendar.day_name)}
+_WEEKDAYS.update({name.lower(): i for i, name in enumerate(calendar.day_abbr)})
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+
+DateLike = Union[str, dt.date, np.datetime64]
+DatesLike = Union[DateLike, Sequence[DateLike], np.ndarray]
+
+
+def _month_number(month: str) -> int:
+    month = str(month).strip().lower()
+    return int(month) if month.isdigit() else _MONTHS[month]
+
+
+def _dates(dates: DatesLike) -> np.ndarray:
+    if isinstance(dates, str):
+        dates = dates[:10]
+    elif isinstance(dates, (list, tuple)):
+        dates = [d[:10] if isinstance(d, str) else d for d in dates]
+    return np.asarray(dates, dtype="datetime64[D]")
+
+
+def _scalar_or_array(values: np.ndarray, dates: DatesLike):
+    if np.ndim(dates) == 0 and values.ndim == 0:
+        return values[()]
+    return values
+
+
+class BusinessCalendar:
+    """
+    Business days of a DPA calendar compiled once: a weekmask, the holidays as a sorted
+    datetime64[D] array and a per year bitmask of business days built on first use.
+
+    is_business_day is a bitmask read once the year is compiled; the other methods take any date
+    or array of dates and run in NumPy over the whole array against the sorted holidays, so the
+    due dates of a whole portfolio are computed in a single call.
+    """
+
+    def __init__(self, weekmask: str = "1111111", holidays: Iterable[DateLike] = ()):
+        self.weekmask = weekmask
+        self.holidays = np.unique(_dates(list(holidays)))
+        self.busdaycalendar = np.busdaycalendar(weekmask=weekmask, holidays=self.holidays)
+        self._years: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_dpa_calendars(cls, calendars: Iterable[DPACalendarAPIDTO]) -> "BusinessCalendar":
+        """
+        Combines DPA calendars: exclusion days are weekday names ("saturday", "Sun") or ISO
+        dates, holidays are day/month of the year of their calendar.
+        """
+        weekmask = [1] * 7
+        holidays = []
+        for cal in calendars:
+            for day in cal.exclusionDays or []:
+                weekday = _WEEKDAYS.get(str(day).strip().lower())
+                if weekday is not None:
+                    weekmask[weekday] = 0
+                else:
+                    holidays.append(str(day)[:10])
+            for holiday in cal.holidays or []:
+                holidays.append(dt.date(cal.year, _month_number(holiday.month), holiday.day).isoformat())
+        return cls("".join(str(d) for d in weekmask), holidays)
+
+    def __repr__(self):
+        return f"<BusinessCalendar weekmask={self.weekmask} holidays={len(self.holidays)}>"
+
+    def _year_mask(self, year: int) -> np.ndarray:
+        mask = self._years.get(year)
+        if mask is None:
+            start = np.datetime64(f"{year:04d}-01-01")
+            days = np.arange(start, np.datetime64(f"{year + 1:04d}-01-01"), dtype="datetime64[D]")
+            mask = np.is_busday(days, busdaycal=self.busdaycalendar)
+            self._years[year] = mask
+        return mask
+
+    def is_business_day(self, date: DateLike) -> bool:
+        day = _dates(date)
+        year_start = day.astype("datetime64[Y]")
+        return bool(self._year_mask(int(year_start.astype(int)) + 1970)[int((day - year_start).astype(int))])
+
+    def compile(self, years: Iterable[int]) -> "BusinessCalendar":
+        """Builds the bitmasks of `years` ahead of time, otherwise each year is built on its first lookup."""
+        for year in years:
+            self._year_mask(year)
+        return self
+
+    def are_business_days(self, dates: DatesLike) -> np.ndarray:
+        return np.is_busday(_dates(dates), busdaycal=self.busdaycalendar)
+
+    def add_business_days(self, dates: DatesLike, days: Union[int, Sequence[int], np.ndarray]):
+        """Moves every date `days` business days; dates that are not business days start from the next one."""
+        shifted = np.busday_offset(_dates(dates), days, roll="forward", busdaycal=self.busdaycalendar)
+        return _scalar_or_array(shifted, dates)
+
+    def next_due_dates(self, dates: DatesLike):
+        """Each date, or the next business day when it is not one."""
+        rolled = np.busday_offset(_dates(dates), 0, roll="forward", busdaycal=self.busdaycalendar)
+        return _scalar_or_array(rolled, dates)
+
+    def previous_business_days(self, dates: DatesLike):
+        """Each date, or the previous business day when it is not one."""
+        rolled = np.busday_offset(_dates(dates), 0, roll="backward", busdaycal=self.busdaycalendar)
+        return _scalar_or_array(rolled, dates)
+
+    def business_days_between(self, start: DatesLike, end: DatesLike):
+        """Business days in [start, end) for every pair."""
+        counts = np.busday_count(_dates(start), _dates(end), busdaycal=self.busdaycalendar)
+        return _scalar_or_array(counts, start)
+
+
+class BusinessCalendarCache:
+    """BusinessCalendar per partner and calendar type, kept for `ttl` seconds."""
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self._entries: Dict[tuple, tuple] = {}
+
+    def get(self, partner_id: str, calendar_type: Optional[str]) -> Optional[BusinessCalendar]:
+        entry = self._entries.get((partner_id, calendar_type))
+        if entry is None:
+            return None
+        business_calendar, expires_at = entry
+        if time.monotonic() >= expires_at:
+            return None
+        return business_calendar
+
+    def set(self, partner_id: str, calendar_type: Optional[str], business_calendar: BusinessCalendar):
+        self._entries[(partner_id, calendar_type)] = (business_calendar, time.monotonic() + self.ttl)
+
+    def invalidate(self, partner_id: Optional[str] = None):
+        if partner_id is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == partner_id]:
+            del self._entries[key]
+
+
+def select_calendars(calendars: Iterable[DPACalendarAPIDTO],
+                     calendar_type: Optional[str] = None) -> Sequence[DPACalendarAPIDTO]:
+    return [c for c in calendars if calendar_type is None or c.type == calendar_type]
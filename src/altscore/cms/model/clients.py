@@ -11,6 +11,7 @@ from altscore.cms.model.payment_accounts import PaymentAccountAPIDTO, CreatePaym
 from altscore.cms.model.generics import GenericSyncModule, GenericAsyncModule, convert_to_dash_case
 from altscore.cms.model.common import Money
 import datetime as dt
+from altscore.common.fast_models import parse_read
 
 
 class ClientAPIDTO(BaseModel):
@@ -201,7 +202,7 @@ class ClientAsync(ClientBase):
                 base_url=self.base_url,
                 header_builder=self._header_builder,
                 renew_token=self.renew_token,
-                data=CreditAccountAPIDTO.parse_obj(response.json())
+                data=parse_read(CreditAccountAPIDTO, response.json())
             )
     
 
@@ -214,7 +215,7 @@ class ClientAsync(ClientBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return ClientWithSummaryDTO.parse_obj(response.json())
+            return parse_read(ClientWithSummaryDTO, response.json())
 
     @retry_on_401_async
     async def create_reservation(self, product_family: str, reservation: dict) -> None:
@@ -297,7 +298,7 @@ class ClientAsync(ClientBase):
             if response.status_code == 404:
                 return None
             raise_for_status_improved(response)
-            return PaymentAccountAPIDTO.parse_obj(response.json())
+            return parse_read(PaymentAccountAPIDTO, response.json())
 
     @retry_on_401_async
     async def create_payment_account(self, auto_create_references: bool = True) -> PaymentAccountAPIDTO:
@@ -384,7 +385,7 @@ class ClientAsync(ClientBase):
             if response.status_code == 404:
                 return None
             raise_for_status_improved(response)
-            return DisbursementClientAccountAPIDTO.parse_obj(response.json())
+            return parse_read(DisbursementClientAccountAPIDTO, response.json())
 
     @retry_on_401_async
     async def get_disbursement_accounts(self, country: str, **kwargs) -> List[DisbursementClientAccountAPIDTO]:
@@ -404,7 +405,7 @@ class ClientAsync(ClientBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DisbursementClientAccountAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DisbursementClientAccountAPIDTO, e) for e in response.json()]
 
     def __str__(self):
         return str(self.data)
@@ -434,7 +435,7 @@ class ClientSync(ClientBase):
                 base_url=self.base_url,
                 header_builder=self._header_builder,
                 renew_token=self.renew_token,
-                data=CreditAccountAPIDTO.parse_obj(response.json())
+                data=parse_read(CreditAccountAPIDTO, response.json())
             )
     
     @retry_on_401
@@ -446,7 +447,7 @@ class ClientSync(ClientBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return ClientWithSummaryDTO.parse_obj(response.json())
+            return parse_read(ClientWithSummaryDTO, response.json())
 
     @retry_on_401
     def create_reservation(self, product_family: str, reservation: dict) -> None:
@@ -529,7 +530,7 @@ class ClientSync(ClientBase):
             if response.status_code == 404:
                 return None
             raise_for_status_improved(response)
-            return PaymentAccountAPIDTO.parse_obj(response.json())
+            return parse_read(PaymentAccountAPIDTO, response.json())
 
     @retry_on_401
     def create_payment_account(self, auto_create_references: bool = True) -> PaymentAccountAPIDTO:
@@ -622,7 +623,7 @@ class ClientSync(ClientBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DisbursementClientAccountAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DisbursementClientAccountAPIDTO, e) for e in response.json()]
 
     @retry_on_401
     def get_disbursement_account(self, country: str, account_id: str) -> Optional[DisbursementClientAccountAPIDTO]:
@@ -638,7 +639,7 @@ class ClientSync(ClientBase):
             if response.status_code == 404:
                 return None
             raise_for_status_improved(response)
-            return DisbursementClientAccountAPIDTO.parse_obj(response.json())
+            return parse_read(DisbursementClientAccountAPIDTO, response.json())
 
     def __str__(self):
         return str(self.data)
@@ -663,6 +664,13 @@ class ClientsAsyncModule(GenericAsyncModule):
     def renew_token(self):
         self.altscore_client.renew_token()
 
+    def reservation_manager(self, concurrency: int = 16, ttl: float = 900, reap_interval: float = 30,
+                            partner_id: Optional[str] = None):
+        """Same as ClientsSyncModule.reservation_manager, on the running event loop."""
+        from altscore.cms.model.reservations import ReservationManagerAsync
+        return ReservationManagerAsync(self.altscore_client, concurrency=concurrency, ttl=ttl,
+                                       reap_interval=reap_interval, partner_id=partner_id)
+
     @retry_on_401_async
     async def retrieve_by_external_id(self, external_id: str, partner_id: str = None) -> Optional[ClientAsync]:
         headers = self.build_headers()
@@ -680,7 +688,7 @@ class ClientsAsyncModule(GenericAsyncModule):
                     base_url=self.altscore_client._cms_base_url,
                     header_builder=self.build_headers,
                     renew_token=self.renew_token,
-                    data=self.retrieve_data_model.parse_obj(response.json())
+                    data=parse_read(self.retrieve_data_model, response.json())
                 )
             return None
 
@@ -688,7 +696,7 @@ class ClientsAsyncModule(GenericAsyncModule):
     async def create(self, new_entity_data: dict):
         partner_id = new_entity_data.get("partnerId")
         if partner_id is None:
-            partner_id = self.altscore_client.partner_id
+            partner_id = await self.altscore_client.resolve_partner_id()
             new_entity_data["partnerId"] = partner_id
 
         headers = self.build_headers()
@@ -719,7 +727,7 @@ class ClientsAsyncModule(GenericAsyncModule):
             )
             raise_for_status_improved(response)
             total_count = int(response.headers["x-total-count"])
-            resources = [ClientWithSummaryDTO.parse_obj(item) for item in response.json()]
+            resources = [parse_read(ClientWithSummaryDTO, item) for item in response.json()]
         return resources, total_count
 
 
@@ -739,6 +747,16 @@ class ClientsSyncModule(GenericSyncModule):
     def renew_token(self):
         self.altscore_client.renew_token()
 
+    def reservation_manager(self, concurrency: int = 16, ttl: float = 900, reap_interval: float = 30,
+                            partner_id: Optional[str] = None):
+        """
+        Pipelines credit line reservations of many clients over pooled connections, coalescing
+        queued operations and releasing reservations not committed within `ttl` seconds.
+        """
+        from altscore.cms.model.reservations import ReservationManagerSync
+        return ReservationManagerSync(self.altscore_client, concurrency=concurrency, ttl=ttl,
+                                      reap_interval=reap_interval, partner_id=partner_id)
+
     @retry_on_401
     def retrieve_by_external_id(self, external_id: str, partner_id: str = None) -> Optional[ClientSync]:
 
@@ -757,7 +775,7 @@ class ClientsSyncModule(GenericSyncModule):
                     base_url=self.altscore_client._cms_base_url,
                     header_builder=self.build_headers,
                     renew_token=self.renew_token,
-                    data=self.retrieve_data_model.parse_obj(response.json())
+                    data=parse_read(self.retrieve_data_model, response.json())
                 )
             return None
 
@@ -796,5 +814,5 @@ class ClientsSyncModule(GenericSyncModule):
             )
             raise_for_status_improved(response)
             total_count = int(response.headers["x-total-count"])
-            resources = [ClientWithSummaryDTO.parse_obj(item) for item in response.json()]
+            resources = [parse_read(ClientWithSummaryDTO, item) for item in response.json()]
         return resources, total_count
@@ -0,0 +1,252 @@
+import datetime as dt
+from typing import Dict, Iterable, Optional, Sequence, Union
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("Debt columns require numpy. Install with \"pip install 'altscore[fast]'\"")
+
+# lower bound (inclusive) of every past due bucket, in days; debts below the first are current
+DEFAULT_DPD_BINS = (1, 31, 61, 91, 121)
+DEFAULT_DPD_LABELS = ("current", "1-30", "31-60", "61-90", "91-120", "120+")
+CASH_FLOW_FREQUENCIES = ("D", "W", "M")
+
+_BALANCE_PARTS = ("principal", "interest", "fees", "taxes", "penalties", "total")
+_SCHEDULE_PARTS = ("principal", "interest", "fees", "taxes", "total")
+_TEXT_COLUMNS = ("id", "reference_id", "client_id", "external_id", "status", "sub_status", "currency")
+_FLOAT_COLUMNS = ("closing_balance", "days_past_due", "max_days_past_due") + tuple(
+    f"balance_{part}" for part in _BALANCE_PARTS
+)
+_DATE_COLUMNS = ("disbursement_date", "created_at")
+# outstanding amounts below this are rounding noise, not an unpaid installment
+_EPSILON = 0.005
+
+DateLike = Union[str, dt.date, np.datetime64]
+
+
+def _amount(money: Optional[Dict]) -> float:
+    if not money or money.get("amount") in (None, ""):
+        return np.nan
+    return float(money["amount"])
+
+
+def _date(value: Optional[str]) -> str:
+    # "2024-01-31" and "2024-01-31T12:00:00Z" alike, None becomes NaT
+    return value[:10] if value else "NaT"
+
+
+def _day(value: Optional[DateLike]) -> np.datetime64:
+    if value is None:
+        return np.datetime64(dt.date.today(), "D")
+    if isinstance(value, str):
+        return np.datetime64(value[:10], "D")
+    return np.datetime64(value, "D")
+
+
+def _raw_debt(debt) -> Dict:
+    """The API JSON of a debt given as a dict, a DebtAPIDTO or a DebtSync/DebtAsync."""
+    if isinstance(debt, dict):
+        return debt
+    data = getattr(debt, "data", debt)
+    return data.dict(by_alias=True)
+
+
+class DebtColumns:
+    """
+    Columnar view of many debts: one NumPy array per field in three tables that share the row
+    number of the debt (`debt_index`):
+
+    - debts: one row per debt with its balance, terms and days past due as reported by the API.
+    - schedule: one row per installment, sorted by debt and installment number.
+    - transactions: one row per transaction.
+
+    Amounts are float64 and dates datetime64[D] (NaT when missing). The helpers allocate what was
+    paid to the oldest installments first: the paid part of the schedule of a debt is its
+    scheduled total minus its outstanding balance without penalties.
+    """
+
+    def __init__(self, debts: Dict[str, np.ndarray], schedule: Dict[str, np.ndarray],
+                 transactions: Dict[str, np.ndarray]):
+        self.debts = debts
+        self.schedule = schedule
+        self.transactions = transactions
+        self._outstanding = None
+
+    @classmethod
+    def from_records(cls, debts: Iterable) -> "DebtColumns":
+        """Builds the columns in a single pass over API dicts, DebtAPIDTO or DebtSync/DebtAsync objects."""
+        d = {k: [] for k in _TEXT_COLUMNS + _FLOAT_COLUMNS + _DATE_COLUMNS + ("installments",)}
+        s = {k: [] for k in ("debt_index", "number", "due_date")}
+        for part in _SCHEDULE_PARTS:
+            s[part] = []
+        t = {k: [] for k in ("debt_index", "transaction_id", "type", "date", "amount")}
+
+        for debt_index, debt in enumerate(debts):
+            debt = _raw_debt(debt)
+            balance = debt.get("balance") or {}
+            terms = debt.get("terms") or {}
+            client = debt.get("client") or {}
+            total = balance.get("total") or debt.get("closingBalance") or {}
+            d["id"].append(debt.get("debtId"))
+            d["reference_id"].append(debt.get("referenceId"))
+            d["client_id"].append(client.get("clientId"))
+            d["external_id"].append(client.get("externalId"))
+            d["status"].append(debt.get("status"))
+            d["sub_status"].append(debt.get("subStatus"))
+            d["currency"].append(total.get("currency"))
+            d["closing_balance"].append(_amount(debt.get("closingBalance")))
+            d["days_past_due"].append(np.nan if debt.get("daysPastDue") is None else debt["daysPastDue"])
+            d["max_days_past_due"].append(np.nan if debt.get("maxDaysPastDue") is None else debt["maxDaysPastDue"])
+            d["installments"].append(terms.get("installments") or 0)
+            d["disbursement_date"].append(_date(terms.get("disbursementDate")))
+            d["created_at"].append(_date(debt.get("createdAt")))
+            for part in _BALANCE_PARTS:
+                d[f"balance_{part}"].append(_amount(balance.get(part)))
+            for installment in debt.get("schedule") or []:
+                amounts = installment.get("originalAmounts") or {}
+                s["debt_index"].append(debt_index)
+                s["number"].append(installment.get("number") or 0)
+                s["due_date"].append(_date(installment.get("dueDate")))
+                for part in _SCHEDULE_PARTS:
+                    s[part].append(_amount(amounts.get(part)))
+            for transaction in debt.get("transactions") or []:
+                t["debt_index"].append(debt_index)
+                t["transaction_id"].append(transaction.get("transactionId"))
+                t["type"].append(transaction.get("type"))
+                t["date"].append(_date(transaction.get("date")))
+                t["amount"].append(_amount(transaction.get("amount")))
+
+        debt_columns = {k: np.array(d[k], dtype=object) for k in _TEXT_COLUMNS}
+        debt_columns.update({k: np.array(d[k], dtype=np.float64) for k in _FLOAT_COLUMNS})
+        debt_columns.update({k: np.array(d[k], dtype="datetime64[D]") for k in _DATE_COLUMNS})
+        debt_columns["installments"] = np.array(d["installments"], dtype=np.int32)
+
+        schedule = {
+            "debt_index": np.array(s["debt_index"], dtype=np.int64),
+            "number": np.array(s["number"], dtype=np.int32),
+            "due_date": np.array(s["due_date"], dtype="datetime64[D]"),
+        }
+        for part in _SCHEDULE_PARTS:
+            schedule[part] = np.array(s[part], dtype=np.float64)
+        order = np.lexsort((schedule["number"], schedule["debt_index"]))
+        schedule = {k: v[order] for k, v in schedule.items()}
+
+        transactions = {
+            "debt_index": np.array(t["debt_index"], dtype=np.int64),
+            "transaction_id": np.array(t["transaction_id"], dtype=object),
+            "type": np.array(t["type"], dtype=object),
+            "date": np.array(t["date"], dtype="datetime64[D]"),
+            "amount": np.array(t["amount"], dtype=np.float64),
+        }
+        return cls(debt_columns, schedule, transactions)
+
+    def __len__(self):
+        return len(self.debts["id"])
+
+    def __repr__(self):
+        return (f"<DebtColumns debts={len(self)} installments={len(self.schedule['debt_index'])} "
+                f"transactions={len(self.transactions['debt_index'])}>")
+
+    def _per_debt(self, index: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        return np.bincount(index, weights=weights, minlength=len(self))
+
+    def installment_outstanding(self) -> np.ndarray:
+        """Unpaid amount of every installment of the schedule table."""
+        if self._outstanding is None:
+            index = self.schedule["debt_index"]
+            totals = np.nan_to_num(self.schedule["total"])
+            scheduled = self._per_debt(index, totals)
+            balance = np.nan_to_num(self.debts["balance_total"]) - np.nan_to_num(self.debts["balance_penalties"])
+            paid = np.clip(scheduled - balance, 0, None)
+            # cumulative scheduled amount within each debt, up to and including the installment
+            cumulative = np.cumsum(totals)
+            before = np.concatenate(([0.0], cumulative))[np.searchsorted(index, np.arange(len(self)))]
+            cumulative = cumulative - before[index]
+            self._outstanding = np.clip(cumulative - paid[index], 0, totals)
+        return self._outstanding
+
+    def overdue_balance(self, as_of: Optional[DateLike] = None) -> np.ndarray:
+        """Unpaid amount of the installments of each debt due before `as_of` (today by default)."""
+        overdue = self.schedule["due_date"] < _day(as_of)
+        return self._per_debt(self.schedule["debt_index"], self.installment_outstanding() * overdue)
+
+    def days_past_due(self, as_of: Optional[DateLike] = None) -> np.ndarray:
+        """Days since the oldest unpaid due date of each debt at `as_of` (today by default), 0 when current."""
+        as_of = _day(as_of)
+        due_dates = self.schedule["due_date"]
+        unpaid = (self.installment_outstanding() > _EPSILON) & (due_dates < as_of)
+        oldest = np.full(len(self), as_of.astype(np.int64), dtype=np.int64)
+        np.minimum.at(oldest, self.schedule["debt_index"][unpaid], due_dates[unpaid].astype(np.int64))
+        return as_of.astype(np.int64) - oldest
+
+    def _bucket_index(self, as_of: Optional[DateLike], bins: Sequence[int]) -> np.ndarray:
+        dpd = self.days_past_due(as_of)
+        if as_of is None:
+            reported = self.debts["days_past_due"]
+            dpd = np.where(np.isnan(reported), dpd, reported)
+        return np.digitize(dpd, bins)
+
+    def dpd_buckets(self, as_of: Optional[DateLike] = None, bins: Sequence[int] = DEFAULT_DPD_BINS,
+                    labels: Sequence[str] = DEFAULT_DPD_LABELS) -> np.ndarray:
+        """
+        Past due bucket label of each debt. `bins` are the inclusive lower bounds of the past due
+        buckets and `labels` has one more entry, for the debts below the first bin. With `as_of`
+        None the days past due reported by the API are used when present.
+        """
+        if len(labels) != len(bins) + 1:
+            raise ValueError("labels must have one more entry than bins")
+        return np.asarray(labels, dtype=object)[self._bucket_index(as_of, bins)]
+
+    def bucket_summary(self, as_of: Optional[DateLike] = None, bins: Sequence[int] = DEFAULT_DPD_BINS,
+                       labels: Sequence[str] = DEFAULT_DPD_LABELS) -> Dict[str, Dict[str, float]]:
+        """Number of debts, outstanding balance and overdue balance by past due bucket."""
+        if len(labels) != len(bins) + 1:
+            raise ValueError("labels must have one more entry than bins")
+        buckets = self._bucket_index(as_of, bins)
+        counts = np.bincount(buckets, minlength=len(labels))
+        balances = np.bincount(buckets, weights=np.nan_to_num(self.debts["balance_total"]), minlength=len(labels))
+        overdue = np.bincount(buckets, weights=self.overdue_balance(as_of), minlength=len(labels))
+        return {
+            label: {"debts": int(counts[i]), "balance": float(balances[i]), "overdue": float(overdue[i])}
+            for i, label in enumerate(labels)
+        }
+
+    def expected_cash_flows(self, as_of: Optional[DateLike] = None, freq: str = "M") -> Dict[str, np.ndarray]:
+        """
+        Unpaid installment amounts due from `as_of` (today by default) on, summed by due period
+        ("D", "W" or "M") and currency. Returns the columns "period", "currency" and "amount".
+        """
+        if freq not in CASH_FLOW_FREQUENCIES:
+            raise ValueError(f"freq must be one of {CASH_FLOW_FREQUENCIES}")
+        upcoming = self.schedule["due_date"] >= _day(as_of)
+        index = self.schedule["debt_index"][upcoming]
+        periods = self.schedule["due_date"][upcoming].astype(f"datetime64[{freq}]")
+        currencies = self.debts["currency"][index].astype(str)
+        keys, inverse = np.unique(np.rec.fromarrays([periods.astype(np.int64), currencies]), return_inverse=True)
+        amounts = np.bincount(inverse.ravel(), weights=self.installment_outstanding()[upcoming], minlength=len(keys))
+        return {
+            "period": keys.f0.astype(f"datetime64[{freq}]"),
+            "currency": keys.f1.astype(object),
+            "amount": amounts,
+        }
+
+    def _table(self, table: str) -> Dict[str, np.ndarray]:
+        if table not in ("debts", "schedule", "transactions"):
+            raise ValueError('table must be "debts", "schedule" or "transactions"')
+        columns = getattr(self, table)
+        if table == "debts":
+            return columns
+        # installments and transactions carry the debt id so the tables can be joined
+        return {"debt_id": self.debts["id"][columns["debt_index"]], **columns}
+
+    def to_frame(self, table: str = "debts"):
+        """One of the tables as a pandas DataFrame."""
+        import pandas as pd
+        return pd.DataFrame(self._table(table))
+
+    def to_arrow(self, table: str = "debts"):
+        """One of the tables as a pyarrow Table."""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Arrow export requires pyarrow. Install with \"pip install 'altscore[fast]'\"")
+        return pa.table({k: pa.array(v) for k, v in self._table(table).items()})
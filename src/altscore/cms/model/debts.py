@@ -6,6 +6,7 @@ from altscore.cms.model.generics import GenericSyncModule, GenericAsyncModule
 from altscore.cms.model.common import Money, Schedule, Terms
 
 import datetime as dt
+from altscore.common.fast_models import parse_read
 
 
 class Balance(BaseModel):
@@ -173,7 +174,7 @@ class DebtAsync(DebtBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [Payment.parse_obj(e) for e in response.json()]
+            return [parse_read(Payment, e) for e in response.json()]
 
     @retry_on_401_async
     async def submit_payment(self, amount: str, currency: str, reference_id: str, notes: Optional[str] = None,
@@ -208,7 +209,7 @@ class DebtAsync(DebtBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [Penalty.parse_obj(e) for e in response.json()]
+            return [parse_read(Penalty, e) for e in response.json()]
 
     @retry_on_401_async
     async def apply_waiver(self, waiver: dict) -> None:
@@ -248,7 +249,7 @@ class DebtSync(DebtBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [Payment.parse_obj(e) for e in response.json()]
+            return [parse_read(Payment, e) for e in response.json()]
 
     @retry_on_401
     def submit_payment(self, amount: str, currency: str, reference_id: str, notes: Optional[str] = None,
@@ -283,7 +284,7 @@ class DebtSync(DebtBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [Penalty.parse_obj(e) for e in response.json()]
+            return [parse_read(Penalty, e) for e in response.json()]
 
     @retry_on_401
     def apply_waiver(self, waiver: dict) -> None:
@@ -343,6 +344,42 @@ class DebtsAsyncModule(GenericAsyncModule):
             response_json = response.json()
             return response_json.get("debtId")
 
+    async def columns(self, concurrency: int = 8, **kwargs):
+        """
+        Every debt matching the filters (e.g. status="active") as a DebtColumns: NumPy columns for
+        the debts, their schedules and transactions with vectorized past due and cash flow helpers.
+        The raw JSON is paged in parallel and never parsed into DebtAPIDTO.
+        """
+        from altscore.cms.model.debt_columns import DebtColumns
+        return DebtColumns.from_records([debt async for debt in self.iter_raw(concurrency=concurrency, **kwargs)])
+
+    async def to_frame(self, table: str = "debts", concurrency: int = 8, **kwargs):
+        """The "debts", "schedule" or "transactions" table of the filtered debts as a pandas DataFrame."""
+        return (await self.columns(concurrency=concurrency, **kwargs)).to_frame(table)
+
+    async def to_arrow(self, table: str = "debts", concurrency: int = 8, **kwargs):
+        """The "debts", "schedule" or "transactions" table of the filtered debts as a pyarrow Table."""
+        return (await self.columns(concurrency=concurrency, **kwargs)).to_arrow(table)
+
+    async def submit_payments(self, payments, concurrency: int = 8, idempotency_key_field: str = "referenceId",
+                              match_open_debts: Optional[bool] = None, checkpoint_path: Optional[str] = None,
+                              dry_run: bool = False, max_retries: int = 3, partner_id: Optional[str] = None):
+        """
+        Submits a file of payments (CSV or JSON lines path, iterable or async iterable of dicts)
+        with up to `concurrency` requests in flight and returns a PaymentReconciliationReport.
+        Rows without debtId are matched to an open debt by debtReferenceId, clientId or externalId.
+        `idempotency_key_field` is the column used as the payment referenceId: it is never
+        submitted twice, also across runs sharing `checkpoint_path`.
+        """
+        from altscore.cms.model.payment_reconciliation import PaymentSubmissionAsync
+        if partner_id is None:
+            partner_id = await self.altscore_client.resolve_partner_id()
+        submission = PaymentSubmissionAsync(
+            self.altscore_client, self, concurrency=concurrency, idempotency_key_field=idempotency_key_field,
+            max_retries=max_retries, checkpoint_path=checkpoint_path, dry_run=dry_run, partner_id=partner_id
+        )
+        return await submission.run(payments, match_open_debts=match_open_debts)
+
 
 class DebtsSyncModule(GenericSyncModule):
 
@@ -380,3 +417,37 @@ class DebtsSyncModule(GenericSyncModule):
             raise_for_status_improved(response)
             response_json = response.json()
             return response_json.get("debtId")
+
+    def columns(self, concurrency: int = 8, **kwargs):
+        """
+        Every debt matching the filters (e.g. status="active") as a DebtColumns: NumPy columns for
+        the debts, their schedules and transactions with vectorized past due and cash flow helpers.
+        The raw JSON is paged in parallel and never parsed into DebtAPIDTO.
+        """
+        from altscore.cms.model.debt_columns import DebtColumns
+        return DebtColumns.from_records(self.iter_raw(concurrency=concurrency, **kwargs))
+
+    def to_frame(self, table: str = "debts", concurrency: int = 8, **kwargs):
+        """The "debts", "schedule" or "transactions" table of the filtered debts as a pandas DataFrame."""
+        return self.columns(concurrency=concurrency, **kwargs).to_frame(table)
+
+    def to_arrow(self, table: str = "debts", concurrency: int = 8, **kwargs):
+        """The "debts", "schedule" or "transactions" table of the filtered debts as a pyarrow Table."""
+        return self.columns(concurrency=concurrency, **kwargs).to_arrow(table)
+
+    def submit_payments(self, payments, concurrency: int = 8, idempotency_key_field: str = "referenceId",
+                        match_open_debts: Optional[bool] = None, checkpoint_path: Optional[str] = None,
+                        dry_run: bool = False, max_retries: int = 3, partner_id: Optional[str] = None):
+        """
+        Submits a file of payments (CSV or JSON lines path, or an iterable of dicts) with up to
+        `concurrency` requests in flight and returns a PaymentReconciliationReport.
+        Rows without debtId are matched to an open debt by debtReferenceId, clientId or externalId.
+        `idempotency_key_field` is the column used as the payment referenceId: it is never
+        submitted twice, also across runs sharing `checkpoint_path`.
+        """
+        from altscore.cms.model.payment_reconciliation import PaymentSubmissionSync
+        submission = PaymentSubmissionSync(
+            self.altscore_client, self, concurrency=concurrency, idempotency_key_field=idempotency_key_field,
+            max_retries=max_retries, checkpoint_path=checkpoint_path, dry_run=dry_run, partner_id=partner_id
+        )
+        return submission.run(payments, match_open_debts=match_open_debts)
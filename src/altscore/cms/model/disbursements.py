@@ -4,6 +4,7 @@ import httpx
 
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
 from altscore.cms.model.generics import GenericAsyncModule, GenericSyncModule
+from altscore.cms.model.mirror import ResourceMirrorAsync, ResourceMirrorSync
 
 class AmountInfo(BaseModel):
     amount: str = Field(alias="amount")
@@ -169,6 +170,12 @@ class DisbursementAsyncModule(GenericAsyncModule):
             resource="disbursements"
         )
 
+    def mirror(self, path: str, lookback_seconds: float = 300, per_page: int = 100, concurrency: int = 8,
+               max_retries: int = 3) -> ResourceMirrorAsync:
+        """Same as DisbursementSyncModule.mirror, with an async sync()."""
+        return ResourceMirrorAsync(self, path, lookback_seconds=lookback_seconds, per_page=per_page,
+                                   concurrency=concurrency, max_retries=max_retries)
+
 class DisbursementSyncModule(GenericSyncModule):
     def __init__(self, altscore_client):
         super().__init__(
@@ -178,4 +185,13 @@ class DisbursementSyncModule(GenericSyncModule):
             create_data_model=None,
             update_data_model=None,
             resource="disbursements"
-        )
\ No newline at end of file
+        )
+
+    def mirror(self, path: str, lookback_seconds: float = 300, per_page: int = 100, concurrency: int = 8,
+               max_retries: int = 3) -> ResourceMirrorSync:
+        """
+        Local SQLite mirror of the disbursements at `path`: mirror.sync() pulls only what was updated since
+        the last sync and mirror.query(status=..., client_id=...) reads without calling the API.
+        """
+        return ResourceMirrorSync(self, path, lookback_seconds=lookback_seconds, per_page=per_page,
+                                  concurrency=concurrency, max_retries=max_retries)
@@ -0,0 +1,339 @@
+import datetime as dt
+import itertools
+import json
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("DPA simulation requires numpy. Install with \"pip install 'altscore[fast]'\"")
+from dateutil.parser import parse as date_parser
+from loguru import logger
+from altscore.cms.model.business_calendar import BusinessCalendar, select_calendars
+from altscore.cms.model.calendars import DPACalendarAPIDTO
+
+AMORTIZATION_TYPES = ("french",)
+_COMPONENTS = ("principal", "interest", "taxes", "fees", "total")
+
+ArrayLike = Union[float, int, str, Sequence, np.ndarray]
+
+
+class DPATermsParams:
+    """
+    The schedule parameters of a DPA: `rate` is charged every `rate_period` days, installments are
+    due every `repay_every` days from the disbursement and `interest_tax` is charged on interest.
+
+    Only french amortization (equal installments, interest on the outstanding principal) is
+    modelled, other amortization types raise ValueError.
+    """
+
+    def __init__(self, amortization_type: str, installments: int, repay_every: int, rate: float,
+                 rate_period: int, interest_tax: float = 0.0):
+        amortization_type = amortization_type.lower()
+        if amortization_type not in AMORTIZATION_TYPES:
+            raise ValueError(f"amortization_type must be one of {AMORTIZATION_TYPES}, got {amortization_type}")
+        self.amortization_type = amortization_type
+        self.installments = installments
+        self.repay_every = repay_every
+        self.rate = rate
+        self.rate_period = rate_period
+        self.interest_tax = interest_tax
+
+    @classmethod
+    def from_terms(cls, terms, ignore_fees: bool = False) -> "DPATermsParams":
+        """
+        From the Terms of a DPA flow or debt, as a model or API dict. Fees are not modelled, terms
+        with fees raise ValueError unless `ignore_fees`, which simulates them without the fees.
+        """
+        if isinstance(terms, dict):
+            from altscore.cms.model.common import Terms
+            terms = Terms.parse_obj(terms)
+        fees = [fee.name or fee.calculation_type for fee in terms.fees or [] if fee is not None]
+        if fees and not ignore_fees:
+            raise ValueError(f"Terms have fees {fees}, which are not modelled; pass ignore_fees=True "
+                             f"to simulate without them")
+        if fees:
+            logger.warning("Simulating terms without their fees {}", fees)
+        return cls(terms.amortization_type, terms.installments, terms.repayEvery, float(terms.interest_rate.rate),
+                   terms.interest_rate.period, terms.interest_tax)
+
+    @classmethod
+    def from_product(cls, product, rate: Optional[float] = None) -> "DPATermsParams":
+        """
+        From a DPAProductAPIDTO. The rate is read from the "rate" of the interest rate tier unless
+        given, products with rates by amount need it explicitly.
+        """
+        if rate is None:
+            rate = product.interest_rate.tier.get("rate")
+            if rate is None:
+                raise ValueError(f"Product {product.id} has no flat rate in its tier, pass rate explicitly")
+        return cls(product.amortization_type, product.installments, product.repay_every, float(rate),
+                   product.interest_rate.period, product.interest_tax)
+
+
+class DPASimulationResult:
+    """
+    Schedules of many scenarios as (scenarios, installments) arrays padded to the longest
+    schedule; `mask` marks the installments that exist.
+    """
+
+    def __init__(self, inputs: Dict[str, np.ndarray], due_date: np.ndarray, mask: np.ndarray,
+                 components: Dict[str, np.ndarray], currency: Optional[str] = None):
+        self.inputs = inputs
+        self.due_date = due_date
+        self.mask = mask
+        self.principal = components["principal"]
+        self.interest = components["interest"]
+        self.taxes = components["taxes"]
+        self.fees = components["fees"]
+        self.total = components["total"]
+        self.currency = currency
+
+    def __len__(self):
+        return self.mask.shape[0]
+
+    def __repr__(self):
+        return f"<DPASimulationResult scenarios={len(self)} max_installments={self.mask.shape[1]}>"
+
+    def totals(self) -> Dict[str, np.ndarray]:
+        """Sum of every component per scenario."""
+        return {name: getattr(self, name).sum(axis=1) for name in _COMPONENTS}
+
+    def schedule(self, scenario: int) -> List[Dict]:
+        """The schedule of one scenario in the shape of the API (dueDate, number, originalAmounts)."""
+        schedule = []
+        for k in np.flatnonzero(self.mask[scenario]):
+            schedule.append({
+                "dueDate": str(self.due_date[scenario, k]),
+                "number": int(k) + 1,
+                "originalAmounts": {
+                    name: {"amount": f"{getattr(self, name)[scenario, k]:.2f}", "currency": self.currency}
+                    for name in _COMPONENTS
+                },
+            })
+        return schedule
+
+    def to_frame(self):
+        """One row per scenario with its inputs and totals, as a pandas DataFrame."""
+        import pandas as pd
+        totals = {f"total_{name}": values for name, values in self.totals().items()}
+        return pd.DataFrame({**self.inputs, "first_due_date": self.due_date[:, 0], **totals})
+
+
+class DPASimulator:
+    """
+    Computes DPA installment schedules locally for many scenarios at once, for pricing sweeps
+    that would take one server simulation each.
+
+    Every argument of simulate is a scalar or an array and they are broadcast together, so a
+    sweep is `simulate(amount=[1000, 5000], rate=[[0.03], [0.04], [0.05]])` or one of the
+    scenarios of grid(). Due dates are rolled forward to the next business day of the calendars.
+    Amounts are rounded to cents and the last installment absorbs the principal rounding.
+
+    The engine mirrors the server's arithmetic as far as it is documented by the terms; check
+    it against recorded server simulations with conformance_report before relying on it.
+    """
+
+    def __init__(self, terms: DPATermsParams,
+                 calendars: Optional[Union[BusinessCalendar, Sequence[DPACalendarAPIDTO]]] = None,
+                 currency: Optional[str] = None):
+        self.terms = terms
+        self.currency = currency
+        if not isinstance(calendars, BusinessCalendar):
+            calendars = BusinessCalendar.from_dpa_calendars(calendars or [])
+        self.calendar = calendars
+
+    @classmethod
+    def from_partner_data(cls, settings, product,
+                          calendars: Union[BusinessCalendar, Sequence[DPACalendarAPIDTO]],
+                          segmentation=None, rate: Optional[float] = None) -> "DPASimulator":
+        """
+        From the DPASettingsAPIDTO, DPAProductAPIDTO, calendars (a BusinessCalendar or the
+        DPACalendarAPIDTO list) and optionally the DPASegmentationAPIDTO of a partner. Only the
+        calendars of the calendar type of the settings are used, and the product must be the one
+        of the segmentation when given.
+        """
+        defaults = settings.defaults if settings is not None else None
+        if segmentation is not None and segmentation.product_id != product.id:
+            raise ValueError(f"Segmentation {segmentation.id} assigns product {segmentation.product_id}, "
+                             f"not {product.id}")
+        calendar_type = defaults.calendar_type if defaults is not None else None
+        if not isinstance(calendars, BusinessCalendar):
+            calendars = select_calendars(calendars, calendar_type)
+        currency = defaults.currency if defaults is not None else None
+        return cls(DPATermsParams.from_product(product, rate=rate), calendars=calendars, currency=currency)
+
+    @staticmethod
+    def grid(**axes: Sequence) -> Dict[str, np.ndarray]:
+        """Cartesian product of the values of every axis, as simulate keyword arguments."""
+        names = list(axes)
+        rows = list(itertools.product(*(axes[name] for name in names)))
+        return {name: np.array([row[i] for row in rows]) for i, name in enumerate(names)}
+
+    def simulate(self, amount: ArrayLike, disbursement_date: ArrayLike = None, rate: ArrayLike = None,
+                 installments: ArrayLike = None, repay_every: ArrayLike = None,
+                 interest_tax: ArrayLike = None, rate_period: ArrayLike = None) -> DPASimulationResult:
+        """Schedules of every scenario; arguments left as None take the value of the terms."""
+        terms = self.terms
+        if disbursement_date is None:
+            disbursement_date = dt.date.today().isoformat()
+        inputs = dict(zip(
+            ("amount", "disbursement_date", "rate", "installments", "repay_every", "interest_tax", "rate_period"),
+            np.broadcast_arrays(
+                np.asarray(amount, dtype=np.float64),
+                np.asarray(disbursement_date, dtype="datetime64[D]"),
+                np.asarray(terms.rate if rate is None else rate, dtype=np.float64),
+                np.asarray(terms.installments if installments is None else installments, dtype=np.int64),
+                np.asarray(terms.repay_every if repay_every is None else repay_every, dtype=np.int64),
+                np.asarray(terms.interest_tax if interest_tax is None else interest_tax, dtype=np.float64),
+                np.asarray(terms.rate_period if rate_period is None else rate_period, dtype=np.int64),
+            )
+        ))
+        inputs = {name: values.ravel() for name, values in inputs.items()}
+        if np.any(inputs["installments"] < 1):
+            raise ValueError("installments must be at least 1")
+        if np.any(inputs["rate_period"] < 1):
+            raise ValueError("rate_period must be at least 1 day")
+        amount = inputs["amount"][:, None]
+        n = inputs["installments"][:, None]
+        k = np.arange(1, int(n.max()) + 1)[None, :]
+        mask = k <= n
+
+        due_date = inputs["disbursement_date"][:, None] + k * inputs["repay_every"][:, None]
+        due_date = np.where(mask, due_date, inputs["disbursement_date"][:, None])
+        due_date = self.calendar.next_due_dates(due_date)
+
+        # french amortization, the only type DPATermsParams accepts
+        r = (inputs["rate"] * inputs["repay_every"] / inputs["rate_period"])[:, None]
+        growth = (1 + r) ** (k - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            payment = np.where(r > 0, amount * r / (1 - (1 + r) ** -n), amount / n)
+            outstanding = np.where(r > 0, amount * growth - payment * (growth - 1) / r, amount - payment * (k - 1))
+        interest = outstanding * r
+        principal = payment - interest
+
+        principal = np.where(mask, np.round(principal, 2), 0.0)
+        # the last installment takes the principal that rounding left over
+        last = (n - 1).ravel()
+        rows = np.arange(len(last))
+        principal[rows, last] += np.round(amount.ravel() - principal.sum(axis=1), 2)
+        interest = np.where(mask, np.round(interest, 2), 0.0)
+        taxes = np.round(interest * inputs["interest_tax"][:, None], 2)
+        # terms with fees are refused unless read with ignore_fees
+        fees = np.zeros(mask.shape)
+        components = {
+            "principal": principal,
+            "interest": interest,
+            "taxes": taxes,
+            "fees": fees,
+            "total": np.round(principal + interest + taxes + fees, 2),
+        }
+        return DPASimulationResult(inputs, due_date, mask, components, currency=self.currency)
+
+    def simulate_requests(self, requests: Sequence[Dict], ignore_fees: bool = False) -> DPASimulationResult:
+        """
+        Simulates payloads of DPAFlowsSyncModule.simulate (amount, disbursementDate and optional
+        terms); `ignore_fees` is passed to DPATermsParams.from_terms.
+        """
+        amounts, dates, rates, installments, repay_every, taxes, rate_periods = [], [], [], [], [], [], []
+        for request in requests:
+            terms = DPATermsParams.from_terms(request["terms"], ignore_fees=ignore_fees) \
+                if request.get("terms") else self.terms
+            disbursement_date = request.get("disbursementDate") or request.get("disbursement_date")
+            amounts.append(float(request["amount"]["amount"]))
+            dates.append(date_parser(disbursement_date).date().isoformat() if disbursement_date
+                         else dt.date.today().isoformat())
+            rates.append(terms.rate)
+            installments.append(terms.installments)
+            repay_every.append(terms.repay_every)
+            taxes.append(terms.interest_tax)
+            rate_periods.append(terms.rate_period)
+        return self.simulate(amounts, dates, rates, installments, repay_every, taxes, rate_periods)
+
+
+class DPAConformanceReport:
+    """Differences between local and recorded server schedules, one entry per recording."""
+
+    def __init__(self, results: List[Dict], tolerance: float):
+        self.results = results
+        self.tolerance = tolerance
+
+    @property
+    def mismatches(self) -> List[Dict]:
+        return [r for r in self.results if not r["conformant"]]
+
+    @property
+    def is_conformant(self) -> bool:
+        return not self.mismatches
+
+    def __repr__(self):
+        return f"<DPAConformanceReport recordings={len(self.results)} mismatches={len(self.mismatches)}>"
+
+
+def record_simulations(dpas_module, requests: Sequence[Dict]) -> List[Dict]:
+    """
+    Runs `requests` through the server simulation (DPAFlowsSyncModule.simulate) and returns
+    {"request", "response"} recordings to store as JSON and replay with conformance_report.
+    """
+    recordings = []
+    for request in requests:
+        response = dpas_module.simulate(dict(request))
+        recordings.append({"request": request, "response": response.dict(by_alias=True)})
+    return recordings
+
+
+def save_recordings(path: str, simulator: DPASimulator, recordings: Sequence[Dict]):
+    """
+    Writes `recordings` as JSON with the terms, business calendar and currency of `simulator`,
+    so load_recordings replays them offline.
+    """
+    calendar = simulator.calendar
+    with open(path, "w") as f:
+        json.dump({
+            "terms": vars(simulator.terms),
+            "calendar": {"weekmask": calendar.weekmask, "holidays": [str(h) for h in calendar.holidays]},
+            "currency": simulator.currency,
+            "recordings": list(recordings),
+        }, f, indent=2, default=str)
+
+
+def load_recordings(path: str) -> Tuple[DPASimulator, List[Dict]]:
+    """The simulator and recordings written by save_recordings."""
+    with open(path) as f:
+        data = json.load(f)
+    calendar = BusinessCalendar(**data["calendar"])
+    simulator = DPASimulator(DPATermsParams(**data["terms"]), calendars=calendar, currency=data.get("currency"))
+    return simulator, data["recordings"]
+
+
+def conformance_report(simulator: DPASimulator, recordings: Sequence[Dict],
+                       tolerance: float = 0.01, ignore_fees: bool = False) -> DPAConformanceReport:
+    """
+    Compares the local schedules of the requests of `recordings` with the schedules the server
+    returned: due dates must match and every amount must be within `tolerance`. Each request is
+    simulated with the terms the server answered with, so recordings with fees raise ValueError
+    unless `ignore_fees`.
+    """
+    local = simulator.simulate_requests(
+        [{**recording["request"], "terms": recording["response"]["terms"]}
+         for recording in recordings],
+        ignore_fees=ignore_fees
+    )
+    results = []
+    for i, recording in enumerate(recordings):
+        expected = recording["response"]["schedule"]
+        actual = local.schedule(i)
+        differences = []
+        if len(expected) != len(actual):
+            differences.append({"field": "installments", "expected": len(expected), "actual": len(actual)})
+        for e, a in zip(sorted(expected, key=lambda s: s["number"]), actual):
+            if str(e["dueDate"])[:10] != a["dueDate"]:
+                differences.append({"number": e["number"], "field": "dueDate",
+                                    "expected": str(e["dueDate"])[:10], "actual": a["dueDate"]})
+            for name in ("principal", "interest", "taxes", "fees", "total"):
+                expected_amount = float(e["originalAmounts"][name]["amount"])
+                actual_amount = float(a["originalAmounts"][name]["amount"])
+                if abs(expected_amount - actual_amount) > tolerance:
+                    differences.append({"number": e["number"], "field": name,
+                                        "expected": expected_amount, "actual": actual_amount})
+        results.append({"index": i, "conformant": not differences, "differences": differences})
+    return DPAConformanceReport(results, tolerance)
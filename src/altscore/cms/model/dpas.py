@@ -330,6 +330,37 @@ class DPAFlowsAsyncModule(GenericAsyncModule):
             raise_for_status_improved(response)
             return [DPAFlowAPIDTO.parse_obj(item) for item in response.json()]
 
+    async def local_simulator(self, partner_id: Optional[str] = None, product_id: Optional[str] = None,
+                        rate: Optional[float] = None):
+        """
+        A DPASimulator for the partner (the partner of the credentials by default) that runs
+        simulations offline: it uses the DPA settings, the product (the default product or the
+        one of the default segmentation unless `product_id` is given) and the business calendar
+        of its DPA calendars, cached by the partners module.
+        """
+        from altscore.cms.model.dpa_simulation import DPASimulator
+        from altscore.cms.model.partners import PartnersAsyncModule
+        partner_id = partner_id or await self.altscore_client.resolve_partner_id()
+        partners = PartnersAsyncModule(self.altscore_client)
+        partner = await partners.retrieve(partner_id)
+        if partner is None:
+            raise ValueError(f"Partner {partner_id} not found")
+        settings = await partners.get_dpa_settings(partner_id)
+        segmentation = None
+        if product_id is None and settings.defaults is not None:
+            if settings.defaults.segmentation_id is not None:
+                segmentation = await partner.get_dpa_segmentation(settings.defaults.segmentation_id)
+            product_id = segmentation.product_id if segmentation is not None else settings.defaults.product_id
+        if product_id is None:
+            raise ValueError(f"Partner {partner_id} has no default DPA product, pass product_id")
+        product = await partner.get_dpa_product(product_id)
+        if product is None:
+            raise ValueError(f"DPA product {product_id} not found")
+        calendar_type = settings.defaults.calendar_type if settings.defaults is not None else None
+        business_calendar = await partners.business_calendar(partner_id, calendar_type=calendar_type)
+        return DPASimulator.from_partner_data(settings, product, business_calendar,
+                                              segmentation=segmentation, rate=rate)
+
 
 class DPAFlowsSyncModule(GenericSyncModule):
 
@@ -410,3 +441,34 @@ class DPAFlowsSyncModule(GenericSyncModule):
             )
             raise_for_status_improved(response)
             return [DPAFlowAPIDTO.parse_obj(item) for item in response.json()]
+
+    def local_simulator(self, partner_id: Optional[str] = None, product_id: Optional[str] = None,
+                        rate: Optional[float] = None):
+        """
+        A DPASimulator for the partner (the partner of the credentials by default) that runs
+        simulations offline: it uses the DPA settings, the product (the default product or the
+        one of the default segmentation unless `product_id` is given) and the business calendar
+        of its DPA calendars, cached by the partners module.
+        """
+        from altscore.cms.model.dpa_simulation import DPASimulator
+        from altscore.cms.model.partners import PartnersSyncModule
+        partner_id = partner_id or self.altscore_client.partner_id
+        partners = PartnersSyncModule(self.altscore_client)
+        partner = partners.retrieve(partner_id)
+        if partner is None:
+            raise ValueError(f"Partner {partner_id} not found")
+        settings = partners.get_dpa_settings(partner_id)
+        segmentation = None
+        if product_id is None and settings.defaults is not None:
+            if settings.defaults.segmentation_id is not None:
+                segmentation = partner.get_dpa_segmentation(settings.defaults.segmentation_id)
+            product_id = segmentation.product_id if segmentation is not None else settings.defaults.product_id
+        if product_id is None:
+            raise ValueError(f"Partner {partner_id} has no default DPA product, pass product_id")
+        product = partner.get_dpa_product(product_id)
+        if product is None:
+            raise ValueError(f"DPA product {product_id} not found")
+        calendar_type = settings.defaults.calendar_type if settings.defaults is not None else None
+        business_calendar = partners.business_calendar(partner_id, calendar_type=calendar_type)
+        return DPASimulator.from_partner_data(settings, product, business_calendar,
+                                              segmentation=segmentation, rate=rate)
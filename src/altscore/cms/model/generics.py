@@ -1,7 +1,10 @@
 import httpx
 from altscore.cms.helpers import build_headers
 from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
-from typing import Dict
+from altscore.common.fast_models import parse_read
+from altscore.common.concurrency import bounded_map, bounded_map_async, call_with_retries, \
+    call_with_retries_async, pooled_limits
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 import stringcase
 from loguru import logger
 import asyncio
@@ -50,7 +53,7 @@ class GenericSyncModule:
                     base_url=self.altscore_client._cms_base_url,
                     header_builder=self.build_headers,
                     renew_token=self.renew_token,
-                    data=self.retrieve_data_model.parse_obj(response.json())
+                    data=parse_read(self.retrieve_data_model, response.json())
                 )
             return None
 
@@ -116,7 +119,7 @@ class GenericSyncModule:
                 base_url=self.altscore_client._cms_base_url,
                 header_builder=self.build_headers,
                 renew_token=self.renew_token,
-                data=self.retrieve_data_model.parse_obj(obj),
+                data=parse_read(self.retrieve_data_model, obj),
             )
             for obj in first_page_items
         ]
@@ -155,9 +158,50 @@ class GenericSyncModule:
                 base_url=self.altscore_client._cms_base_url,
                 header_builder=self.build_headers,
                 renew_token=self.renew_token,
-                data=self.retrieve_data_model.parse_obj(e)
+                data=parse_read(self.retrieve_data_model, e)
             ) for e in response.json()]
 
+    def iter_raw(self, concurrency: int = 8, per_page: int = 100, max_retries: int = 3, **kwargs) -> Iterator[Dict]:
+        """
+        Yields the raw JSON of every resource matching the filters, without building models. The
+        first page gives x-total-count and the rest are fetched with up to `concurrency` requests
+        in flight over a shared connection pool; pages come back in no particular order.
+        """
+        query_params = _raw_query_params(kwargs)
+        per_page = _checked_per_page(per_page)
+        with httpx.Client(base_url=self.altscore_client._cms_base_url, limits=pooled_limits(concurrency)) as client:
+            items, total_count = call_with_retries(self._query_raw_page_with, client, query_params, 1, per_page,
+                                                   max_retries=max_retries)
+            yield from items
+            if total_count is None:
+                page = 1
+                while len(items) >= per_page:
+                    page += 1
+                    items, _ = call_with_retries(self._query_raw_page_with, client, query_params, page, per_page,
+                                                 max_retries=max_retries)
+                    yield from items
+                return
+
+            def fetch(page: int):
+                return call_with_retries(self._query_raw_page_with, client, query_params, page, per_page,
+                                         max_retries=max_retries)
+
+            for result in bounded_map(fetch, range(2, _page_count(total_count, per_page) + 1),
+                                      concurrency=concurrency, ordered=False):
+                yield from result.unwrap()[0]
+
+    @retry_on_401
+    def _query_raw_page_with(self, client: httpx.Client, query_params: Dict, page: int,
+                             per_page: int) -> Tuple[List[Dict], Optional[int]]:
+        response = client.get(
+            f"/{self.resource_version}/{self.resource}",
+            headers=self.build_headers(),
+            params={**query_params, "page": page, "per-page": per_page},
+            timeout=120
+        )
+        raise_for_status_improved(response)
+        return response.json(), _total_count(response)
+
 
 class GenericAsyncModule:
 
@@ -202,7 +246,7 @@ class GenericAsyncModule:
                     base_url=self.altscore_client._cms_base_url,
                     header_builder=self.build_headers,
                     renew_token=self.renew_token,
-                    data=self.retrieve_data_model.parse_obj(response.json())
+                    data=parse_read(self.retrieve_data_model, response.json())
                 )
             elif response.status_code in [404]:
                 return None
@@ -295,10 +339,76 @@ class GenericAsyncModule:
                 base_url=self.altscore_client._cms_base_url,
                 header_builder=self.build_headers,
                 renew_token=self.renew_token,
-                data=self.retrieve_data_model.parse_obj(e)
+                data=parse_read(self.retrieve_data_model, e)
             ) for e in response.json()]
 
+    async def iter_raw(self, concurrency: int = 8, per_page: int = 100, max_retries: int = 3,
+                       **kwargs) -> AsyncIterator[Dict]:
+        """Async counterpart of GenericSyncModule.iter_raw."""
+        query_params = _raw_query_params(kwargs)
+        per_page = _checked_per_page(per_page)
+        async with httpx.AsyncClient(base_url=self.altscore_client._cms_base_url,
+                                     limits=pooled_limits(concurrency)) as client:
+            items, total_count = await call_with_retries_async(self._query_raw_page_with, client, query_params, 1,
+                                                               per_page, max_retries=max_retries)
+            for item in items:
+                yield item
+            if total_count is None:
+                page = 1
+                while len(items) >= per_page:
+                    page += 1
+                    items, _ = await call_with_retries_async(self._query_raw_page_with, client, query_params,
+                                                             page, per_page, max_retries=max_retries)
+                    for item in items:
+                        yield item
+                return
+
+            async def fetch(page: int):
+                return await call_with_retries_async(self._query_raw_page_with, client, query_params, page,
+                                                     per_page, max_retries=max_retries)
+
+            async for result in bounded_map_async(fetch, range(2, _page_count(total_count, per_page) + 1),
+                                                  concurrency=concurrency, ordered=False):
+                for item in result.unwrap()[0]:
+                    yield item
+
+    @retry_on_401_async
+    async def _query_raw_page_with(self, client: httpx.AsyncClient, query_params: Dict, page: int,
+                                   per_page: int) -> Tuple[List[Dict], Optional[int]]:
+        response = await client.get(
+            f"/{self.resource_version}/{self.resource}",
+            headers=self.build_headers(),
+            params={**query_params, "page": page, "per-page": per_page},
+            timeout=120
+        )
+        raise_for_status_improved(response)
+        return response.json(), _total_count(response)
+
 
 def convert_to_dash_case(s):
     snake_case = stringcase.snakecase(s)
     return stringcase.spinalcase(snake_case)
+
+
+def _raw_query_params(kwargs: Dict) -> Dict:
+    return {
+        convert_to_dash_case(k): v
+        for k, v in kwargs.items()
+        if v is not None and k not in {"page", "per_page", "timeout"}
+    }
+
+
+def _checked_per_page(per_page: int) -> int:
+    if per_page > 100:
+        logger.warning("per_page is greater than 100, setting it to 100")
+        return 100
+    return per_page
+
+
+def _page_count(total_count: int, per_page: int) -> int:
+    return max(1, -(-total_count // per_page))
+
+
+def _total_count(response: httpx.Response) -> Optional[int]:
+    total_count = response.headers.get("x-total-count")
+    return int(total_count) if total_count is not None else None
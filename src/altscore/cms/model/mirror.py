@@ -0,0 +1,313 @@
+import datetime as dt
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import httpx
+from altscore.common.concurrency import call_with_retries, call_with_retries_async, pooled_limits
+from altscore.cms.model.generics import _checked_per_page, _raw_query_params
+from altscore.common.fast_models import parse_read
+
+# columns copied out of the JSON of a payment order or disbursement so they can be filtered and indexed
+MIRROR_COLUMNS = ("updated_at", "status", "client_id", "debt_id", "reference_id", "disbursement_date",
+                  "payment_date", "gateway")
+_INDEXED_COLUMNS = ("updated_at", "status", "client_id", "debt_id", "reference_id")
+
+
+def _parse_timestamp(value: str) -> dt.datetime:
+    parsed = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=dt.timezone.utc)
+
+
+def _columns(record: Dict) -> Tuple:
+    return (
+        record.get("updatedAt"),
+        record.get("status"),
+        (record.get("client") or {}).get("clientId"),
+        record.get("debtId"),
+        record.get("referenceId"),
+        record.get("disbursementDate"),
+        record.get("paymentDate"),
+        record.get("gateway"),
+    )
+
+
+class MirrorStore:
+    """
+    SQLite mirror of one CMS resource keyed by payOrderId: the raw JSON of each record, the
+    MIRROR_COLUMNS extracted and indexed for local queries, the sync that last changed it, and
+    the updatedAt watermark of the last sync with each set of filters. Several resources can
+    share the same file.
+    """
+
+    def __init__(self, path: str, resource: str):
+        self.path = path
+        self.table = resource.replace("-", "_")
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (id TEXT PRIMARY KEY, "
+                f"{', '.join(f'{column} TEXT' for column in MIRROR_COLUMNS)}, sync_id INTEGER, data TEXT)"
+            )
+            for column in _INDEXED_COLUMNS + ("sync_id",):
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_{column} ON {self.table} ({column})"
+                )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_state (resource TEXT PRIMARY KEY, sync_id INTEGER, synced_at REAL)"
+            )
+            # a sync with filters only saw the matching records, so each filter set has its own watermark
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_watermarks "
+                "(resource TEXT, filters TEXT, watermark TEXT, PRIMARY KEY (resource, filters))"
+            )
+
+    def state(self, filters: str = "") -> Tuple[Optional[str], int]:
+        """(updatedAt watermark of the syncs with `filters`, id of the last sync)."""
+        with self._lock:
+            watermark = self._connection.execute(
+                "SELECT watermark FROM mirror_watermarks WHERE resource = ? AND filters = ?", (self.table, filters)
+            ).fetchone()
+            sync_id = self._connection.execute(
+                "SELECT sync_id FROM mirror_state WHERE resource = ?", (self.table,)
+            ).fetchone()
+        return (watermark[0] if watermark else None), (sync_id[0] if sync_id else 0)
+
+    def apply(self, records: Iterable[Dict], sync_id: int, watermark: Optional[str],
+              filters: str = "") -> Tuple[List[str], List[str]]:
+        """Upserts `records` and stores the watermark of `filters` in one transaction; (inserted ids, updated ids)."""
+        inserted, updated = [], []
+        with self._lock, self._connection:
+            for record in records:
+                record_id = record["payOrderId"]
+                columns = _columns(record)
+                row = self._connection.execute(
+                    f"SELECT updated_at FROM {self.table} WHERE id = ?", (record_id,)
+                ).fetchone()
+                if row is not None and row[0] == columns[0]:
+                    continue
+                self._connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (id, {', '.join(MIRROR_COLUMNS)}, sync_id, data) "
+                    f"VALUES (?, {', '.join('?' for _ in MIRROR_COLUMNS)}, ?, ?)",
+                    (record_id, *columns, sync_id, json.dumps(record, separators=(",", ":")))
+                )
+                (updated if row is not None else inserted).append(record_id)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO mirror_state (resource, sync_id, synced_at) VALUES (?, ?, ?)",
+                (self.table, sync_id, time.time())
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO mirror_watermarks (resource, filters, watermark) VALUES (?, ?, ?)",
+                (self.table, filters, watermark)
+            )
+        return inserted, updated
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection.execute(f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _where(self, filters: Dict, updated_since: Optional[str], changed_since_sync: Optional[int]):
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in MIRROR_COLUMNS:
+                raise ValueError(f"Cannot filter by {column}, the mirrored columns are {MIRROR_COLUMNS}")
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{column} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if updated_since is not None:
+            clauses.append("updated_at >= ?")
+            params.append(updated_since)
+        if changed_since_sync is not None:
+            clauses.append("sync_id > ?")
+            params.append(changed_since_sync)
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def query(self, updated_since: Optional[str] = None, changed_since_sync: Optional[int] = None,
+              limit: Optional[int] = None, **filters) -> List[Dict]:
+        """
+        Raw JSON of the mirrored records matching the filters (any of MIRROR_COLUMNS, a value or a
+        list of values), most recently updated first.
+        """
+        where, params = self._where(filters, updated_since, changed_since_sync)
+        sql = f"SELECT data FROM {self.table}{where} ORDER BY updated_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, updated_since: Optional[str] = None, changed_since_sync: Optional[int] = None,
+              **filters) -> int:
+        where, params = self._where(filters, updated_since, changed_since_sync)
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM {self.table}{where}", params).fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+class MirrorSyncResult:
+
+    def __init__(self, sync_id: int, inserted: List[str], updated: List[str], fetched: int, pages: int,
+                 full: bool, watermark: Optional[str], wall_time: float):
+        self.sync_id = sync_id
+        self.inserted = inserted
+        self.updated = updated
+        self.fetched = fetched
+        self.pages = pages
+        # full syncs page through everything, incremental ones stop at the watermark
+        self.full = full
+        self.watermark = watermark
+        self.wall_time = wall_time
+
+    @property
+    def changed(self) -> List[str]:
+        return self.inserted + self.updated
+
+    def __repr__(self):
+        return (f"<MirrorSyncResult sync_id={self.sync_id} inserted={len(self.inserted)} "
+                f"updated={len(self.updated)} fetched={self.fetched} pages={self.pages} full={self.full} "
+                f"wall_time={self.wall_time:.2f}s>")
+
+
+class ResourceMirrorBase:
+    """
+    Keeps a MirrorStore up to date with a CMS resource. The first sync pages through every record
+    in parallel; later ones page by updatedAt, newest first, and stop at the first page reaching
+    back past the watermark minus `lookback_seconds`, the margin for records updated while a
+    previous sync was paging. Each set of filters has its own watermark, the first sync with new
+    filters is a full one. Records are never deleted from the mirror.
+    """
+
+    def __init__(self, module, path: str, lookback_seconds: float = 300, per_page: int = 100,
+                 concurrency: int = 8, max_retries: int = 3):
+        self.module = module
+        self.store = MirrorStore(path, module.resource)
+        self.lookback_seconds = lookback_seconds
+        self.per_page = _checked_per_page(per_page)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+
+    def _cutoff(self, watermark: str) -> dt.datetime:
+        return _parse_timestamp(watermark) - dt.timedelta(seconds=self.lookback_seconds)
+
+    @staticmethod
+    def _filters_key(filters: Dict) -> str:
+        params = _raw_query_params(filters)
+        return json.dumps(params, sort_keys=True, default=str) if params else ""
+
+    def _incremental_params(self, filters: Dict) -> Dict:
+        return {**_raw_query_params(filters), "sort-by": "updatedAt", "sort-direction": "desc"}
+
+    @staticmethod
+    def _watermark(records: List[Dict], watermark: Optional[str]) -> Optional[str]:
+        for record in records:
+            updated_at = record.get("updatedAt")
+            if updated_at and (watermark is None or _parse_timestamp(updated_at) > _parse_timestamp(watermark)):
+                watermark = updated_at
+        return watermark
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        return self.store.get(record_id)
+
+    def query(self, updated_since: Optional[str] = None, changed_since_sync: Optional[int] = None,
+              limit: Optional[int] = None, **filters) -> List[Dict]:
+        return self.store.query(updated_since=updated_since, changed_since_sync=changed_since_sync, limit=limit,
+                                **filters)
+
+    def query_models(self, **kwargs) -> List:
+        """Same as query, parsed into the module's DTO."""
+        return [parse_read(self.module.retrieve_data_model, record) for record in self.query(**kwargs)]
+
+    def count(self, **kwargs) -> int:
+        return self.store.count(**kwargs)
+
+    def close(self):
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ResourceMirrorSync(ResourceMirrorBase):
+
+    def sync(self, full: bool = False, **filters) -> MirrorSyncResult:
+        """
+        Pulls what changed since the last sync with the same filters (everything on the first one
+        with those filters, or with full=True).
+        """
+        started_at = time.perf_counter()
+        filters_key = self._filters_key(filters)
+        watermark, last_sync_id = self.store.state(filters_key)
+        full = full or watermark is None
+        records, pages = [], 0
+        if full:
+            records = list(self.module.iter_raw(concurrency=self.concurrency, per_page=self.per_page,
+                                                max_retries=self.max_retries, **filters))
+            pages = -(-len(records) // self.per_page)
+        else:
+            cutoff = self._cutoff(watermark)
+            query_params = self._incremental_params(filters)
+            with httpx.Client(base_url=self.module.altscore_client._cms_base_url,
+                              limits=pooled_limits(1)) as client:
+                while True:
+                    pages += 1
+                    items, _ = call_with_retries(self.module._query_raw_page_with, client, query_params, pages,
+                                                 self.per_page, max_retries=self.max_retries)
+                    records.extend(items)
+                    if len(items) < self.per_page or any(
+                            _parse_timestamp(item["updatedAt"]) < cutoff for item in items):
+                        break
+        sync_id = last_sync_id + 1
+        new_watermark = self._watermark(records, watermark)
+        inserted, updated = self.store.apply(records, sync_id, new_watermark, filters_key)
+        return MirrorSyncResult(sync_id, inserted, updated, len(records), pages, full, new_watermark,
+                                time.perf_counter() - started_at)
+
+
+class ResourceMirrorAsync(ResourceMirrorBase):
+
+    async def sync(self, full: bool = False, **filters) -> MirrorSyncResult:
+        """Async counterpart of ResourceMirrorSync.sync; the local queries stay synchronous."""
+        started_at = time.perf_counter()
+        filters_key = self._filters_key(filters)
+        watermark, last_sync_id = self.store.state(filters_key)
+        full = full or watermark is None
+        records, pages = [], 0
+        if full:
+            records = [record async for record in self.module.iter_raw(
+                concurrency=self.concurrency, per_page=self.per_page, max_retries=self.max_retries, **filters
+            )]
+            pages = -(-len(records) // self.per_page)
+        else:
+            cutoff = self._cutoff(watermark)
+            query_params = self._incremental_params(filters)
+            async with httpx.AsyncClient(base_url=self.module.altscore_client._cms_base_url,
+                                         limits=pooled_limits(1)) as client:
+                while True:
+                    pages += 1
+                    items, _ = await call_with_retries_async(self.module._query_raw_page_with, client,
+                                                             query_params, pages, self.per_page,
+                                                             max_retries=self.max_retries)
+                    records.extend(items)
+                    if len(items) < self.per_page or any(
+                            _parse_timestamp(item["updatedAt"]) < cutoff for item in items):
+                        break
+        sync_id = last_sync_id + 1
+        new_watermark = self._watermark(records, watermark)
+        inserted, updated = self.store.apply(records, sync_id, new_watermark, filters_key)
+        return MirrorSyncResult(sync_id, inserted, updated, len(records), pages, full, new_watermark,
+                                time.perf_counter() - started_at)
@@ -13,6 +13,7 @@ from altscore.cms.model.dpa_products import DPAProductAPIDTO, CreateDPAProductAP
 from altscore.borrower_central.utils import clean_dict, convert_to_dash_case
 from altscore.cms.model.disbursement_accounts import  BankAccount, DisbursementAccountBaseModel, CreateDisbursementPartnerAccountDTO
 from altscore.cms.model.credit_accounts import CreditAccountSync, CreditAccountAPIDTO
+from altscore.common.fast_models import parse_read
 
 
 class PartnerAPIDTO(BaseModel):
@@ -147,7 +148,7 @@ class PartnerAsync(PartnerBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DPAProductAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DPAProductAPIDTO, e) for e in response.json()]
 
     @retry_on_401_async
     async def get_dpa_product(self, product_id: str) -> Optional[DPAProductAPIDTO]:
@@ -160,7 +161,7 @@ class PartnerAsync(PartnerBase):
             if response.status_code == 404:
                 return None
             elif response.status_code == 200:
-                return DPAProductAPIDTO.parse_obj(response.json())
+                return parse_read(DPAProductAPIDTO, response.json())
             raise_for_status_improved(response)
 
     @retry_on_401_async
@@ -219,7 +220,7 @@ class PartnerAsync(PartnerBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DPASegmentationAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DPASegmentationAPIDTO, e) for e in response.json()]
 
     @retry_on_401_async
     async def get_dpa_segmentation(self, segmentation_id: str) -> Optional[DPASegmentationAPIDTO]:
@@ -232,7 +233,7 @@ class PartnerAsync(PartnerBase):
             if response.status_code == 404:
                 return None
             elif response.status_code == 200:
-                return DPASegmentationAPIDTO.parse_obj(response.json())
+                return parse_read(DPASegmentationAPIDTO, response.json())
             raise_for_status_improved(response)
 
     @retry_on_401_async
@@ -289,7 +290,7 @@ class PartnerAsync(PartnerBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DPACalendarAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DPACalendarAPIDTO, e) for e in response.json()]
 
     @retry_on_401_async
     async def get_dpa_calendar(self, calendar_id: str) -> Optional[DPACalendarAPIDTO]:
@@ -302,7 +303,7 @@ class PartnerAsync(PartnerBase):
             if response.status_code == 404:
                 return None
             elif response.status_code == 200:
-                return DPACalendarAPIDTO.parse_obj(response.json())
+                return parse_read(DPACalendarAPIDTO, response.json())
             raise_for_status_improved(response)
 
     @retry_on_401_async
@@ -373,7 +374,7 @@ class PartnerSync(PartnerBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DPAProductAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DPAProductAPIDTO, e) for e in response.json()]
 
     @retry_on_401
     def get_dpa_product(self, product_id: str) -> Optional[DPAProductAPIDTO]:
@@ -386,7 +387,7 @@ class PartnerSync(PartnerBase):
             if response.status_code == 404:
                 return None
             elif response.status_code == 200:
-                return DPAProductAPIDTO.parse_obj(response.json())
+                return parse_read(DPAProductAPIDTO, response.json())
             raise_for_status_improved(response)
 
     @retry_on_401
@@ -445,7 +446,7 @@ class PartnerSync(PartnerBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DPASegmentationAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DPASegmentationAPIDTO, e) for e in response.json()]
 
     @retry_on_401
     def get_dpa_segmentation(self, segmentation_id: str) -> Optional[DPASegmentationAPIDTO]:
@@ -458,7 +459,7 @@ class PartnerSync(PartnerBase):
             if response.status_code == 404:
                 return None
             elif response.status_code == 200:
-                return DPASegmentationAPIDTO.parse_obj(response.json())
+                return parse_read(DPASegmentationAPIDTO, response.json())
             raise_for_status_improved(response)
 
     @retry_on_401
@@ -515,7 +516,7 @@ class PartnerSync(PartnerBase):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [DPACalendarAPIDTO.parse_obj(e) for e in response.json()]
+            return [parse_read(DPACalendarAPIDTO, e) for e in response.json()]
 
     @retry_on_401
     def get_dpa_calendar(self, calendar_id: str) -> Optional[DPACalendarAPIDTO]:
@@ -528,7 +529,7 @@ class PartnerSync(PartnerBase):
             if response.status_code == 404:
                 return None
             elif response.status_code == 200:
-                return DPACalendarAPIDTO.parse_obj(response.json())
+                return parse_read(DPACalendarAPIDTO, response.json())
             raise_for_status_improved(response)
 
     @retry_on_401
@@ -584,6 +585,8 @@ class PartnersAsyncModule(GenericAsyncModule):
             resource="partners",
             resource_version="v2"
         )
+        # BusinessCalendarCache, created on first use
+        self.business_calendars = None
 
     @retry_on_401_async
     async def me(self) -> PartnerAsync:
@@ -591,7 +594,7 @@ class PartnersAsyncModule(GenericAsyncModule):
             response = await client.get(
                 "/v2/partners/me",
                 # This is important to avoid infinite recursion
-                headers=build_headers(self, partner_id=None),
+                headers=build_headers(self, partner_id="init"),
                 timeout=30
             )
             raise_for_status_improved(response)
@@ -599,7 +602,7 @@ class PartnersAsyncModule(GenericAsyncModule):
                 base_url=self.altscore_client._cms_base_url,
                 header_builder=self.build_headers,
                 renew_token=self.renew_token,
-                data=PartnerAPIDTO.parse_obj(response.json())
+                data=parse_read(PartnerAPIDTO, response.json())
             )
 
     @retry_on_401_async
@@ -611,7 +614,7 @@ class PartnersAsyncModule(GenericAsyncModule):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return DPASettingsAPIDTO.parse_obj(response.json())
+            return parse_read(DPASettingsAPIDTO, response.json())
 
     @retry_on_401_async
     async def update_dpa_settings(self, partner_id: str, settings: dict) -> DPASettingsAPIDTO:
@@ -641,8 +644,31 @@ class PartnersAsyncModule(GenericAsyncModule):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [CreditAccountAPIDTO.parse_obj(item) for item in response.json()]
-
+            return [parse_read(CreditAccountAPIDTO, item) for item in response.json()]
+
+    async def business_calendar(self, partner_id: Optional[str] = None, calendar_type: Optional[str] = None,
+                                refresh: bool = False):
+        """
+        The DPA calendars of a partner (the partner of the credentials by default), optionally
+        only those of `calendar_type`, compiled into a BusinessCalendar. It is cached per partner
+        and calendar type for an hour, `refresh` fetches the calendars again.
+        """
+        from altscore.cms.model.business_calendar import BusinessCalendar, BusinessCalendarCache, select_calendars
+        partner_id = partner_id or await self.altscore_client.resolve_partner_id()
+        if self.business_calendars is None:
+            self.business_calendars = BusinessCalendarCache()
+        if not refresh:
+            business_calendar = self.business_calendars.get(partner_id, calendar_type)
+            if business_calendar is not None:
+                return business_calendar
+        partner = await self.retrieve(partner_id)
+        if partner is None:
+            raise ValueError(f"Partner {partner_id} not found")
+        business_calendar = BusinessCalendar.from_dpa_calendars(
+            select_calendars(await partner.get_dpa_calendars(), calendar_type)
+        )
+        self.business_calendars.set(partner_id, calendar_type, business_calendar)
+        return business_calendar
 
 
 class PartnersSyncModule(GenericSyncModule):
@@ -657,6 +683,8 @@ class PartnersSyncModule(GenericSyncModule):
             resource="partners",
             resource_version="v2"
         )
+        # BusinessCalendarCache, created on first use
+        self.business_calendars = None
 
     @retry_on_401
     def me(self) -> PartnerSync:
@@ -672,7 +700,7 @@ class PartnersSyncModule(GenericSyncModule):
                 base_url=self.altscore_client._cms_base_url,
                 header_builder=self.build_headers,
                 renew_token=self.renew_token,
-                data=PartnerAPIDTO.parse_obj(response.json())
+                data=parse_read(PartnerAPIDTO, response.json())
             )
 
     @retry_on_401
@@ -684,7 +712,7 @@ class PartnersSyncModule(GenericSyncModule):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return DPASettingsAPIDTO.parse_obj(response.json())
+            return parse_read(DPASettingsAPIDTO, response.json())
 
     @retry_on_401
     def update_dpa_settings(self, partner_id: str, settings: dict) -> DPASettingsAPIDTO:
@@ -714,4 +742,28 @@ class PartnersSyncModule(GenericSyncModule):
                 timeout=30
             )
             raise_for_status_improved(response)
-            return [CreditAccountAPIDTO.parse_obj(item) for item in response.json()]
+            return [parse_read(CreditAccountAPIDTO, item) for item in response.json()]
+
+    def business_calendar(self, partner_id: Optional[str] = None, calendar_type: Optional[str] = None,
+                          refresh: bool = False):
+        """
+        The DPA calendars of a partner (the partner of the credentials by default), optionally
+        only those of `calendar_type`, compiled into a BusinessCalendar. It is cached per partner
+        and calendar type for an hour, `refresh` fetches the calendars again.
+        """
+        from altscore.cms.model.business_calendar import BusinessCalendar, BusinessCalendarCache, select_calendars
+        partner_id = partner_id or self.altscore_client.partner_id
+        if self.business_calendars is None:
+            self.business_calendars = BusinessCalendarCache()
+        if not refresh:
+            business_calendar = self.business_calendars.get(partner_id, calendar_type)
+            if business_calendar is not None:
+                return business_calendar
+        partner = self.retrieve(partner_id)
+        if partner is None:
+            raise ValueError(f"Partner {partner_id} not found")
+        business_calendar = BusinessCalendar.from_dpa_calendars(
+            select_calendars(partner.get_dpa_calendars(), calendar_type)
+        )
+        self.business_calendars.set(partner_id, calendar_type, business_calendar)
+        return business_calendar
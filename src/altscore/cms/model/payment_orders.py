@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from altscore.cms.model.generics import GenericSyncModule, GenericAsyncModule
+from altscore.cms.model.mirror import ResourceMirrorAsync, ResourceMirrorSync
 
 
 class AmountInfo(BaseModel):
@@ -128,6 +129,12 @@ class PaymentOrdersAsyncModule(GenericAsyncModule):
             resource="payment-orders"
         )
 
+    def mirror(self, path: str, lookback_seconds: float = 300, per_page: int = 100, concurrency: int = 8,
+               max_retries: int = 3) -> ResourceMirrorAsync:
+        """Same as PaymentOrdersSyncModule.mirror, with an async sync()."""
+        return ResourceMirrorAsync(self, path, lookback_seconds=lookback_seconds, per_page=per_page,
+                                   concurrency=concurrency, max_retries=max_retries)
+
 
 class PaymentOrdersSyncModule(GenericSyncModule):
 
@@ -140,3 +147,12 @@ class PaymentOrdersSyncModule(GenericSyncModule):
             update_data_model=None,
             resource="payment-orders"
         )
+
+    def mirror(self, path: str, lookback_seconds: float = 300, per_page: int = 100, concurrency: int = 8,
+               max_retries: int = 3) -> ResourceMirrorSync:
+        """
+        Local SQLite mirror of the payment orders at `path`: mirror.sync() pulls only what was updated since
+        the last sync and mirror.query(status=..., client_id=...) reads without calling the API.
+        """
+        return ResourceMirrorSync(self, path, lookback_seconds=lookback_seconds, per_page=per_page,
+                                  concurrency=concurrency, max_retries=max_retries)
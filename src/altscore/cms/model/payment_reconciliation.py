@@ -0,0 +1,472 @@
+import asyncio
+import csv
+import datetime as dt
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import httpx
+import stringcase
+from loguru import logger
+from altscore.cms.helpers import build_headers
+from altscore.cms.model.debts import DebtBase
+from altscore.common.checkpoint import Checkpoint
+from altscore.common.concurrency import bounded_map, bounded_map_async, pooled_limits
+from altscore.common.http_errors import raise_for_status_improved
+
+PAYMENT_SUBMITTED = "submitted"
+# the payment reference was already applied to the debt, by an earlier run or a retried request
+PAYMENT_ALREADY_APPLIED = "already_applied"
+PAYMENT_DUPLICATE_IN_FILE = "duplicate_in_file"
+PAYMENT_SKIPPED = "skipped"
+PAYMENT_UNMATCHED = "unmatched"
+PAYMENT_AMBIGUOUS = "ambiguous"
+PAYMENT_INVALID = "invalid"
+PAYMENT_FAILED = "failed"
+PAYMENT_DRY_RUN = "dry_run"
+
+_READ_BATCH_SIZE = 1000
+
+PaymentsSource = Union[str, os.PathLike, Iterable[Dict]]
+
+
+def read_payments(source: PaymentsSource) -> Iterator[Dict]:
+    """Streams payment rows from a CSV or JSON lines file, or passes an iterable of dicts through."""
+    if not isinstance(source, (str, os.PathLike)):
+        yield from source
+        return
+    path = os.fspath(source)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _field(row: Dict, name: str) -> Any:
+    """A camelCase field of a row, also accepted in snake_case. Empty cells are None."""
+    value = row.get(name)
+    if value is None:
+        value = row.get(stringcase.snakecase(name))
+    if isinstance(value, str):
+        value = value.strip() or None
+    return value
+
+
+class OpenDebtIndex:
+    """Open debts of the partner by debt reference id, client id and client external id."""
+
+    def __init__(self, debts: Iterable[Dict]):
+        self.by_reference_id: Dict[str, List[str]] = {}
+        self.by_client: Dict[str, List[str]] = {}
+        self.balances: Dict[str, Tuple[float, Optional[str]]] = {}
+        for debt in debts:
+            debt_id = debt["debtId"]
+            client = debt.get("client") or {}
+            total = (debt.get("balance") or {}).get("total") or {}
+            self.balances[debt_id] = (float(total.get("amount") or 0), total.get("currency"))
+            if debt.get("referenceId"):
+                self.by_reference_id.setdefault(debt["referenceId"], []).append(debt_id)
+            for key in (client.get("clientId"), client.get("externalId")):
+                if key:
+                    self.by_client.setdefault(key, []).append(debt_id)
+
+    def match(self, row: Dict) -> Tuple[Optional[str], str]:
+        """(debt id, status) of a payment row: by debtId, debt referenceId or a client with a single open debt."""
+        debt_id = _field(row, "debtId")
+        if debt_id is not None:
+            return debt_id, PAYMENT_SUBMITTED
+        candidates = None
+        debt_reference_id = _field(row, "debtReferenceId")
+        if debt_reference_id is not None:
+            candidates = self.by_reference_id.get(debt_reference_id, [])
+        else:
+            client_key = _field(row, "clientId") or _field(row, "externalId")
+            if client_key is not None:
+                candidates = self.by_client.get(client_key, [])
+        if not candidates:
+            return None, PAYMENT_UNMATCHED
+        if len(candidates) > 1:
+            return None, PAYMENT_AMBIGUOUS
+        return candidates[0], PAYMENT_SUBMITTED
+
+
+def _needs_index(row: Dict) -> bool:
+    return _field(row, "debtId") is None
+
+
+def payment_payload(row: Dict, idempotency_key_field: str) -> Dict:
+    """The body of POST /v1/debts/{debt_id}/payments for a row; raises ValueError when the row is not valid."""
+    amount = _field(row, "amount")
+    currency = _field(row, "currency")
+    reference_id = row.get(idempotency_key_field)
+    if amount is None or currency is None or not reference_id:
+        raise ValueError(f"amount, currency and {idempotency_key_field} are required")
+    amount = str(amount)
+    float(amount)
+    payment_date = _field(row, "paymentDate") or dt.date.today().isoformat()
+    return {
+        "amount": {"amount": amount, "currency": currency},
+        "referenceId": str(reference_id),
+        "notes": _field(row, "notes") or "",
+        "paymentDate": str(payment_date)[:10],
+    }
+
+
+class PaymentReconciliationReport:
+    """One entry per payment row with the debt it was matched to and what happened to it."""
+
+    def __init__(self, entries: List[Dict], unpaid_debts: Optional[List[str]], wall_time: float):
+        # {"index", "referenceId", "debtId", "amount", "currency", "status", "error"}
+        self.entries = entries
+        # open debts that no payment of the file was matched to, when open debts were loaded
+        self.unpaid_debts = unpaid_debts
+        self.wall_time = wall_time
+
+    def by_status(self, status: str) -> List[Dict]:
+        return [entry for entry in self.entries if entry["status"] == status]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Number of payments and total amount by status, per currency."""
+        summary: Dict[str, Dict[str, float]] = {}
+        for entry in self.entries:
+            status = summary.setdefault(entry["status"], {"count": 0})
+            status["count"] += 1
+            if entry["amount"] is not None and entry["currency"] is not None:
+                try:
+                    amount = float(entry["amount"])
+                except ValueError:
+                    continue
+                status[entry["currency"]] = status.get(entry["currency"], 0.0) + amount
+        return summary
+
+    @property
+    def is_success(self) -> bool:
+        return not any(entry["status"] in (PAYMENT_FAILED, PAYMENT_UNMATCHED, PAYMENT_AMBIGUOUS, PAYMENT_INVALID)
+                       for entry in self.entries)
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame.from_records(self.entries)
+
+    def to_csv(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["index", "referenceId", "debtId", "amount", "currency",
+                                                   "status", "error"])
+            writer.writeheader()
+            writer.writerows(self.entries)
+        return path
+
+    def __repr__(self):
+        counts = " ".join(f"{status}={values['count']}" for status, values in self.summary().items())
+        return f"<PaymentReconciliationReport {counts} wall_time={self.wall_time:.1f}s>"
+
+
+def _entry(index: int, row: Dict, idempotency_key_field: str, debt_id: Optional[str], status: str,
+           error: Optional[str] = None) -> Dict:
+    reference_id = row.get(idempotency_key_field)
+    return {
+        "index": index,
+        "referenceId": str(reference_id) if reference_id is not None else None,
+        "debtId": debt_id,
+        "amount": _field(row, "amount"),
+        "currency": _field(row, "currency"),
+        "status": status,
+        "error": error,
+    }
+
+
+# statuses of the rows whose payment is on its debt
+_PAID = (PAYMENT_SUBMITTED, PAYMENT_ALREADY_APPLIED, PAYMENT_SKIPPED)
+
+
+class PaymentSubmissionBase:
+    """
+    Matches payment rows to open debts and submits them with up to `concurrency` requests in
+    flight. The idempotency key of a row (`idempotency_key_field`) is the referenceId of the
+    payment: repeated keys in the file are only submitted once, keys recorded in the checkpoint
+    of an earlier run are skipped, and after a request whose outcome is unknown (5xx, 429,
+    timeouts, dropped connections) the payments of the debt are checked for the key, before
+    retrying and before reporting it failed, so a payment is never applied twice.
+    """
+
+    def __init__(self, altscore_client, debts_module, concurrency: int, idempotency_key_field: str,
+                 max_retries: int, checkpoint_path: Optional[str], dry_run: bool, partner_id: Optional[str]):
+        self.altscore_client = altscore_client
+        self.debts_module = debts_module
+        self.concurrency = concurrency
+        self.idempotency_key_field = idempotency_key_field
+        self.max_retries = max_retries
+        self.checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        self.dry_run = dry_run
+        self.partner_id = partner_id
+        self.index: Optional[OpenDebtIndex] = None
+        self._seen = set()
+        self._seen_lock = threading.Lock()
+
+    def renew_token(self):
+        self.altscore_client.renew_token()
+
+    def build_headers(self):
+        return build_headers(self, partner_id=self.partner_id)
+
+    def _prepare(self, index: int, row: Dict) -> Tuple[Optional[Dict], Optional[str], Dict]:
+        """(entry if the row is settled without a request, debt id, payload)."""
+        key = self.idempotency_key_field
+        try:
+            payload = payment_payload(row, key)
+        except ValueError as e:
+            return _entry(index, row, key, None, PAYMENT_INVALID, str(e)), None, {}
+        debt_id, status = self.index.match(row) if self.index is not None else (_field(row, "debtId"),
+                                                                                PAYMENT_SUBMITTED)
+        if debt_id is None:
+            return _entry(index, row, key, None, status), None, payload
+        with self._seen_lock:
+            if payload["referenceId"] in self._seen:
+                return _entry(index, row, key, debt_id, PAYMENT_DUPLICATE_IN_FILE), debt_id, payload
+            self._seen.add(payload["referenceId"])
+        if self.checkpoint is not None and self.checkpoint.is_done(payload["referenceId"]):
+            return _entry(index, row, key, debt_id, PAYMENT_SKIPPED), debt_id, payload
+        if self.dry_run:
+            return _entry(index, row, key, debt_id, PAYMENT_DRY_RUN), debt_id, payload
+        return None, debt_id, payload
+
+    def _done(self, index: int, row: Dict, debt_id: str, payload: Dict, status: str) -> Dict:
+        if self.checkpoint is not None:
+            self.checkpoint.mark_done(payload["referenceId"], debt_id)
+        return _entry(index, row, self.idempotency_key_field, debt_id, status)
+
+    def _failed(self, index: int, row: Dict, error: BaseException) -> Dict:
+        logger.warning("Payment {} failed: {!r}", row.get(self.idempotency_key_field), error)
+        debt_id = self.index.match(row)[0] if self.index is not None else _field(row, "debtId")
+        return _entry(index, row, self.idempotency_key_field, debt_id, PAYMENT_FAILED, repr(error))
+
+    def _report(self, entries: List[Dict], started_at: float) -> PaymentReconciliationReport:
+        entries.sort(key=lambda entry: entry["index"])
+        unpaid = None
+        if self.index is not None:
+            paid = {entry["debtId"] for entry in entries if entry["status"] in _PAID}
+            unpaid = [debt_id for debt_id in self.index.balances if debt_id not in paid]
+        return PaymentReconciliationReport(entries, unpaid, time.perf_counter() - started_at)
+
+    def _close(self):
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+    @staticmethod
+    def _is_uncertain(e: BaseException) -> bool:
+        """Failures after which the payment may or may not have been applied."""
+        if isinstance(e, httpx.HTTPStatusError):
+            return e.response.status_code >= 500 or e.response.status_code == 429
+        return isinstance(e, httpx.TransportError)
+
+    @staticmethod
+    def _applied(payments: List[Dict], reference_id: str) -> bool:
+        return any(payment.get("referenceId") == reference_id for payment in payments)
+
+
+class PaymentSubmissionSync(PaymentSubmissionBase):
+
+    def run(self, payments: PaymentsSource, match_open_debts: Optional[bool]) -> PaymentReconciliationReport:
+        started_at = time.perf_counter()
+        rows = read_payments(payments)
+        entries = []
+        try:
+            rows = self._load_index(rows, match_open_debts)
+            with httpx.Client(base_url=self.altscore_client._cms_base_url,
+                              limits=pooled_limits(self.concurrency)) as client:
+                def submit(item: Tuple[int, Dict]) -> Dict:
+                    index, row = item
+                    entry, debt_id, payload = self._prepare(index, row)
+                    if entry is not None:
+                        return entry
+                    return self._done(index, row, debt_id, payload, self._submit(client, debt_id, payload))
+
+                for result in bounded_map(submit, enumerate(rows), concurrency=self.concurrency, ordered=False):
+                    if result.is_success:
+                        entries.append(result.result)
+                    else:
+                        entries.append(self._failed(*result.item, result.error))
+        finally:
+            self._close()
+        return self._report(entries, started_at)
+
+    def _load_index(self, rows: Iterator[Dict], match_open_debts: Optional[bool]) -> Iterator[Dict]:
+        """Loads the open debts when asked to, or when the first row has no debtId (None)."""
+        if match_open_debts is None:
+            first = next(rows, None)
+            if first is None:
+                return iter(())
+            match_open_debts = _needs_index(first)
+            rows = _chain_first(first, rows)
+        if match_open_debts:
+            self.index = OpenDebtIndex(self.debts_module.iter_raw(concurrency=self.concurrency, status="active"))
+        return rows
+
+    def _submit(self, client: httpx.Client, debt_id: str, payload: Dict) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._post_payment_with(client, debt_id, payload)
+            except Exception as e:
+                if not self._is_uncertain(e):
+                    raise
+                # checked after the last attempt too, so an applied payment is not reported failed and
+                # posted again by the next run
+                wait = 2 ** attempt
+                logger.warning("Payment {} to debt {} failed with {!r}, checking it in {}s",
+                               payload["referenceId"], debt_id, e, wait)
+                time.sleep(wait)
+                if self._applied(self._get_payments_with(client, debt_id), payload["referenceId"]):
+                    return PAYMENT_ALREADY_APPLIED
+                if attempt >= self.max_retries:
+                    raise
+
+    def _post_payment_with(self, client: httpx.Client, debt_id: str, payload: Dict) -> str:
+        # not retry_on_401: its 5xx retries would post the payment again without checking it
+        response = client.post(DebtBase._payments(debt_id), headers=self.build_headers(), json=payload, timeout=60)
+        if response.status_code == 401:
+            self.renew_token()
+            response = client.post(DebtBase._payments(debt_id), headers=self.build_headers(), json=payload,
+                                   timeout=60)
+        if response.status_code == 409:
+            return PAYMENT_ALREADY_APPLIED
+        raise_for_status_improved(response)
+        return PAYMENT_SUBMITTED
+
+    def _get_payments_with(self, client: httpx.Client, debt_id: str) -> List[Dict]:
+        response = client.get(DebtBase._payments(debt_id), headers=self.build_headers(), timeout=60)
+        if response.status_code == 401:
+            self.renew_token()
+            response = client.get(DebtBase._payments(debt_id), headers=self.build_headers(), timeout=60)
+        raise_for_status_improved(response)
+        return response.json()
+
+
+class PaymentSubmissionAsync(PaymentSubmissionBase):
+
+    async def run(self, payments: Union[PaymentsSource, AsyncIterator[Dict]],
+                  match_open_debts: Optional[bool]) -> PaymentReconciliationReport:
+        started_at = time.perf_counter()
+        rows = _aiter_rows(payments)
+        entries = []
+        try:
+            rows = await self._load_index(rows, match_open_debts)
+            async with httpx.AsyncClient(base_url=self.altscore_client._cms_base_url,
+                                         limits=pooled_limits(self.concurrency)) as client:
+                async def submit(item: Tuple[int, Dict]) -> Dict:
+                    index, row = item
+                    entry, debt_id, payload = self._prepare(index, row)
+                    if entry is not None:
+                        return entry
+                    status = await self._submit(client, debt_id, payload)
+                    if self.checkpoint is not None:
+                        await self.checkpoint.mark_done_async(payload["referenceId"], debt_id)
+                    return _entry(index, row, self.idempotency_key_field, debt_id, status)
+
+                async for result in bounded_map_async(submit, _aenumerate(rows), concurrency=self.concurrency,
+                                                      ordered=False):
+                    if result.is_success:
+                        entries.append(result.result)
+                    else:
+                        entries.append(self._failed(*result.item, result.error))
+        finally:
+            self._close()
+        return self._report(entries, started_at)
+
+    async def _load_index(self, rows: AsyncIterator[Dict], match_open_debts: Optional[bool]) -> AsyncIterator[Dict]:
+        if match_open_debts is None:
+            try:
+                first = await rows.__anext__()
+            except StopAsyncIteration:
+                return _aiter_rows([])
+            match_open_debts = _needs_index(first)
+            rows = _achain_first(first, rows)
+        if match_open_debts:
+            self.index = OpenDebtIndex([
+                debt async for debt in self.debts_module.iter_raw(concurrency=self.concurrency, status="active")
+            ])
+        return rows
+
+    async def _submit(self, client: httpx.AsyncClient, debt_id: str, payload: Dict) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._post_payment_with(client, debt_id, payload)
+            except Exception as e:
+                if not self._is_uncertain(e):
+                    raise
+                # checked after the last attempt too, so an applied payment is not reported failed and
+                # posted again by the next run
+                wait = 2 ** attempt
+                logger.warning("Payment {} to debt {} failed with {!r}, checking it in {}s",
+                               payload["referenceId"], debt_id, e, wait)
+                await asyncio.sleep(wait)
+                if self._applied(await self._get_payments_with(client, debt_id), payload["referenceId"]):
+                    return PAYMENT_ALREADY_APPLIED
+                if attempt >= self.max_retries:
+                    raise
+
+    async def _post_payment_with(self, client: httpx.AsyncClient, debt_id: str, payload: Dict) -> str:
+        response = await client.post(DebtBase._payments(debt_id), headers=self.build_headers(), json=payload,
+                                     timeout=60)
+        if response.status_code == 401:
+            self.renew_token()
+            response = await client.post(DebtBase._payments(debt_id), headers=self.build_headers(), json=payload,
+                                         timeout=60)
+        if response.status_code == 409:
+            return PAYMENT_ALREADY_APPLIED
+        raise_for_status_improved(response)
+        return PAYMENT_SUBMITTED
+
+    async def _get_payments_with(self, client: httpx.AsyncClient, debt_id: str) -> List[Dict]:
+        response = await client.get(DebtBase._payments(debt_id), headers=self.build_headers(), timeout=60)
+        if response.status_code == 401:
+            self.renew_token()
+            response = await client.get(DebtBase._payments(debt_id), headers=self.build_headers(), timeout=60)
+        raise_for_status_improved(response)
+        return response.json()
+
+
+def _chain_first(first: Dict, rows: Iterator[Dict]) -> Iterator[Dict]:
+    yield first
+    yield from rows
+
+
+async def _achain_first(first: Dict, rows: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+    yield first
+    async for row in rows:
+        yield row
+
+
+async def _aiter_rows(payments) -> AsyncIterator[Dict]:
+    if hasattr(payments, "__aiter__"):
+        async for row in payments:
+            yield row
+        return
+    if not isinstance(payments, (str, os.PathLike)):
+        for row in payments:
+            yield row
+        return
+    # the file is read and parsed in the default executor, a batch of rows at a time
+    loop = asyncio.get_running_loop()
+    rows = read_payments(payments)
+    while True:
+        batch = await loop.run_in_executor(None, _next_rows, rows, _READ_BATCH_SIZE)
+        if not batch:
+            return
+        for row in batch:
+            yield row
+
+
+def _next_rows(rows: Iterator[Dict], size: int) -> List[Dict]:
+    return list(itertools.islice(rows, size))
+
+
+async def _aenumerate(rows: AsyncIterator[Dict]) -> AsyncIterator[Tuple[int, Dict]]:
+    index = 0
+    async for row in rows:
+        yield index, row
+        index += 1
@@ -0,0 +1,462 @@
+import asyncio
+import csv
+import importlib.util
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import httpx
+from loguru import logger
+from altscore.cms.helpers import build_headers
+from altscore.cms.model.clients import ClientBase
+from altscore.cms.model.debts import DebtBase
+from altscore.cms.model.generics import _page_count, _total_count
+from altscore.common.concurrency import bounded_map, bounded_map_async, call_with_retries, \
+    call_with_retries_async, is_transient_error, pooled_limits
+from altscore.common.http_errors import raise_for_status_improved
+
+PORTFOLIO_ENTITIES = ("summaries", "credit_accounts", "debts", "payments")
+SNAPSHOT_FORMATS = ("auto", "csv", "parquet")
+
+
+def _check_include(include: Sequence[str]) -> Tuple[str, ...]:
+    include = tuple(include)
+    unknown = [e for e in include if e not in PORTFOLIO_ENTITIES]
+    if unknown or not include:
+        raise ValueError(f"include must be a non empty subset of {PORTFOLIO_ENTITIES}, got {list(include)}")
+    return include
+
+
+def _as_text(values):
+    import pyarrow as pa
+    return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def flatten_record(obj: Dict, prefix: str = "") -> Dict[str, Any]:
+    """
+    Flattens nested objects into dotted columns (e.g. "balance.total.amount"). Lists, such as the
+    schedule of a debt, are kept as a JSON string in a single column.
+    """
+    row = {}
+    for key, value in obj.items():
+        column = f"{prefix}{key}"
+        if isinstance(value, dict):
+            row.update(flatten_record(value, f"{column}."))
+        elif isinstance(value, list):
+            row[column] = json.dumps(value, default=str)
+        else:
+            row[column] = value
+    return row
+
+
+class PortfolioSnapshotWriter:
+    """
+    Writes the rows of every entity of a snapshot to `output_dir/<entity>/part-00000.<ext>` files
+    of at most `chunk_rows` rows, so only one chunk per entity is held in memory.
+
+    `file_format` is "parquet" (requires pyarrow), "csv" or "auto", which picks Parquet when
+    pyarrow is installed. Every part of an entity has the schema of its first part, so the entity
+    directory reads as one dataset: the columns of the first chunk in their order and, in Parquet,
+    their types (text for the columns that were empty). Later chunks are padded with nulls and cast
+    to it; columns that only appear after the first chunk are dropped with a warning. A column whose
+    values in a later chunk do not fit the type of the first one is written in that part as float
+    (integer columns with decimals) or text, and listed in `warnings`.
+    """
+
+    def __init__(self, output_dir: str, file_format: str = "auto", chunk_rows: int = 50_000):
+        if file_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"file_format must be one of {SNAPSHOT_FORMATS}")
+        if file_format == "auto":
+            file_format = "parquet" if importlib.util.find_spec("pyarrow") is not None else "csv"
+        elif file_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+            raise ImportError("Parquet snapshots require pyarrow. Install with \"pip install 'altscore[fast]'\"")
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1")
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.counts: Dict[str, int] = {}
+        self.files: Dict[str, List[str]] = {}
+        self._buffers: Dict[str, List[Dict]] = {}
+        # columns (csv) or pyarrow schema (parquet) of every entity, set by its first part
+        self._schemas: Dict[str, Any] = {}
+        # parts written with a column in another type than the first part of its entity
+        self.warnings: List[str] = []
+
+    def write(self, entity: str, rows: Iterable[Dict]):
+        buffer = self._buffers.setdefault(entity, [])
+        for row in rows:
+            buffer.append(row)
+            self.counts[entity] = self.counts.get(entity, 0) + 1
+            if len(buffer) >= self.chunk_rows:
+                self._flush(entity)
+                buffer = self._buffers[entity]
+
+    def _flush(self, entity: str):
+        rows = self._buffers.get(entity)
+        if not rows:
+            return
+        self._buffers[entity] = []
+        directory = os.path.join(self.output_dir, entity)
+        os.makedirs(directory, exist_ok=True)
+        files = self.files.setdefault(entity, [])
+        path = os.path.join(directory, f"part-{len(files):05d}.{self.file_format}")
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        known = self._schemas.get(entity)
+        if known is not None:
+            names = known if self.file_format == "csv" else known.names
+            dropped = [column for column in columns if column not in set(names)]
+            if dropped:
+                logger.warning("Columns {} of {} are not in the schema of its first part, dropping them",
+                               dropped, entity)
+        if self.file_format == "parquet":
+            self._schemas[entity] = self._write_parquet(path, rows, columns, known)
+        else:
+            self._schemas[entity] = self._write_csv(path, rows, known or columns)
+        files.append(path)
+
+    @staticmethod
+    def _write_csv(path: str, rows: List[Dict], columns: List[str]) -> List[str]:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        return columns
+
+    def _write_parquet(self, path: str, rows: List[Dict], columns: List[str], schema=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrays = {}
+        for column in (schema.names if schema is not None else columns):
+            values = [row.get(column) for row in rows]
+            if schema is None:
+                try:
+                    array = pa.array(values)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # a column with mixed types (e.g. 10 and "10.5"), keep every value as text
+                    array = _as_text(values)
+                # a column without values in the first part takes text, any value later can be cast to it
+                arrays[column] = _as_text(values) if pa.types.is_null(array.type) else array
+                continue
+            field = schema.field(column)
+            try:
+                # inferred and then cast safely: pa.array(values, type=int64) would truncate 2.5 to 2
+                arrays[column] = pa.array(values).cast(field.type)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                try:
+                    arrays[column] = _as_text(values).cast(field.type)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    arrays[column] = self._widened(path, column, values, field.type)
+        table = pa.Table.from_arrays(list(arrays.values()), names=list(arrays))
+        pq.write_table(table, path)
+        return table.schema if schema is None else schema
+
+    def _widened(self, path: str, column: str, values: List, first_type):
+        """Values that do not fit the type of the first part of their column: float for numbers, else text."""
+        import pyarrow as pa
+        array = None
+        if pa.types.is_integer(first_type):
+            try:
+                array = pa.array(values, type=pa.float64())
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+        if array is None:
+            array = _as_text(values)
+        message = (f"Column {column} of {path} is written as {array.type}, its values are not {first_type} "
+                   f"as in the first part")
+        logger.warning(message)
+        self.warnings.append(message)
+        return array
+
+    def close(self) -> Dict[str, List[str]]:
+        for entity in list(self._buffers):
+            self._flush(entity)
+        return self.files
+
+
+class PortfolioExportResult:
+
+    def __init__(self, output_dir: str, file_format: str, counts: Dict[str, int], files: Dict[str, List[str]],
+                 errors: List[Dict], wall_time: float, warnings: Optional[List[str]] = None):
+        self.output_dir = output_dir
+        self.file_format = file_format
+        # rows written by entity
+        self.counts = counts
+        self.files = files
+        # {"entity", "key", "error"} of the pages and items that could not be fetched
+        self.errors = errors
+        self.wall_time = wall_time
+        # parts whose columns were written in another type than the first part, see PortfolioSnapshotWriter
+        self.warnings = warnings or []
+
+    @property
+    def is_success(self) -> bool:
+        return not self.errors
+
+    def __repr__(self):
+        counts = " ".join(f"{entity}={count}" for entity, count in self.counts.items())
+        return (f"<PortfolioExportResult {self.file_format} {counts} errors={len(self.errors)} "
+                f"wall_time={self.wall_time:.1f}s>")
+
+
+class PortfolioExportBase:
+    """
+    Pages the clients (with their summary when it is included) and the debts of a partner with up
+    to `concurrency` requests in flight, fetches the credit accounts of every client and the
+    payments of every debt, and streams every row to a PortfolioSnapshotWriter.
+    """
+
+    def __init__(self, altscore_client, partner_id: Optional[str], include: Sequence[str], concurrency: int,
+                 product_families: Sequence[str], per_page: int, max_retries: int):
+        if per_page > 100:
+            logger.warning("per_page is greater than 100, setting it to 100")
+            per_page = 100
+        self.altscore_client = altscore_client
+        self.partner_id = partner_id
+        self.include = _check_include(include)
+        self.concurrency = concurrency
+        self.product_families = tuple(product_families)
+        self.per_page = per_page
+        self.max_retries = max_retries
+        self.errors: List[Dict] = []
+
+    def renew_token(self):
+        self.altscore_client.renew_token()
+
+    def build_headers(self):
+        return build_headers(self, partner_id=self.partner_id)
+
+    @property
+    def _clients_path(self) -> Optional[str]:
+        if "summaries" in self.include:
+            return "/v2/clients-summary"
+        if "credit_accounts" in self.include:
+            return "/v2/clients"
+        return None
+
+    @property
+    def _debts_path(self) -> Optional[str]:
+        if "debts" in self.include or "payments" in self.include:
+            return "/v1/debts"
+        return None
+
+    def _page_params(self, page: int) -> Dict:
+        return {"page": page, "per-page": self.per_page}
+
+    def _should_retry(self, e: BaseException) -> bool:
+        """The only retry layer of the export: renews the token on 401 and retries it, 5xx and transient errors."""
+        if isinstance(e, httpx.HTTPStatusError):
+            if e.response.status_code == 401:
+                self.renew_token()
+                return True
+            if e.response.status_code >= 500:
+                return True
+        return is_transient_error(e)
+
+    def _failed(self, entity: str, key: str, e: BaseException):
+        logger.warning("Could not export {} {}: {!r}", entity, key, e)
+        self.errors.append({"entity": entity, "key": key, "error": repr(e)})
+
+    def _child_items(self, entity: str, rows: List[Dict]) -> List[Tuple[str, str]]:
+        """(key, path) of the credit accounts of a page of clients or the payments of a page of debts."""
+        if entity == "credit_accounts":
+            client_ids = [(row.get("client") or row).get("clientId") for row in rows]
+            return [
+                (f"{client_id}/{product_family}", ClientBase._credit_accounts(client_id, product_family))
+                for client_id in client_ids if client_id
+                for product_family in self.product_families
+            ]
+        return [(row["debtId"], DebtBase._payments(row["debtId"])) for row in rows if row.get("debtId")]
+
+    @staticmethod
+    def _child_rows(content) -> List[Dict]:
+        if content is None:
+            return []
+        if isinstance(content, list):
+            return [flatten_record(item) for item in content]
+        return [flatten_record(content)]
+
+
+class PortfolioExportSync(PortfolioExportBase):
+
+    def run(self, writer: PortfolioSnapshotWriter) -> PortfolioExportResult:
+        started_at = time.perf_counter()
+        with httpx.Client(base_url=self.altscore_client._cms_base_url,
+                          limits=pooled_limits(self.concurrency)) as client:
+            if self._clients_path is not None:
+                for rows in self._iter_pages(client, "clients", self._clients_path):
+                    if "summaries" in self.include:
+                        writer.write("summaries", (flatten_record(row) for row in rows))
+                    if "credit_accounts" in self.include:
+                        writer.write("credit_accounts", self._fetch_children(client, "credit_accounts", rows))
+            if self._debts_path is not None:
+                for rows in self._iter_pages(client, "debts", self._debts_path):
+                    if "debts" in self.include:
+                        writer.write("debts", (flatten_record(row) for row in rows))
+                    if "payments" in self.include:
+                        writer.write("payments", self._fetch_children(client, "payments", rows))
+        files = writer.close()
+        return PortfolioExportResult(writer.output_dir, writer.file_format, dict(writer.counts), files,
+                                     self.errors, time.perf_counter() - started_at, writer.warnings)
+
+    def _iter_pages(self, client: httpx.Client, entity: str, path: str) -> Iterator[List[Dict]]:
+        """
+        Yields the pages of a listing as they arrive, in no particular order: the first page gives
+        x-total-count and the rest are fetched in parallel. Without the header pages are read one
+        after the other until a short page.
+        """
+        try:
+            rows, total_count = call_with_retries(self._get_page_with, client, path, 1,
+                                                  max_retries=self.max_retries,
+                                                  is_retryable=self._should_retry)
+        except Exception as e:
+            self._failed(entity, "page 1", e)
+            return
+        yield rows
+        if total_count is None:
+            page = 1
+            while len(rows) >= self.per_page:
+                page += 1
+                try:
+                    rows, _ = call_with_retries(self._get_page_with, client, path, page,
+                                                max_retries=self.max_retries,
+                                                is_retryable=self._should_retry)
+                except Exception as e:
+                    self._failed(entity, f"page {page}", e)
+                    return
+                yield rows
+            return
+
+        def fetch(page: int):
+            return call_with_retries(self._get_page_with, client, path, page, max_retries=self.max_retries,
+                                     is_retryable=self._should_retry)
+
+        pages = range(2, _page_count(total_count, self.per_page) + 1)
+        # unordered so a slow page does not hold the ones that already arrived in memory
+        for result in bounded_map(fetch, pages, concurrency=self.concurrency, ordered=False):
+            if result.is_success:
+                yield result.result[0]
+            else:
+                self._failed(entity, f"page {result.item}", result.error)
+
+    def _fetch_children(self, client: httpx.Client, entity: str, rows: List[Dict]) -> List[Dict]:
+        def fetch(item: Tuple[str, str]):
+            return call_with_retries(self._get_optional_with, client, item[1], max_retries=self.max_retries,
+                                     is_retryable=self._should_retry)
+
+        children = []
+        for result in bounded_map(fetch, self._child_items(entity, rows), concurrency=self.concurrency,
+                                  ordered=False):
+            if result.is_success:
+                children.extend(self._child_rows(result.result))
+            else:
+                self._failed(entity, result.item[0], result.error)
+        return children
+
+    def _get_page_with(self, client: httpx.Client, path: str, page: int) -> Tuple[List[Dict], Optional[int]]:
+        response = client.get(path, headers=self.build_headers(), params=self._page_params(page), timeout=120)
+        raise_for_status_improved(response)
+        return response.json(), _total_count(response)
+
+    def _get_optional_with(self, client: httpx.Client, path: str):
+        response = client.get(path, headers=self.build_headers(), timeout=120)
+        # clients without a credit account of the product family
+        if response.status_code == 404:
+            return None
+        raise_for_status_improved(response)
+        return response.json()
+
+
+class PortfolioExportAsync(PortfolioExportBase):
+
+    async def run(self, writer: PortfolioSnapshotWriter) -> PortfolioExportResult:
+        started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        async def write(entity: str, rows: List[Dict]):
+            # flushing a full chunk to disk runs off the event loop
+            await loop.run_in_executor(None, writer.write, entity, rows)
+
+        async with httpx.AsyncClient(base_url=self.altscore_client._cms_base_url,
+                                     limits=pooled_limits(self.concurrency)) as client:
+            if self._clients_path is not None:
+                async for rows in self._iter_pages(client, "clients", self._clients_path):
+                    if "summaries" in self.include:
+                        await write("summaries", [flatten_record(row) for row in rows])
+                    if "credit_accounts" in self.include:
+                        await write("credit_accounts", await self._fetch_children(client, "credit_accounts", rows))
+            if self._debts_path is not None:
+                async for rows in self._iter_pages(client, "debts", self._debts_path):
+                    if "debts" in self.include:
+                        await write("debts", [flatten_record(row) for row in rows])
+                    if "payments" in self.include:
+                        await write("payments", await self._fetch_children(client, "payments", rows))
+        files = await loop.run_in_executor(None, writer.close)
+        return PortfolioExportResult(writer.output_dir, writer.file_format, dict(writer.counts), files,
+                                     self.errors, time.perf_counter() - started_at, writer.warnings)
+
+    async def _iter_pages(self, client: httpx.AsyncClient, entity: str, path: str) -> AsyncIterator[List[Dict]]:
+        """Async counterpart of PortfolioExportSync._iter_pages."""
+        try:
+            rows, total_count = await call_with_retries_async(self._get_page_with, client, path, 1,
+                                                              max_retries=self.max_retries,
+                                                              is_retryable=self._should_retry)
+        except Exception as e:
+            self._failed(entity, "page 1", e)
+            return
+        yield rows
+        if total_count is None:
+            page = 1
+            while len(rows) >= self.per_page:
+                page += 1
+                try:
+                    rows, _ = await call_with_retries_async(self._get_page_with, client, path, page,
+                                                            max_retries=self.max_retries,
+                                                            is_retryable=self._should_retry)
+                except Exception as e:
+                    self._failed(entity, f"page {page}", e)
+                    return
+                yield rows
+            return
+
+        async def fetch(page: int):
+            return await call_with_retries_async(self._get_page_with, client, path, page,
+                                                 max_retries=self.max_retries,
+                                                 is_retryable=self._should_retry)
+
+        pages = range(2, _page_count(total_count, self.per_page) + 1)
+        async for result in bounded_map_async(fetch, pages, concurrency=self.concurrency, ordered=False):
+            if result.is_success:
+                yield result.result[0]
+            else:
+                self._failed(entity, f"page {result.item}", result.error)
+
+    async def _fetch_children(self, client: httpx.AsyncClient, entity: str, rows: List[Dict]) -> List[Dict]:
+        async def fetch(item: Tuple[str, str]):
+            return await call_with_retries_async(self._get_optional_with, client, item[1],
+                                                 max_retries=self.max_retries,
+                                                 is_retryable=self._should_retry)
+
+        children = []
+        async for result in bounded_map_async(fetch, self._child_items(entity, rows),
+                                              concurrency=self.concurrency, ordered=False):
+            if result.is_success:
+                children.extend(self._child_rows(result.result))
+            else:
+                self._failed(entity, result.item[0], result.error)
+        return children
+
+    async def _get_page_with(self, client: httpx.AsyncClient, path: str,
+                             page: int) -> Tuple[List[Dict], Optional[int]]:
+        response = await client.get(path, headers=self.build_headers(), params=self._page_params(page),
+                                    timeout=120)
+        raise_for_status_improved(response)
+        return response.json(), _total_count(response)
+
+    async def _get_optional_with(self, client: httpx.AsyncClient, path: str):
+        response = await client.get(path, headers=self.build_headers(), timeout=120)
+        if response.status_code == 404:
+            return None
+        raise_for_status_improved(response)
+        return response.json()
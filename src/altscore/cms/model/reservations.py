@@ -0,0 +1,432 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import httpx
+from loguru import logger
+from altscore.cms.helpers import build_headers
+from altscore.cms.model.clients import ClientBase
+from altscore.common.concurrency import pooled_limits
+from altscore.common.http_errors import raise_for_status_improved, retry_on_401, retry_on_401_async
+
+# the create request was not sent yet
+RESERVATION_PENDING = "pending"
+RESERVATION_RESERVED = "reserved"
+RESERVATION_COMMITTED = "committed"
+# deleted, or dropped before its create request was sent
+RESERVATION_RELEASED = "released"
+RESERVATION_EXPIRED = "expired"
+RESERVATION_FAILED = "failed"
+_FINAL_STATUSES = (RESERVATION_COMMITTED, RESERVATION_RELEASED, RESERVATION_EXPIRED, RESERVATION_FAILED)
+
+
+class ReservationHandle:
+    """
+    A credit line reservation of a client tracked by a reservation manager. Operations on it are
+    queued and sent in order; `created` resolves when the reservation exists in the CMS.
+    """
+
+    def __init__(self, client_id: str, product_family: str, source_id: str, partner_id: Optional[str],
+                 expires_at: float):
+        self.client_id = client_id
+        self.product_family = product_family
+        self.source_id = source_id
+        self.partner_id = partner_id
+        self.expires_at = expires_at
+        self.status = RESERVATION_PENDING
+        self.error: Optional[BaseException] = None
+        self.created = None
+        # [operation, body, future] not sent yet
+        self._ops: List[list] = []
+        self._running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_outstanding(self) -> bool:
+        return self.status in (RESERVATION_PENDING, RESERVATION_RESERVED)
+
+    def __repr__(self):
+        return f"ReservationHandle({self.client_id}, {self.product_family}, {self.source_id}, {self.status})"
+
+
+def _source_id(reservation: Dict, source_id: Optional[str]) -> str:
+    source_id = source_id or reservation.get("sourceId") or reservation.get("source_id")
+    if not source_id:
+        raise ValueError("The source id of the reservation is required, pass source_id or set sourceId")
+    return source_id
+
+
+def _resolve(future, result=None, error: Optional[BaseException] = None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class ReservationManagerBase:
+    """
+    Pipelines reservation operations of many clients: each reservation has its own queue, sent in
+    order, while up to `concurrency` reservations have a request in flight over one connection pool.
+
+    Operations still queued are coalesced: an update of a reservation whose create was not sent is
+    merged into the create body, consecutive updates keep the last one, and releasing a reservation
+    whose create was not sent drops it without any request, cancelling the futures of the create
+    and of whatever was queued after it. Reservations not committed or released
+    within `ttl` seconds are released automatically, checked every `reap_interval` seconds.
+    """
+
+    def __init__(self, altscore_client, concurrency: int = 16, ttl: float = 900, reap_interval: float = 30,
+                 partner_id: Optional[str] = None):
+        self.altscore_client = altscore_client
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.reap_interval = reap_interval
+        self.partner_id = partner_id
+        self._handles: Dict[Tuple[str, str, str], ReservationHandle] = {}
+        self._handles_lock = threading.Lock()
+        self._closed = False
+
+    def renew_token(self):
+        self.altscore_client.renew_token()
+
+    def _track(self, client_id: str, product_family: str, reservation: Dict, source_id: Optional[str],
+               partner_id: Optional[str], ttl: Optional[float]) -> ReservationHandle:
+        if self._closed:
+            raise RuntimeError("The reservation manager is closed")
+        source_id = _source_id(reservation, source_id)
+        key = (client_id, product_family, source_id)
+        with self._handles_lock:
+            existing = self._handles.get(key)
+            if existing is not None and existing.is_outstanding:
+                raise ValueError(f"Reservation {source_id} of client {client_id} is already {existing.status}")
+            handle = ReservationHandle(client_id, product_family, source_id, partner_id or self.partner_id,
+                                       time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._handles[key] = handle
+        return handle
+
+    def _queue(self, handle: ReservationHandle, operation: str, body: Optional[Dict], future) -> Tuple[object, bool]:
+        """
+        Queues an operation, coalescing it with the ones not sent yet. Returns the future it resolves
+        and whether the queue of the reservation has to be started.
+        """
+        with handle._lock:
+            if handle.status in _FINAL_STATUSES:
+                raise ValueError(f"Reservation {handle.source_id} of client {handle.client_id} is {handle.status}")
+            last = handle._ops[-1] if handle._ops else None
+            if operation == "update" and last is not None and last[0] in ("create", "update"):
+                last[1] = {**last[1], **body} if last[0] == "create" else body
+                return last[2], False
+            if operation == "delete" and any(op[0] == "create" for op in handle._ops):
+                # nothing was sent: the create and what was queued after it never happen
+                for op in handle._ops:
+                    op[2].cancel()
+                handle._ops = []
+                handle.status = RESERVATION_RELEASED
+                _resolve(future, handle)
+                return future, False
+            handle._ops.append([operation, body, future])
+            if handle._running:
+                return future, False
+            handle._running = True
+            return future, True
+
+    def _next_op(self, handle: ReservationHandle) -> Optional[list]:
+        with handle._lock:
+            if not handle._ops:
+                handle._running = False
+                return None
+            return handle._ops.pop(0)
+
+    def _done(self, handle: ReservationHandle, operation: str, error: Optional[BaseException]):
+        with handle._lock:
+            if error is not None:
+                handle.error = error
+                if operation == "create":
+                    handle.status = RESERVATION_FAILED
+                for op in handle._ops:
+                    _resolve(op[2], error=error)
+                handle._ops = []
+                return
+            if operation == "create":
+                handle.status = RESERVATION_RESERVED
+            elif operation == "commit":
+                handle.status = RESERVATION_COMMITTED
+            elif operation in ("delete", "expire"):
+                handle.status = RESERVATION_RELEASED if operation == "delete" else RESERVATION_EXPIRED
+
+    def _request_args(self, handle: ReservationHandle, operation: str, body: Optional[Dict]) -> Tuple[str, str, Dict]:
+        if operation == "create":
+            return "POST", ClientBase._reservations(handle.client_id, handle.product_family), body
+        if operation == "update":
+            return "PUT", ClientBase._reservations_source(handle.client_id, handle.product_family,
+                                                          handle.source_id), body
+        if operation == "commit":
+            return "PUT", ClientBase._commit_reservation(handle.client_id, handle.product_family,
+                                                         handle.source_id), None
+        return "DELETE", ClientBase._reservations_source(handle.client_id, handle.product_family,
+                                                         handle.source_id), None
+
+    @staticmethod
+    def _is_expected(operation: str, response: httpx.Response) -> bool:
+        """A create already applied by a retried request, or a delete of a reservation already gone."""
+        return (operation == "create" and response.status_code == 409) or \
+            (operation in ("delete", "expire") and response.status_code == 404)
+
+    def outstanding(self) -> List[ReservationHandle]:
+        """Reservations created or being created that were not committed or released yet."""
+        with self._handles_lock:
+            return [handle for handle in self._handles.values() if handle.is_outstanding]
+
+    def _expired(self) -> List[ReservationHandle]:
+        now = time.monotonic()
+        with self._handles_lock:
+            # committed and released reservations are not tracked any longer
+            for key in [key for key, handle in self._handles.items() if handle.status in _FINAL_STATUSES]:
+                del self._handles[key]
+            return [handle for handle in self._handles.values()
+                    if handle.is_outstanding and handle.expires_at <= now]
+
+    def _expire_with(self, handle: ReservationHandle, enqueue):
+        """Releases an expired reservation with `enqueue(handle, operation)` of the manager."""
+        try:
+            if handle.status == RESERVATION_PENDING and any(op[0] == "create" for op in handle._ops):
+                enqueue(handle, "delete")
+                handle.status = RESERVATION_EXPIRED
+                return
+            logger.info("Reservation {} of client {} expired, releasing it", handle.source_id, handle.client_id)
+            enqueue(handle, "expire")
+        except ValueError:
+            # committed or released in the meantime
+            pass
+
+
+class ReservationManagerSync(ReservationManagerBase):
+    """
+    ReservationManagerBase over a thread pool: the operations return concurrent.futures.Future.
+
+        with cms.clients.reservation_manager(concurrency=32) as reservations:
+            handle = reservations.reserve(client_id, "dpa", {"sourceId": order_id, "amount": amount})
+            reservations.commit(handle).result()
+    """
+
+    def __init__(self, altscore_client, concurrency: int = 16, ttl: float = 900, reap_interval: float = 30,
+                 partner_id: Optional[str] = None):
+        super().__init__(altscore_client, concurrency=concurrency, ttl=ttl, reap_interval=reap_interval,
+                         partner_id=partner_id)
+        self._client = httpx.Client(base_url=altscore_client._cms_base_url, limits=pooled_limits(concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cms-reservations")
+        self._stop = threading.Event()
+        self._reaper = threading.Thread(target=self._reap, name="cms-reservations-reaper", daemon=True)
+        self._reaper.start()
+
+    def _enqueue(self, handle: ReservationHandle, operation: str, body: Optional[Dict] = None) -> Future:
+        future, start = self._queue(handle, operation, body, Future())
+        if start:
+            self._executor.submit(self._drain, handle)
+        return future
+
+    def _drain(self, handle: ReservationHandle):
+        while True:
+            op = self._next_op(handle)
+            if op is None:
+                return
+            operation, body, future = op
+            try:
+                self._send(handle, operation, body)
+            except Exception as e:
+                self._done(handle, operation, e)
+                _resolve(future, error=e)
+            else:
+                self._done(handle, operation, None)
+                _resolve(future, handle)
+
+    @retry_on_401
+    def _send(self, handle: ReservationHandle, operation: str, body: Optional[Dict]):
+        method, url, json = self._request_args(handle, operation, body)
+        response = self._client.request(method, url, json=json, timeout=30,
+                                        headers=build_headers(self, partner_id=handle.partner_id))
+        if not self._is_expected(operation, response):
+            raise_for_status_improved(response)
+
+    def reserve(self, client_id: str, product_family: str, reservation: Dict, source_id: Optional[str] = None,
+                partner_id: Optional[str] = None, ttl: Optional[float] = None) -> ReservationHandle:
+        """Queues the creation of a reservation and returns right away; handle.created resolves once it exists."""
+        handle = self._track(client_id, product_family, reservation, source_id, partner_id, ttl)
+        handle.created = self._enqueue(handle, "create", reservation)
+        return handle
+
+    def reserve_and_commit(self, client_id: str, product_family: str, reservation: Dict,
+                           source_id: Optional[str] = None, partner_id: Optional[str] = None) -> Future:
+        """Creates and commits a reservation back to back on the same worker."""
+        return self.commit(self.reserve(client_id, product_family, reservation, source_id, partner_id))
+
+    def update(self, handle: ReservationHandle, reservation: Dict) -> Future:
+        return self._enqueue(handle, "update", reservation)
+
+    def commit(self, handle: ReservationHandle) -> Future:
+        return self._enqueue(handle, "commit")
+
+    def release(self, handle: ReservationHandle) -> Future:
+        return self._enqueue(handle, "delete")
+
+    def expire(self) -> List[ReservationHandle]:
+        """Releases the reservations past their ttl now; returns them."""
+        expired = self._expired()
+        for handle in expired:
+            self._expire_with(handle, self._enqueue)
+        return expired
+
+    def _reap(self):
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.expire()
+            except Exception as e:
+                logger.warning("Could not release expired reservations: {!r}", e)
+
+    def close(self, release_outstanding: bool = True, timeout: Optional[float] = None):
+        """Waits for the queued operations, releasing the reservations still outstanding first if asked to."""
+        if self._closed:
+            return
+        futures = []
+        if release_outstanding:
+            for handle in self.outstanding():
+                try:
+                    futures.append(self.release(handle))
+                except ValueError:
+                    pass
+        self._closed = True
+        self._stop.set()
+        for future in futures:
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                logger.warning("Could not release a reservation: {!r}", e)
+        self._executor.shutdown(wait=True)
+        self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ReservationManagerAsync(ReservationManagerBase):
+    """
+    ReservationManagerBase on the running event loop: the operations return asyncio futures and
+    must be called from within the loop.
+
+        async with cms.clients.reservation_manager(concurrency=32) as reservations:
+            handle = reservations.reserve(client_id, "dpa", {"sourceId": order_id, "amount": amount})
+            await reservations.commit(handle)
+    """
+
+    def __init__(self, altscore_client, concurrency: int = 16, ttl: float = 900, reap_interval: float = 30,
+                 partner_id: Optional[str] = None):
+        super().__init__(altscore_client, concurrency=concurrency, ttl=ttl, reap_interval=reap_interval,
+                         partner_id=partner_id)
+        self._client = httpx.AsyncClient(base_url=altscore_client._cms_base_url, limits=pooled_limits(concurrency))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self._reaper: Optional[asyncio.Task] = None
+
+    def _enqueue(self, handle: ReservationHandle, operation: str, body: Optional[Dict] = None) -> asyncio.Future:
+        future, start = self._queue(handle, operation, body, asyncio.get_running_loop().create_future())
+        if start:
+            self._start(handle)
+        return future
+
+    def _start(self, handle: ReservationHandle):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._reaper is None:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+        task = asyncio.get_running_loop().create_task(self._drain(handle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, handle: ReservationHandle):
+        while True:
+            op = self._next_op(handle)
+            if op is None:
+                return
+            operation, body, future = op
+            try:
+                async with self._semaphore:
+                    await self._send(handle, operation, body)
+            except Exception as e:
+                self._done(handle, operation, e)
+                _resolve(future, error=e)
+            else:
+                self._done(handle, operation, None)
+                _resolve(future, handle)
+
+    @retry_on_401_async
+    async def _send(self, handle: ReservationHandle, operation: str, body: Optional[Dict]):
+        method, url, json = self._request_args(handle, operation, body)
+        response = await self._client.request(method, url, json=json, timeout=30,
+                                              headers=build_headers(self, partner_id=handle.partner_id))
+        if not self._is_expected(operation, response):
+            raise_for_status_improved(response)
+
+    def reserve(self, client_id: str, product_family: str, reservation: Dict, source_id: Optional[str] = None,
+                partner_id: Optional[str] = None, ttl: Optional[float] = None) -> ReservationHandle:
+        """Queues the creation of a reservation and returns right away; await handle.created to wait for it."""
+        handle = self._track(client_id, product_family, reservation, source_id, partner_id, ttl)
+        handle.created = self._enqueue(handle, "create", reservation)
+        return handle
+
+    def reserve_and_commit(self, client_id: str, product_family: str, reservation: Dict,
+                           source_id: Optional[str] = None, partner_id: Optional[str] = None) -> asyncio.Future:
+        """Creates and commits a reservation back to back in the same task."""
+        return self.commit(self.reserve(client_id, product_family, reservation, source_id, partner_id))
+
+    def update(self, handle: ReservationHandle, reservation: Dict) -> asyncio.Future:
+        return self._enqueue(handle, "update", reservation)
+
+    def commit(self, handle: ReservationHandle) -> asyncio.Future:
+        return self._enqueue(handle, "commit")
+
+    def release(self, handle: ReservationHandle) -> asyncio.Future:
+        return self._enqueue(handle, "delete")
+
+    def expire(self) -> List[ReservationHandle]:
+        """Releases the reservations past their ttl now; returns them."""
+        expired = self._expired()
+        for handle in expired:
+            self._expire_with(handle, self._enqueue)
+        return expired
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                self.expire()
+            except Exception as e:
+                logger.warning("Could not release expired reservations: {!r}", e)
+
+    async def close(self, release_outstanding: bool = True):
+        """Waits for the queued operations, releasing the reservations still outstanding first if asked to."""
+        if self._closed:
+            return
+        if release_outstanding:
+            for handle in self.outstanding():
+                try:
+                    self.release(handle)
+                except ValueError:
+                    pass
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
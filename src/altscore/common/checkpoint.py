@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+
+class Checkpoint:
+    """
+    Append-only JSON lines record of the items of a long run that already succeeded, so that a
+    crashed or interrupted run can be started again with the same inputs and skip them.
+    Each line is {"key": ..., "value": ...}; keys are compared as strings.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._done: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut short by a crash, the item will simply run again
+                        continue
+                    self._done[str(entry["key"])] = entry.get("value")
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __len__(self):
+        return len(self._done)
+
+    def is_done(self, key) -> bool:
+        return str(key) in self._done
+
+    def get(self, key) -> Optional[Any]:
+        return self._done.get(str(key))
+
+    def mark_done(self, key, value: Any = None):
+        with self._lock:
+            self._done[str(key)] = value
+            self._file.write(json.dumps({"key": key, "value": value}, default=str) + "\n")
+            self._file.flush()
+
+    async def mark_done_async(self, key, value: Any = None):
+        """mark_done in the default executor, so the write does not block the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.mark_done, key, value)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,267 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Union
+import httpx
+from loguru import logger
+
+# Responses that mean "slow down" rather than "this item is wrong"
+OVERLOAD_STATUS_CODES = {429, 502, 503, 504}
+
+
+def is_overload_error(e: BaseException) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code in OVERLOAD_STATUS_CODES
+    return isinstance(e, (httpx.TimeoutException, httpx.NetworkError))
+
+
+def is_transient_error(e: BaseException) -> bool:
+    """Overload errors that retry_on_401 does not retry by itself: 429, timeouts and connection errors."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429
+    return isinstance(e, (httpx.TimeoutException, httpx.NetworkError))
+
+
+def is_unsent_error(e: BaseException) -> bool:
+    """
+    Errors after which the request surely did not run: 429 and failures to connect. The only
+    ones that are safe to retry for calls that are not idempotent.
+    """
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429
+    return isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def pooled_limits(concurrency: int) -> httpx.Limits:
+    """Connection pool limits sized for `concurrency` requests in flight."""
+    return httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+
+class AdaptiveLimit:
+    """
+    Additive-increase / multiplicative-decrease limit on in-flight requests.
+
+    The limit starts at `max_limit`, is halved every time the server signals overload
+    (429, 502-504, timeouts) and grows back by one after a full window of successes.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, adaptive: bool = True):
+        if max_limit < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.max_limit = max_limit
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.adaptive = adaptive
+        self.limit = max_limit
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def on_success(self):
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+
+    def on_error(self, e: BaseException):
+        if not self.adaptive or not is_overload_error(e):
+            return
+        with self._lock:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+
+class BulkItemResult:
+    """Outcome of one item of a bulk operation: either `result` or `error` is set."""
+
+    __slots__ = ("index", "item", "result", "error")
+
+    def __init__(self, index: int, item: Any, result: Any = None, error: Optional[BaseException] = None):
+        self.index = index
+        self.item = item
+        self.result = result
+        self.error = error
+
+    @property
+    def is_success(self) -> bool:
+        return self.error is None
+
+    def unwrap(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def __repr__(self):
+        status = "ok" if self.is_success else f"error={self.error!r}"
+        return f"BulkItemResult(index={self.index}, {status})"
+
+
+def _emit(pending: Dict[int, BulkItemResult], next_index: int, ordered: bool):
+    ready = []
+    if ordered:
+        while next_index in pending:
+            ready.append(pending.pop(next_index))
+            next_index += 1
+    else:
+        ready = list(pending.values())
+        pending.clear()
+    return ready, next_index
+
+
+def _has_room(in_flight: Dict, pending: Dict[int, BulkItemResult], limit: AdaptiveLimit, window: Optional[int]):
+    # ordered results wait in pending behind a slow item, no more items are started once the window is full
+    return len(in_flight) < limit.limit and (window is None or len(in_flight) + len(pending) < window)
+
+
+def bounded_map(fn: Callable[[Any], Any], items: Iterable, concurrency: int = 10, ordered: bool = True,
+                adaptive: bool = True) -> Iterator[BulkItemResult]:
+    """
+    Apply `fn` to every item in a thread pool keeping at most `concurrency` calls in flight.
+
+    Items are pulled lazily from `items`, so arbitrarily long iterables are streamed.
+    Exceptions are captured per item instead of aborting the whole run. With `ordered`
+    results come back in input order, otherwise as soon as they complete; ordered runs hold at
+    most 2 * `concurrency` items between running and waiting for an earlier one.
+    """
+    limit = AdaptiveLimit(concurrency, adaptive=adaptive)
+    iterator = iter(enumerate(items))
+    exhausted = False
+    in_flight = {}
+    pending: Dict[int, BulkItemResult] = {}
+    next_index = 0
+    window = 2 * concurrency if ordered else None
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            while not exhausted and _has_room(in_flight, pending, limit, window):
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                # workers see the caller's context variables, e.g. fast_reads()
+                in_flight[executor.submit(contextvars.copy_context().run, fn, item)] = (index, item)
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = in_flight.pop(future)
+                error = future.exception()
+                if error is None:
+                    limit.on_success()
+                    pending[index] = BulkItemResult(index, item, result=future.result())
+                else:
+                    limit.on_error(error)
+                    pending[index] = BulkItemResult(index, item, error=error)
+            ready, next_index = _emit(pending, next_index, ordered)
+            for r in ready:
+                yield r
+
+
+async def _aenumerate(items: Union[Iterable, AsyncIterator]):
+    index = 0
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield index, item
+            index += 1
+    else:
+        for item in items:
+            yield index, item
+            index += 1
+
+
+async def bounded_map_async(fn: Callable[[Any], Any], items: Union[Iterable, AsyncIterator], concurrency: int = 10,
+                            ordered: bool = True, adaptive: bool = True) -> AsyncIterator[BulkItemResult]:
+    """Async counterpart of bounded_map: `fn` is a coroutine function and `items` may be an async iterable."""
+    limit = AdaptiveLimit(concurrency, adaptive=adaptive)
+    iterator = _aenumerate(items).__aiter__()
+    exhausted = False
+    in_flight = {}
+    pending: Dict[int, BulkItemResult] = {}
+    next_index = 0
+    window = 2 * concurrency if ordered else None
+    try:
+        while True:
+            while not exhausted and _has_room(in_flight, pending, limit, window):
+                try:
+                    index, item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                in_flight[asyncio.ensure_future(fn(item))] = (index, item)
+            if not in_flight:
+                break
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, item = in_flight.pop(task)
+                error = task.exception()
+                if error is None:
+                    limit.on_success()
+                    pending[index] = BulkItemResult(index, item, result=task.result())
+                else:
+                    limit.on_error(error)
+                    pending[index] = BulkItemResult(index, item, error=error)
+            ready, next_index = _emit(pending, next_index, ordered)
+            for r in ready:
+                yield r
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+class RateLimiter:
+    """Spaces calls so that at most `rate` start per second, shared by every worker that acquires it."""
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = 1.0 / rate
+        self._next_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.interval
+            return start_at - now
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def call_with_retries(fn: Callable, *args, max_retries: int = 3, backoff_base: float = 1.0,
+                      is_retryable: Callable[[BaseException], bool] = is_transient_error, **kwargs):
+    """Calls `fn`, retrying with exponential backoff while it raises errors accepted by `is_retryable`."""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            wait = backoff_base * (2 ** attempt)
+            logger.warning("Transient error {!r}, retrying in {}s ({}/{})", e, wait, attempt + 1, max_retries)
+            time.sleep(wait)
+
+
+async def call_with_retries_async(fn: Callable, *args, max_retries: int = 3, backoff_base: float = 1.0,
+                                  is_retryable: Callable[[BaseException], bool] = is_transient_error, **kwargs):
+    """Async counterpart of call_with_retries, `fn` is a coroutine function."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            wait = backoff_base * (2 ** attempt)
+            logger.warning("Transient error {!r}, retrying in {}s ({}/{})", e, wait, attempt + 1, max_retries)
+            await asyncio.sleep(wait)
@@ -0,0 +1,112 @@
+import collections.abc
+import contextlib
+import contextvars
+import typing
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
+
+Model = TypeVar("Model", bound=BaseModel)
+
+_fast_reads = contextvars.ContextVar("altscore_fast_reads", default=False)
+# model -> [(field name, alias, converter or None, field)]
+_plans: Dict[type, List[Tuple[str, str, Optional[Callable[[Any], Any]], Any]]] = {}
+
+
+def _scalar(target: type) -> Callable[[Any], Any]:
+    def convert(value):
+        return value if type(value) is target else target(value)
+
+    return convert
+
+
+def _converter(tp) -> Optional[Callable[[Any], Any]]:
+    """
+    Converts the JSON value of a field of type `tp` without validating it: nested models are
+    constructed, str/int/float are only coerced when the server sent another JSON type, and every
+    other value is kept as parsed. None when the value is kept as is.
+    """
+    origin = typing.get_origin(tp)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(tp) if arg is not type(None)]
+        return _converter(args[0]) if len(args) == 1 else None
+    if origin in (list, collections.abc.Sequence):
+        args = typing.get_args(tp)
+        item = _converter(args[0]) if args else None
+        if item is None:
+            return None
+        return lambda value: [item(v) if v is not None else None for v in value]
+    if origin in (dict, collections.abc.Mapping):
+        args = typing.get_args(tp)
+        item = _converter(args[1]) if args else None
+        if item is None:
+            return None
+        return lambda value: {k: item(v) if v is not None else None for k, v in value.items()}
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        return lambda value: construct_model(tp, value) if isinstance(value, dict) else value
+    if tp in (str, int, float):
+        return _scalar(tp)
+    return None
+
+
+def _plan(model: type):
+    plan = [
+        (name, field.alias, _converter(field.outer_type_), field)
+        for name, field in model.__fields__.items()
+    ]
+    _plans[model] = plan
+    return plan
+
+
+def construct_model(model: Type[Model], data: Dict) -> Model:
+    """
+    Builds `model` from the JSON of a trusted response without running pydantic validation,
+    same as model.construct() but recursing into nested models, lists and dicts of models and
+    reading fields by alias. Attribute names and defaults are the same as with parse_obj, and
+    so are the values of str, int, float and nested model fields; every other field (datetimes,
+    dates, enums, decimals, unions of several types) keeps the raw JSON value, so .dict() and
+    .json() differ from parse_obj for them. Missing required fields are None and unknown fields
+    are dropped.
+    """
+    plan = _plans.get(model) or _plan(model)
+    values = {}
+    fields_set = set()
+    for name, alias, convert, field in plan:
+        if alias in data:
+            value = data[alias]
+        elif name in data:
+            value = data[name]
+        else:
+            values[name] = None if field.required else field.get_default()
+            continue
+        values[name] = convert(value) if convert is not None and value is not None else value
+        fields_set.add(name)
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__fields_set__", fields_set)
+    if model.__private_attributes__:
+        instance._init_private_attributes()
+    return instance
+
+
+def fast_reads_enabled() -> bool:
+    return _fast_reads.get()
+
+
+@contextlib.contextmanager
+def fast_reads(enabled: bool = True):
+    """
+    Within the block parse_read builds models with construct_model. It applies to the current
+    thread or task and to the workers of bounded_map, which run in a copy of the caller's context.
+    """
+    token = _fast_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _fast_reads.reset(token)
+
+
+def parse_read(model: Type[Model], data: Dict) -> Model:
+    """The model of a response: validated with parse_obj, or constructed when fast reads are enabled."""
+    if _fast_reads.get():
+        return construct_model(model, data)
+    return model.parse_obj(data)
@@ -0,0 +1,114 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Optional, Tuple
+
+from loguru import logger
+
+
+class PartnerResolver:
+    """
+    Partner of the credentials of a client, resolved once and shared by every CMS and comms call.
+
+    The resolved partner is kept for `ttl` seconds (None keeps it for the life of the client) and a
+    failed resolution for `negative_ttl` seconds, so a client without a partner does not call
+    /v2/partners/me on every request. Concurrent callers wait for a single resolution.
+
+    `impersonate(partner_id)` overrides the partner for the calls made inside the block, in the
+    current thread or task only, without touching the cached one.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, negative_ttl: float = 60):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._partner_id: Optional[str] = None
+        self._expires_at: Optional[float] = 0.0
+        self._lock = threading.Lock()
+        # asyncio locks are bound to the loop that first uses them, one per loop
+        self._async_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = \
+            weakref.WeakKeyDictionary()
+        self._impersonated = contextvars.ContextVar(f"altscore_partner_{id(self)}", default=None)
+
+    @property
+    def impersonated(self) -> Optional[str]:
+        return self._impersonated.get()
+
+    @contextlib.contextmanager
+    def impersonate(self, partner_id: str):
+        token = self._impersonated.set(partner_id)
+        try:
+            yield partner_id
+        finally:
+            self._impersonated.reset(token)
+
+    def _is_fresh(self) -> bool:
+        return self._expires_at is None or time.monotonic() < self._expires_at
+
+    def _store(self, partner_id: Optional[str]) -> Optional[str]:
+        self._partner_id = partner_id
+        ttl = self.ttl if partner_id is not None else self.negative_ttl
+        self._expires_at = None if ttl is None else time.monotonic() + ttl
+        return partner_id
+
+    def _failed(self, e: Exception) -> None:
+        logger.warning("Could not resolve the partner of the credentials, retrying in {}s: {!r}",
+                       self.negative_ttl, e)
+        self._store(None)
+
+    def set(self, partner_id: Optional[str]):
+        """Sets the partner explicitly, it does not expire."""
+        with self._lock:
+            self._partner_id = partner_id
+            self._expires_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+    def peek(self) -> Tuple[bool, Optional[str]]:
+        """(resolved, partner_id) without resolving: the impersonated or a fresh cached partner."""
+        impersonated = self._impersonated.get()
+        if impersonated is not None:
+            return True, impersonated
+        if self._is_fresh():
+            return True, self._partner_id
+        return False, None
+
+    def get(self, resolve: Callable[[], Optional[str]]) -> Optional[str]:
+        impersonated = self._impersonated.get()
+        if impersonated is not None:
+            return impersonated
+        if self._is_fresh():
+            return self._partner_id
+        with self._lock:
+            if self._is_fresh():
+                return self._partner_id
+            try:
+                return self._store(resolve())
+            except Exception as e:
+                self._failed(e)
+                return None
+
+    async def aget(self, resolve: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """Async counterpart of get, `resolve` is a coroutine function."""
+        impersonated = self._impersonated.get()
+        if impersonated is not None:
+            return impersonated
+        if self._is_fresh():
+            return self._partner_id
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            async_lock = self._async_locks.get(loop)
+            if async_lock is None:
+                async_lock = self._async_locks[loop] = asyncio.Lock()
+        async with async_lock:
+            if self._is_fresh():
+                return self._partner_id
+            try:
+                return self._store(await resolve())
+            except Exception as e:
+                self._failed(e)
+                return None
@@ -0,0 +1,42 @@
+import math
+import random
+from typing import Optional
+
+
+class PollStrategy:
+    """
+    Exponential backoff between polls: the first wait is `initial` seconds, every following
+    wait is multiplied by `factor` up to `max_interval`. `jitter` spreads each wait by up to
+    that fraction so many pollers started together do not hit the API in lockstep.
+    """
+
+    def __init__(self, initial: float = 0.5, factor: float = 1.5, max_interval: float = 10.0, jitter: float = 0.1):
+        if initial <= 0 or factor < 1 or max_interval < initial:
+            raise ValueError("invalid poll strategy, expected 0 < initial <= max_interval and factor >= 1")
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+        # first attempt whose wait reaches max_interval, the exponent is capped there so that
+        # factor ** attempt cannot overflow on polls without a timeout
+        self._max_exponent = math.ceil(math.log(max_interval / initial, factor)) if factor > 1 else 0
+
+    @classmethod
+    def fixed(cls, interval: float):
+        return cls(initial=interval, factor=1, max_interval=interval, jitter=0)
+
+    def interval(self, attempt: int) -> float:
+        wait = min(self.max_interval, self.initial * (self.factor ** min(attempt, self._max_exponent)))
+        if self.jitter:
+            wait *= 1 + random.uniform(-self.jitter, self.jitter)
+        return wait
+
+    def next_interval(self, attempt: int, remaining: Optional[float] = None) -> float:
+        """Wait before poll number `attempt + 1`, never sleeping past the `remaining` budget."""
+        wait = self.interval(attempt)
+        if remaining is not None:
+            wait = max(0.0, min(wait, remaining))
+        return wait
+
+
+DEFAULT_POLL_STRATEGY = PollStrategy()
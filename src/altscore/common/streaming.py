@@ -0,0 +1,444 @@
+import asyncio
+import codecs
+import io
+import json
+import os
+import time
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import httpx
+from loguru import logger
+from altscore.common.http_errors import raise_for_status_improved
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# progress(bytes_done, total_bytes), total is None when it is not known in advance
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+FileSource = Union[str, os.PathLike, BinaryIO]
+
+
+def source_name(source: FileSource, default: str = "file") -> str:
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(os.fspath(source))
+    name = getattr(source, "name", None)
+    return os.path.basename(name) if isinstance(name, str) else default
+
+
+def source_size(source: FileSource) -> Optional[int]:
+    """Size in bytes of a path or of the rest of a seekable file object, None when unknown."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    try:
+        position = source.tell()
+        end = source.seek(0, io.SEEK_END)
+        source.seek(position)
+        return end - position
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+class ProgressReader:
+    """File object wrapper that reports every read to a progress callback, for multipart uploads."""
+
+    def __init__(self, fileobj: BinaryIO, total: Optional[int] = None, progress: Optional[ProgressCallback] = None):
+        self._fileobj = fileobj
+        self._total = total
+        self._progress = progress
+        self._done = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._fileobj.read(size)
+        if chunk and self._progress is not None:
+            self._done += len(chunk)
+            self._progress(self._done, self._total)
+        return chunk
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        position = self._fileobj.seek(offset, whence)
+        if whence == io.SEEK_SET and offset == 0:
+            self._done = 0
+        return position
+
+    def __getattr__(self, item):
+        return getattr(self._fileobj, item)
+
+
+def iter_file_chunks(fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE, total: Optional[int] = None,
+                     progress: Optional[ProgressCallback] = None) -> Iterator[bytes]:
+    done = 0
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        done += len(chunk)
+        if progress is not None:
+            progress(done, total)
+        yield chunk
+
+
+async def aiter_file_chunks(source: Union[FileSource, AsyncIterator[bytes]], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            total: Optional[int] = None,
+                            progress: Optional[ProgressCallback] = None) -> AsyncIterator[bytes]:
+    """Reads a path with aiofiles, or re-chunks an async iterator of bytes or a file object."""
+    done = 0
+    if hasattr(source, "__aiter__"):
+        async for chunk in source:
+            done += len(chunk)
+            if progress is not None:
+                progress(done, total)
+            yield chunk
+        return
+    if isinstance(source, (str, os.PathLike)):
+        import aiofiles
+        async with aiofiles.open(source, "rb") as f:
+            while True:
+                chunk = await f.read(chunk_size)
+                if not chunk:
+                    break
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+                yield chunk
+        return
+    for chunk in iter_file_chunks(source, chunk_size, total, progress):
+        yield chunk
+
+
+def _form_value(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value).encode()
+    return str(value).encode()
+
+
+def _quoted(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def multipart_file_upload(file_path: str, file_name: str, content_type: str, fields: Optional[Dict] = None,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          progress: Optional[ProgressCallback] = None) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    """
+    Headers and body of a multipart/form-data upload of `file_path` as the "file" field, for async
+    clients: the file is read with aiofiles chunk by chunk while the body is sent, so the event loop
+    never blocks on disk. Dict and list fields are sent as JSON. The body can be sent only once.
+    """
+    boundary = os.urandom(16).hex()
+    head = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{_quoted(name)}"\r\n\r\n'.encode()
+        + _form_value(value) + b"\r\n"
+        for name, value in (fields or {}).items()
+    )
+    head += (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{_quoted(file_name)}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    size = os.path.getsize(file_path)
+
+    async def body():
+        yield head
+        async for chunk in aiter_file_chunks(file_path, chunk_size, size, progress):
+            yield chunk
+        yield tail
+
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + size + len(tail)),
+    }
+    return headers, body()
+
+
+def _range_headers(headers: Optional[Callable[[], Dict]], start: int, etag: Optional[str]) -> Dict:
+    request_headers = dict(headers()) if headers is not None else {}
+    if start > 0:
+        request_headers["Range"] = f"bytes={start}-"
+        if etag is not None:
+            request_headers["If-Range"] = etag
+    return request_headers
+
+
+def _strong_etag(response: httpx.Response) -> Optional[str]:
+    # If-Range only accepts strong validators
+    etag = response.headers.get("ETag")
+    return etag if etag and not etag.startswith("W/") else None
+
+
+def _resumed_offset(response: httpx.Response, start: int, etag: Optional[str],
+                    on_restart: Optional[Callable[[], None]]) -> int:
+    """
+    Bytes of the body to drop when the server sent everything again instead of the requested
+    range. With If-Range a full body means the content changed: the download starts over through
+    `on_restart`, or fails when there is nothing to restart.
+    """
+    if start == 0 or response.status_code == 206:
+        return 0
+    if etag is None:
+        return start
+    if on_restart is None:
+        raise RuntimeError(f"content of {response.url} changed while it was being streamed")
+    on_restart()
+    return 0
+
+
+def _stream_state(response: httpx.Response, position: int, etag: Optional[str],
+                  on_restart: Optional[Callable[[], None]], on_etag: Optional[Callable[[str], None]]):
+    """(bytes to skip, new position, etag) after the headers of a response."""
+    skip = _resumed_offset(response, position, etag, on_restart)
+    if skip == 0 and response.status_code != 206:
+        position = 0
+    etag = etag if response.status_code == 206 else _strong_etag(response)
+    if etag is not None and on_etag is not None:
+        on_etag(etag)
+    return skip, position, etag
+
+
+def stream_url(url: str, headers: Optional[Callable[[], Dict]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               start: int = 0, max_retries: int = 3, timeout: int = 300,
+               renew_token: Optional[Callable[[], None]] = None, etag: Optional[str] = None,
+               on_restart: Optional[Callable[[], None]] = None,
+               on_etag: Optional[Callable[[str], None]] = None) -> Iterator[bytes]:
+    """
+    Yields the body of a GET in chunks. When the connection drops mid-body the request is sent
+    again with a Range header from the last byte received, up to `max_retries` times, and an
+    If-Range header with the ETag of the first response so a changed content is not spliced.
+    `headers` is called on every (re)connection so renewed tokens are picked up.
+    """
+    position = start
+    retries = 0
+    renewed = False
+    with httpx.Client() as client:
+        while True:
+            try:
+                with client.stream("GET", url, headers=_range_headers(headers, position, etag),
+                                   timeout=timeout) as response:
+                    if response.status_code == 401 and renew_token is not None and not renewed:
+                        renewed = True
+                        renew_token()
+                        continue
+                    if response.status_code == 416:
+                        return
+                    if not response.is_success:
+                        response.read()
+                        raise_for_status_improved(response)
+                    skip, position, etag = _stream_state(response, position, etag, on_restart, on_etag)
+                    for chunk in response.iter_bytes(chunk_size):
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk, skip = chunk[skip:], 0
+                        position += len(chunk)
+                        yield chunk
+                    return
+            except (httpx.TransportError, httpx.StreamError) as e:
+                retries += 1
+                if retries > max_retries:
+                    raise
+                logger.warning("Download interrupted at byte {} ({!r}), resuming", position, e)
+                time.sleep(min(2 ** retries, 30))
+
+
+async def astream_url(url: str, headers: Optional[Callable[[], Dict]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      start: int = 0, max_retries: int = 3, timeout: int = 300,
+                      renew_token: Optional[Callable[[], None]] = None, etag: Optional[str] = None,
+                      on_restart: Optional[Callable[[], None]] = None,
+                      on_etag: Optional[Callable[[str], None]] = None) -> AsyncIterator[bytes]:
+    """Async counterpart of stream_url."""
+    position = start
+    retries = 0
+    renewed = False
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                async with client.stream("GET", url, headers=_range_headers(headers, position, etag),
+                                         timeout=timeout) as response:
+                    if response.status_code == 401 and renew_token is not None and not renewed:
+                        renewed = True
+                        renew_token()
+                        continue
+                    if response.status_code == 416:
+                        return
+                    if not response.is_success:
+                        await response.aread()
+                        raise_for_status_improved(response)
+                    skip, position, etag = _stream_state(response, position, etag, on_restart, on_etag)
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk, skip = chunk[skip:], 0
+                        position += len(chunk)
+                        yield chunk
+                    return
+            except (httpx.TransportError, httpx.StreamError) as e:
+                retries += 1
+                if retries > max_retries:
+                    raise
+                logger.warning("Download interrupted at byte {} ({!r}), resuming", position, e)
+                await asyncio.sleep(min(2 ** retries, 30))
+
+
+class _PartialDownload:
+    """
+    A download to `file_path` and the ETag of what it holds, kept next to it in `<file_path>.etag`
+    while it is incomplete. A file is only resumed when that ETag was stored, and the server
+    sends it again from the start (truncating the file) when its content changed since.
+    """
+
+    def __init__(self, file_path: str, resume: bool):
+        self.file_path = file_path
+        self.etag_path = f"{file_path}.etag"
+        self.etag = None
+        self.start = 0
+        if resume and os.path.exists(file_path) and os.path.exists(self.etag_path):
+            with open(self.etag_path, "r", encoding="utf-8") as f:
+                self.etag = f.read().strip() or None
+            if self.etag is not None:
+                self.start = os.path.getsize(file_path)
+        self.done = self.start
+        self.restarted = False
+
+    def restart(self):
+        self.restarted = True
+
+    def store_etag(self, etag: str):
+        if etag != self.etag:
+            self.etag = etag
+            with open(self.etag_path, "w", encoding="utf-8") as f:
+                f.write(etag)
+
+    def take_restart(self) -> bool:
+        restarted, self.restarted = self.restarted, False
+        if restarted:
+            self.done = 0
+        return restarted
+
+    def finish(self):
+        if os.path.exists(self.etag_path):
+            os.remove(self.etag_path)
+
+
+def download_url(url: str, file_path: str, headers: Optional[Callable[[], Dict]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, resume: bool = False,
+                 progress: Optional[ProgressCallback] = None, max_retries: int = 3, timeout: int = 300,
+                 renew_token: Optional[Callable[[], None]] = None) -> str:
+    """
+    Streams a GET to `file_path`, replacing it. With `resume` a partial file left by an earlier
+    interrupted call is continued with a Range request, guarded by If-Range with the ETag stored
+    for it; any other existing file is downloaded again from the start.
+    """
+    download = _PartialDownload(file_path, resume)
+    with open(file_path, "ab" if download.start else "wb") as f:
+        for chunk in stream_url(url, headers, chunk_size, download.start, max_retries, timeout, renew_token,
+                                etag=download.etag, on_restart=download.restart, on_etag=download.store_etag):
+            if download.take_restart():
+                f.seek(0)
+                f.truncate()
+            f.write(chunk)
+            download.done += len(chunk)
+            if progress is not None:
+                progress(download.done, None)
+        if download.take_restart():
+            f.seek(0)
+            f.truncate()
+    download.finish()
+    return file_path
+
+
+async def adownload_url(url: str, file_path: str, headers: Optional[Callable[[], Dict]] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE, resume: bool = False,
+                        progress: Optional[ProgressCallback] = None, max_retries: int = 3, timeout: int = 300,
+                        renew_token: Optional[Callable[[], None]] = None) -> str:
+    """Async counterpart of download_url."""
+    import aiofiles
+    download = _PartialDownload(file_path, resume)
+    async with aiofiles.open(file_path, "ab" if download.start else "wb") as f:
+        async for chunk in astream_url(url, headers, chunk_size, download.start, max_retries, timeout, renew_token,
+                                       etag=download.etag, on_restart=download.restart,
+                                       on_etag=download.store_etag):
+            if download.take_restart():
+                await f.seek(0)
+                await f.truncate()
+            await f.write(chunk)
+            download.done += len(chunk)
+            if progress is not None:
+                progress(download.done, None)
+        if download.take_restart():
+            await f.seek(0)
+            await f.truncate()
+    download.finish()
+    return file_path
+
+
+class _JSONArrayParser:
+    """Incrementally decodes the elements of a top level JSON array fed as UTF-8 chunks."""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._started = False
+        self._finished = False
+
+    def _skip(self, characters: str):
+        buffer = self._buffer
+        while self._position < len(buffer) and buffer[self._position] in characters:
+            self._position += 1
+
+    def feed(self, chunk: bytes, final: bool = False) -> List[Any]:
+        self._buffer = self._buffer[self._position:] + self._utf8.decode(chunk, final=final)
+        self._position = 0
+        items = []
+        if not self._started:
+            self._skip(" \t\r\n")
+            if self._position >= len(self._buffer):
+                return items
+            if self._buffer[self._position] != "[":
+                raise ValueError("content is not a JSON array")
+            self._position += 1
+            self._started = True
+        while not self._finished:
+            self._skip(" \t\r\n,")
+            if self._position >= len(self._buffer):
+                break
+            if self._buffer[self._position] == "]":
+                self._finished = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # a number at the end of the buffer may continue in the next chunk
+            if end >= len(self._buffer) and not final:
+                break
+            items.append(item)
+            self._position = end
+        if final and not self._finished:
+            raise ValueError("unexpected end of JSON array")
+        return items
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Yields the elements of a JSON array streamed as chunks of bytes, one at a time."""
+    parser = _JSONArrayParser()
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.feed(b"", final=True):
+        yield item
+
+
+async def aiter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Async counterpart of iter_json_array."""
+    parser = _JSONArrayParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.feed(b"", final=True):
+        yield item
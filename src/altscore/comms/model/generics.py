@@ -138,11 +138,14 @@ class GenericAsyncModule:
     def build_headers(self, **kwargs):
         return build_headers(self, **kwargs)
 
+    async def _partner_path(self) -> str:
+        return f"/{self.resource_version}/{self.resource}/{await self.altscore_client.resolve_partner_id()}"
+
     @retry_on_401_async
     async def create(self, new_entity_data: dict):
         async with httpx.AsyncClient(base_url=self.altscore_client._webhooks_base_url) as client:
             response = await client.post(
-                f"/{self.resource_version}/{self.resource}/{self.altscore_client.partner_id}",
+                await self._partner_path(),
                 headers=self.build_headers(),
                 json=self.create_data_model.parse_obj(new_entity_data).dict(by_alias=True, exclude_none=True),
                 timeout=30
@@ -154,7 +157,7 @@ class GenericAsyncModule:
     async def retrieve(self, resource_id: str):
         async with httpx.AsyncClient(base_url=self.altscore_client._webhooks_base_url) as client:
             response = await client.get(
-                f"/{self.resource_version}/{self.resource}/{self.altscore_client.partner_id}/{resource_id}",
+                f"{await self._partner_path()}/{resource_id}",
                 headers=self.build_headers(),
                 timeout=30
             )
@@ -171,7 +174,7 @@ class GenericAsyncModule:
     async def patch(self, resource_id: str, patch_data: Dict) -> str:
         async with httpx.AsyncClient(base_url=self.altscore_client._webhooks_base_url) as client:
             response = await client.patch(
-                f"/{self.resource_version}/{self.resource}/{self.altscore_client.partner_id}/{resource_id}",
+                f"{await self._partner_path()}/{resource_id}",
                 headers=self.build_headers(),
                 json=self.update_data_model.parse_obj(patch_data).dict(by_alias=True, exclude_none=True),
                 timeout=30
@@ -183,7 +186,7 @@ class GenericAsyncModule:
     async def delete(self, resource_id: str):
         async with httpx.AsyncClient(base_url=self.altscore_client._webhooks_base_url) as client:
             response = await client.delete(
-                f"/{self.resource_version}/{self.resource}/{self.altscore_client.partner_id}/{resource_id}",
+                f"{await self._partner_path()}/{resource_id}",
                 headers=self.build_headers(),
                 timeout=30
             )
@@ -195,7 +198,7 @@ class GenericAsyncModule:
         query_params = {}
         async with httpx.AsyncClient(base_url=self.altscore_client._webhooks_base_url) as client:
             response = await client.get(
-                f"/{self.resource_version}/{self.resource}/{self.altscore_client.partner_id}",
+                await self._partner_path(),
                 params=query_params,
                 headers=self.build_headers(),
                 timeout=30
@@ -218,7 +221,7 @@ class GenericAsyncModule:
 
         async with httpx.AsyncClient(base_url=self.altscore_client._webhooks_base_url) as client:
             response = await client.get(
-                f"/{self.resource_version}/{self.resource}/{self.altscore_client.partner_id}",
+                await self._partner_path(),
                 headers=self.build_headers(),
                 params=query_params,
                 timeout=30
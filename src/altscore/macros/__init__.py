@@ -7,7 +7,9 @@ from altscore.borrower_central.model.borrower import BorrowerSync, BorrowerAsync
 from altscore.borrower_central.model.store_packages import altdata_source_slug
 from altscore.altdata.model.data_request import SourceConfig
 from altscore.macros.validate_inputs import validate_borrower_data
-from typing import Optional, Tuple, List, Dict, Union
+from altscore.macros.cms_clients import CMSClientOnboardingAsync
+from altscore.common.concurrency import BulkItemResult
+from typing import Optional, Tuple, List, Dict, Union, Iterable, AsyncIterator
 import asyncio
 from loguru import logger
 
@@ -723,6 +725,26 @@ class MacrosAsync:
             await borrower.associate_cms_client_id(client_id)
             return client_id
 
+    async def new_cms_clients_from_borrowers(
+            self, borrower_ids: Union[Iterable[str], AsyncIterator[str]], partner_id: str,
+            legal_name_identity_key: str, tax_id_identity_key: str, external_id_identity_key: str = None,
+            dba_identity_key: Optional[str] = None, concurrency: int = 10, max_retries: int = 3,
+            checkpoint_path: Optional[str] = None
+    ) -> AsyncIterator[BulkItemResult]:
+        """
+        new_cms_client_from_borrower for many borrowers with up to `concurrency` in flight, yielding
+        a BulkItemResult per borrower as it completes, its result being
+        {"borrower_id", "client_id", "created"}. Borrowers recorded in `checkpoint_path` by an
+        earlier run are skipped.
+        """
+        onboarding = CMSClientOnboardingAsync(
+            self.altscore_client, partner_id=partner_id, legal_name_identity_key=legal_name_identity_key,
+            tax_id_identity_key=tax_id_identity_key, external_id_identity_key=external_id_identity_key,
+            dba_identity_key=dba_identity_key, concurrency=concurrency, max_retries=max_retries
+        )
+        async for result in onboarding.run(borrower_ids, checkpoint_path=checkpoint_path):
+            yield result
+
     async def get_unique_borrower_field_values(self, field_key: str):
         field_values = await self.altscore_client.borrower_central.borrower_fields.count_distinct_values(field_key)
         return [item["value"] for item in field_values]
@@ -0,0 +1,188 @@
+import asyncio
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Union
+from uuid import uuid4
+import httpx
+from loguru import logger
+from altscore.borrower_central.helpers import build_headers as build_bc_headers
+from altscore.borrower_central.model.addresses import AddressAPIDTO
+from altscore.borrower_central.model.borrower import BorrowerBase
+from altscore.cms.helpers import build_headers as build_cms_headers
+from altscore.cms.model.clients import CreateClientDTO, UpdateClientDTO
+from altscore.common.checkpoint import Checkpoint
+from altscore.common.concurrency import BulkItemResult, bounded_map_async, call_with_retries_async, pooled_limits
+from altscore.common.http_errors import raise_for_status_improved, retry_on_401_async
+
+IDENTITIES_PER_PAGE = 100
+
+
+class CMSClientOnboardingAsync:
+    """
+    Creates or updates the CMS client of many borrowers, same as MacrosAsync.new_cms_client_from_borrower
+    for each of them, with up to `concurrency` borrowers in flight over two pooled connections (borrower
+    central and CMS).
+
+    The reads of a borrower (the borrower, all its identities in one request, main address, email and
+    phone) run at the same time, and the patch of an existing client runs alongside the association.
+    Borrowers sharing an external id are resolved one after the other so the client is only created once.
+    """
+
+    def __init__(self, altscore_client, partner_id: str, legal_name_identity_key: Optional[str],
+                 tax_id_identity_key: Optional[str], external_id_identity_key: Optional[str],
+                 dba_identity_key: Optional[str], concurrency: int, max_retries: int):
+        self.altscore_client = altscore_client
+        self.partner_id = partner_id
+        self.legal_name_identity_key = legal_name_identity_key
+        self.tax_id_identity_key = tax_id_identity_key
+        self.external_id_identity_key = external_id_identity_key
+        self.dba_identity_key = dba_identity_key
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._external_id_locks: Dict[str, asyncio.Lock] = {}
+        # same queries as BorrowerAsync, relative to the pooled borrower central connection
+        self._borrower_queries = BorrowerBase(base_url="")
+
+    def renew_token(self):
+        self.altscore_client.renew_token()
+
+    def _cms_headers(self) -> Dict:
+        return build_cms_headers(self, partner_id=self.partner_id)
+
+    async def run(self, borrower_ids: Union[Iterable[str], AsyncIterator[str]],
+                  checkpoint_path: Optional[str] = None) -> AsyncIterator[BulkItemResult]:
+        checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+
+        async def pending():
+            index = 0
+            if hasattr(borrower_ids, "__aiter__"):
+                async for borrower_id in borrower_ids:
+                    if checkpoint is None or not checkpoint.is_done(borrower_id):
+                        yield index, borrower_id
+                    index += 1
+            else:
+                for borrower_id in borrower_ids:
+                    if checkpoint is None or not checkpoint.is_done(borrower_id):
+                        yield index, borrower_id
+                    index += 1
+
+        try:
+            async with httpx.AsyncClient(base_url=self.altscore_client._borrower_central_base_url,
+                                         limits=pooled_limits(self.concurrency * 5)) as bc, \
+                    httpx.AsyncClient(base_url=self.altscore_client._cms_base_url,
+                                      limits=pooled_limits(self.concurrency * 2)) as cms:
+                async def run(item):
+                    index, borrower_id = item
+                    # the client is resolved by external id on every attempt, so a retry never creates it twice
+                    result = await call_with_retries_async(self.onboard, bc, cms, borrower_id,
+                                                           max_retries=self.max_retries)
+                    if checkpoint is not None:
+                        await checkpoint.mark_done_async(borrower_id, result["client_id"])
+                    return result
+
+                async for r in bounded_map_async(run, pending(), concurrency=self.concurrency, ordered=False):
+                    index, borrower_id = r.item
+                    if not r.is_success:
+                        logger.warning("CMS client for borrower {} failed: {!r}", borrower_id, r.error)
+                    yield BulkItemResult(index, borrower_id, result=r.result, error=r.error)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+    async def onboard(self, bc: httpx.AsyncClient, cms: httpx.AsyncClient, borrower_id: str) -> Dict:
+        queries = self._borrower_queries
+        borrower, identities, addresses, emails, phones = await asyncio.gather(
+            self._get(bc, f"/v1/borrowers/{borrower_id}"),
+            self._identities(bc, borrower_id),
+            self._get(bc, *queries._addresses(borrower_id, sort_by="priority", per_page=1)),
+            self._get(bc, *queries._points_of_contact(borrower_id, contact_method="email", sort_by="priority",
+                                                      sort_direction="asc", per_page=1)),
+            self._get(bc, *queries._points_of_contact(borrower_id, contact_method="phone", sort_by="priority",
+                                                      sort_direction="asc", per_page=1)),
+        )
+        if borrower is None:
+            raise LookupError(f"Borrower {borrower_id} not found")
+
+        def identity_value(identity_key: str) -> str:
+            # identities are sorted by priority, the first one of a key is its main identity
+            for identity in identities:
+                if identity.get("key") == identity_key:
+                    return identity.get("value")
+            raise LookupError(f"Identity {identity_key} not found for borrower {borrower_id}")
+
+        # same defaults as new_cms_client_from_borrower
+        external_id = identity_value(self.external_id_identity_key) \
+            if self.external_id_identity_key is not None else borrower_id
+        legal_name = identity_value(self.legal_name_identity_key) \
+            if self.legal_name_identity_key is not None else "N/A"
+        if borrower.get("persona") == "business":
+            dba = identity_value(self.dba_identity_key) if self.dba_identity_key is not None else legal_name
+        else:
+            dba = "N/A"
+        tax_id = identity_value(self.tax_id_identity_key) \
+            if self.tax_id_identity_key is not None else f"NA-{str(uuid4())[:8]}"
+        address = AddressAPIDTO.parse_obj(addresses[0]).get_address_str() if addresses else "N/A"
+        email = emails[0]["value"] if emails else "na@na.com"
+        phone = phones[0]["value"] if phones else "N/A"
+
+        lock = self._external_id_locks.setdefault(external_id, asyncio.Lock())
+        async with lock:
+            client = await self._get(cms, f"/v2/clients/{external_id}", headers=self._cms_headers())
+            if client is not None:
+                client_id = client["clientId"]
+                await asyncio.gather(
+                    self._associate(bc, borrower_id, client_id),
+                    self._send(cms, "PATCH", f"/v2/clients/{client_id}", UpdateClientDTO.parse_obj({
+                        "legalName": legal_name,
+                        "taxId": tax_id,
+                        "emailAddress": email,
+                        "borrowerId": borrower_id
+                    }).dict(by_alias=True, exclude_none=True), headers=self._cms_headers())
+                )
+                return {"borrower_id": borrower_id, "client_id": client_id, "created": False}
+            try:
+                created = await self._send(cms, "POST", "/v2/clients", CreateClientDTO.parse_obj({
+                    "externalId": external_id, "legalName": legal_name, "taxId": tax_id, "dba": dba,
+                    "address": address, "emailAddress": email, "phoneNumber": phone, "partnerId": self.partner_id,
+                    "borrowerId": borrower_id
+                }).dict(by_alias=True, exclude_none=True), headers=self._cms_headers())
+                client_id = created["clientId"]
+            except httpx.HTTPStatusError as e:
+                # a create retried after a server error that had already gone through
+                client = await self._get(cms, f"/v2/clients/{external_id}", headers=self._cms_headers()) \
+                    if e.response.status_code == 409 else None
+                if client is None:
+                    raise
+                client_id = client["clientId"]
+        await self._associate(bc, borrower_id, client_id)
+        return {"borrower_id": borrower_id, "client_id": client_id, "created": True}
+
+    async def _identities(self, bc: httpx.AsyncClient, borrower_id: str) -> List[Dict]:
+        identities, page = [], 1
+        while True:
+            identities_page = await self._get(bc, *self._borrower_queries._identities(
+                borrower_id, sort_by="priority", sort_direction="asc", per_page=IDENTITIES_PER_PAGE, page=page
+            )) or []
+            identities.extend(identities_page)
+            if len(identities_page) < IDENTITIES_PER_PAGE:
+                return sorted(identities, key=lambda i: (i.get("priority") is None, i.get("priority") or 0))
+            page += 1
+
+    async def _associate(self, bc: httpx.AsyncClient, borrower_id: str, client_id: str):
+        await self._send(bc, "POST", f"/v1/borrowers/{borrower_id}/cms-client-ids/{client_id}")
+
+    @retry_on_401_async
+    async def _get(self, client: httpx.AsyncClient, url: str, params: Optional[Dict] = None,
+                   headers: Optional[Dict] = None):
+        """The JSON of a GET, None on 404."""
+        response = await client.get(url, params=params, headers=headers or build_bc_headers(self), timeout=30)
+        if response.status_code == 404:
+            return None
+        raise_for_status_improved(response)
+        return response.json()
+
+    @retry_on_401_async
+    async def _send(self, client: httpx.AsyncClient, method: str, url: str, json: Optional[Dict] = None,
+                    headers: Optional[Dict] = None):
+        response = await client.request(method, url, json=json, headers=headers or build_bc_headers(self),
+                                        timeout=30)
+        raise_for_status_improved(response)
+        return response.json() if response.content else None
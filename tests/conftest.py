@@ -0,0 +1,25 @@
+import os
+import sys
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """
+    Routes every httpx client created during the test to an httpx.MockTransport:
+    `mock_api(handler)`, where handler(request) returns an httpx.Response.
+    """
+
+    def install(handler):
+        transport = httpx.MockTransport(handler)
+        for client_class in (httpx.Client, httpx.AsyncClient):
+            def patched(self, *args, _init=client_class.__init__, **kwargs):
+                kwargs["transport"] = transport
+                _init(self, *args, **kwargs)
+
+            monkeypatch.setattr(client_class, "__init__", patched)
+
+    return install
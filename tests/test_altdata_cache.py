@@ -0,0 +1,69 @@
+import json
+import httpx
+from altscore import AltScore
+from altscore.altdata.model.cache import AltDataResultCache
+
+SOURCES = [{"sourceId": "CO-PUB-0001", "version": "v1"}, {"sourceId": "CO-PUB-0002", "version": "v1"}]
+
+
+def sync_response(payload):
+    return {
+        "requestId": "r1", "requestedAt": "2026-01-01T00:00:00", "inputs": {"personId": payload["personId"]},
+        "data": {s["sourceId"]: {"value": s["sourceId"]} for s in payload["sourcesConfig"]},
+        "sourceData": {},
+        "callSummary": [{"sourceId": s["sourceId"], "version": s["version"], "isSuccess": True}
+                        for s in payload["sourcesConfig"]],
+    }
+
+
+def recording_handler(requests):
+    def handler(request: httpx.Request):
+        payload = json.loads(request.content)
+        requests.append(payload)
+        return httpx.Response(200, json=sync_response(payload))
+
+    return handler
+
+
+def test_cached_sources_are_not_requested_again(mock_api):
+    requests = []
+    mock_api(recording_handler(requests))
+    altscore = AltScore(api_key="test", partner_id="partner")
+    altscore.altdata.requests.cache = AltDataResultCache()
+
+    first = altscore.altdata.requests.new_sync({"personId": "1"}, SOURCES)
+    second = altscore.altdata.requests.new_sync({"personId": " 1 "}, SOURCES)
+
+    assert len(requests) == 1
+    assert second.get_data("CO-PUB-0002") == first.get_data("CO-PUB-0002") == {"value": "CO-PUB-0002"}
+    assert [s.source_id for s in second.call_summary] == ["CO-PUB-0001", "CO-PUB-0002"]
+    assert altscore.altdata.requests.cache.metrics.hits == 2
+
+
+def test_only_missing_sources_are_requested(mock_api):
+    requests = []
+    mock_api(recording_handler(requests))
+    altscore = AltScore(api_key="test", partner_id="partner")
+    altscore.altdata.requests.cache = AltDataResultCache()
+
+    altscore.altdata.requests.new_sync({"personId": "1"}, SOURCES[:1])
+    result = altscore.altdata.requests.new_sync({"personId": "1"}, SOURCES)
+
+    assert [s["sourceId"] for s in requests[1]["sourcesConfig"]] == ["CO-PUB-0002"]
+    assert result.get_data("CO-PUB-0001") == {"value": "CO-PUB-0001"}
+    assert result.get_data("CO-PUB-0002") == {"value": "CO-PUB-0002"}
+
+
+def test_use_cache_false_and_expired_entries_request_again(mock_api):
+    requests = []
+    mock_api(recording_handler(requests))
+    altscore = AltScore(api_key="test", partner_id="partner")
+    altscore.altdata.requests.cache = AltDataResultCache(ttl_by_source={"CO-PUB-0002": -1})
+
+    altscore.altdata.requests.new_sync({"personId": "1"}, SOURCES)
+    altscore.altdata.requests.new_sync({"personId": "1"}, SOURCES, use_cache=False)
+    altscore.altdata.requests.new_sync({"personId": "1"}, SOURCES)
+
+    assert len(requests) == 3
+    assert [s["sourceId"] for s in requests[2]["sourcesConfig"]] == ["CO-PUB-0002"]
+    assert altscore.altdata.requests.cache.metrics.expired == 1
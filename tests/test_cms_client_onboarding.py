@@ -0,0 +1,80 @@
+import asyncio
+import json
+import httpx
+from altscore import AltScoreAsync
+
+
+class FakeOnboardingAPI:
+    """Borrower central and CMS endpoints used by the onboarding, for borrowers with an external id identity."""
+
+    def __init__(self, external_ids):
+        self.external_ids = external_ids
+        self.clients = {}
+        self.creates = 0
+        self.associations = []
+
+    async def __call__(self, request: httpx.Request):
+        path = request.url.path
+        if path.startswith("/v1/borrowers/") and "/cms-client-ids/" in path:
+            self.associations.append((path.split("/")[3], path.split("/")[5]))
+            return httpx.Response(204)
+        if path.startswith("/v1/borrowers/"):
+            return httpx.Response(200, json={"id": path.split("/")[3], "persona": "individual"})
+        if path == "/v1/identities":
+            borrower_id = request.url.params["borrower-id"]
+            return httpx.Response(200, json=[{"key": "external", "value": self.external_ids[borrower_id],
+                                              "priority": 1}])
+        if path in ("/v1/addresses", "/v1/points-of-contact"):
+            return httpx.Response(200, json=[])
+        if path == "/v2/clients" and request.method == "POST":
+            body = json.loads(request.content)
+            # leaves room for a concurrent onboarding of the same external id to look the client up
+            await asyncio.sleep(0.01)
+            self.creates += 1
+            client_id = f"client-{self.creates}"
+            self.clients[body["externalId"]] = {"clientId": client_id, "externalId": body["externalId"]}
+            return httpx.Response(201, json={"clientId": client_id})
+        if path.startswith("/v2/clients/") and request.method == "GET":
+            client = self.clients.get(path.split("/")[3])
+            return httpx.Response(200, json=client) if client is not None else httpx.Response(404, json={})
+        if path.startswith("/v2/clients/") and request.method == "PATCH":
+            return httpx.Response(200, json={})
+        return httpx.Response(404, json={})
+
+
+def onboard(altscore, borrower_ids, **kwargs):
+    async def run():
+        results = altscore.macros.new_cms_clients_from_borrowers(
+            borrower_ids, partner_id="partner", legal_name_identity_key=None, tax_id_identity_key=None,
+            external_id_identity_key="external", **kwargs
+        )
+        return {r.item: r.unwrap() async for r in results}
+
+    return asyncio.run(run())
+
+
+def test_borrowers_sharing_an_external_id_create_one_client(mock_api):
+    api = FakeOnboardingAPI({"b1": "E1", "b2": "E1", "b3": "E1", "b4": "E2"})
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+
+    results = onboard(altscore, ["b1", "b2", "b3", "b4"], concurrency=4)
+
+    assert api.creates == 2
+    assert sum(result["created"] for result in results.values()) == 2
+    assert len({results[b]["client_id"] for b in ("b1", "b2", "b3")}) == 1
+    assert results["b4"]["client_id"] != results["b1"]["client_id"]
+    assert sorted(api.associations) == sorted((b, results[b]["client_id"]) for b in results)
+
+
+def test_checkpointed_borrowers_are_skipped(mock_api, tmp_path):
+    api = FakeOnboardingAPI({"b1": "E1", "b2": "E2"})
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+    checkpoint_path = str(tmp_path / "onboarding.jsonl")
+
+    onboard(altscore, ["b1"], checkpoint_path=checkpoint_path)
+    results = onboard(altscore, ["b1", "b2"], checkpoint_path=checkpoint_path)
+
+    assert list(results) == ["b2"]
+    assert api.creates == 2
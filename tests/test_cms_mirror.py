@@ -0,0 +1,104 @@
+import asyncio
+import datetime as dt
+import httpx
+from altscore import AltScore, AltScoreAsync
+
+START = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def timestamp(minutes: float) -> str:
+    return (START + dt.timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakePaymentOrders:
+    """GET /v1/payment-orders with paging, x-total-count, a status filter and sorting by updatedAt."""
+
+    def __init__(self, count: int):
+        self.records = {}
+        self.requests = []
+        for i in range(count):
+            self.put(f"po-{i}", timestamp(i))
+
+    def put(self, record_id: str, updated_at: str, status: str = "pending"):
+        self.records[record_id] = {"payOrderId": record_id, "updatedAt": updated_at, "status": status,
+                                   "client": {"clientId": "c1"}}
+
+    def __call__(self, request: httpx.Request):
+        params = request.url.params
+        self.requests.append(dict(params))
+        records = [r for r in self.records.values() if "status" not in params or r["status"] == params["status"]]
+        if params.get("sort-by") == "updatedAt":
+            records.sort(key=lambda r: r["updatedAt"], reverse=params.get("sort-direction") == "desc")
+        page, per_page = int(params["page"]), int(params["per-page"])
+        return httpx.Response(200, json=records[(page - 1) * per_page:page * per_page],
+                              headers={"x-total-count": str(len(records))})
+
+
+def test_first_sync_is_full_and_later_ones_stop_at_the_watermark(mock_api, tmp_path):
+    api = FakePaymentOrders(25)
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    with altscore.cms.payment_orders.mirror(str(tmp_path / "mirror.db"), per_page=10, lookback_seconds=60) as mirror:
+        first = mirror.sync()
+        api.put("po-3", timestamp(30))
+        api.put("po-new", timestamp(31))
+        requests_before = len(api.requests)
+        second = mirror.sync()
+
+        assert first.full and len(first.inserted) == 25 and first.watermark == timestamp(24)
+        assert not second.full
+        assert len(api.requests) - requests_before == second.pages == 1
+        assert api.requests[-1]["sort-by"] == "updatedAt" and api.requests[-1]["sort-direction"] == "desc"
+        assert second.inserted == ["po-new"] and second.updated == ["po-3"]
+        assert second.watermark == timestamp(31)
+        assert {r["payOrderId"] for r in mirror.query(changed_since_sync=first.sync_id)} == {"po-3", "po-new"}
+        assert mirror.count() == 26
+        assert mirror.get("po-3")["updatedAt"] == timestamp(30)
+
+
+def test_records_updated_within_the_lookback_are_picked_up(mock_api, tmp_path):
+    api = FakePaymentOrders(25)
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    with altscore.cms.payment_orders.mirror(str(tmp_path / "mirror.db"), per_page=10, lookback_seconds=300) as mirror:
+        mirror.sync()
+        # committed by the server after the first sync had paged past its updatedAt
+        api.put("po-late", timestamp(22.5))
+        api.put("po-too-late", timestamp(10))
+        result = mirror.sync()
+
+    assert result.inserted == ["po-late"]
+    # records within the lookback that did not change are not written again
+    assert result.updated == []
+
+
+def test_each_filter_set_has_its_own_watermark(mock_api, tmp_path):
+    api = FakePaymentOrders(5)
+    api.put("po-paid", timestamp(2.5), status="paid")
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    with altscore.cms.payment_orders.mirror(str(tmp_path / "mirror.db")) as mirror:
+        assert mirror.sync(status="paid").full
+        assert mirror.sync().full
+        assert not mirror.sync(status="paid").full
+        assert [r["payOrderId"] for r in mirror.query(status="paid")] == ["po-paid"]
+
+
+def test_async_incremental_sync(mock_api, tmp_path):
+    api = FakePaymentOrders(25)
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+
+    async def run():
+        with altscore.cms.payment_orders.mirror(str(tmp_path / "mirror.db"), per_page=10) as mirror:
+            await mirror.sync()
+            api.put("po-7", timestamp(40))
+            return await mirror.sync()
+
+    result = asyncio.run(run())
+
+    assert not result.full and result.pages == 1
+    assert result.updated == ["po-7"] and result.inserted == []
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+import httpx
+import pytest
+from altscore import AltScore, AltScoreAsync
+from altscore.cms.model.reservations import (RESERVATION_COMMITTED, RESERVATION_EXPIRED, RESERVATION_RELEASED,
+                                             RESERVATION_RESERVED)
+
+PREFIX = "/v2/clients/c1/credit-accounts/dpa/reservations"
+
+
+class FakeReservations:
+    """Records the reservation requests; the first one waits for `release` when it is given."""
+
+    def __init__(self, release: threading.Event = None, statuses: dict = None):
+        self.requests = []
+        self.release = release
+        self.statuses = statuses or {}
+
+    def __call__(self, request: httpx.Request):
+        if self.release is not None and not self.requests:
+            self.release.wait(5)
+        body = json.loads(request.content) if request.content else None
+        path = request.url.path[len(PREFIX):] or "/"
+        self.requests.append((request.method, path, body))
+        return httpx.Response(self.statuses.get((request.method, path), 200), json={})
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_async_update_of_an_unsent_create_is_merged_into_it(mock_api):
+    api = FakeReservations()
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+
+    async def run():
+        async with altscore.cms.clients.reservation_manager() as reservations:
+            handle = reservations.reserve("c1", "dpa", {"sourceId": "o1", "amount": "10.00"})
+            reservations.update(handle, {"amount": "12.00"})
+            reservations.update(handle, {"amount": "15.00"})
+            await reservations.commit(handle)
+            return handle
+
+    handle = asyncio.run(run())
+
+    assert api.requests == [("POST", "/", {"sourceId": "o1", "amount": "15.00"}), ("PUT", "/o1/commit", None)]
+    assert handle.status == RESERVATION_COMMITTED
+
+
+def test_async_release_of_an_unsent_create_sends_nothing(mock_api):
+    api = FakeReservations()
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+
+    async def run():
+        async with altscore.cms.clients.reservation_manager() as reservations:
+            handle = reservations.reserve("c1", "dpa", {"sourceId": "o1", "amount": "10.00"})
+            await reservations.release(handle)
+            with pytest.raises(asyncio.CancelledError):
+                await handle.created
+            return handle
+
+    handle = asyncio.run(run())
+
+    assert api.requests == []
+    assert handle.status == RESERVATION_RELEASED
+
+
+def test_sync_consecutive_queued_updates_keep_the_last_one(mock_api):
+    release = threading.Event()
+    api = FakeReservations(release=release)
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    with altscore.cms.clients.reservation_manager(reap_interval=60) as reservations:
+        handle = reservations.reserve("c1", "dpa", {"sourceId": "o1", "amount": "10.00"})
+        # the create is in flight, the updates queue behind it
+        wait_until(lambda: handle._running and not handle._ops)
+        first = reservations.update(handle, {"amount": "12.00"})
+        second = reservations.update(handle, {"amount": "15.00"})
+        release.set()
+        assert first is second
+        second.result(5)
+        reservations.commit(handle).result(5)
+
+    assert api.requests == [("POST", "/", {"sourceId": "o1", "amount": "10.00"}),
+                            ("PUT", "/o1", {"amount": "15.00"}), ("PUT", "/o1/commit", None)]
+
+
+def test_expired_reservations_are_released(mock_api):
+    api = FakeReservations()
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    with altscore.cms.clients.reservation_manager(reap_interval=60) as reservations:
+        expiring = reservations.reserve("c1", "dpa", {"sourceId": "o1"}, ttl=0)
+        kept = reservations.reserve("c1", "dpa", {"sourceId": "o2"})
+        expiring.created.result(5)
+        kept.created.result(5)
+        assert reservations.expire() == [expiring]
+        wait_until(lambda: not expiring.is_outstanding)
+        assert reservations.outstanding() == [kept]
+        reservations.commit(kept).result(5)
+
+    assert expiring.status == RESERVATION_EXPIRED and kept.status == RESERVATION_COMMITTED
+    assert ("DELETE", "/o1", None) in api.requests
+    assert ("DELETE", "/o2", None) not in api.requests
+
+
+def test_close_releases_outstanding_reservations_and_retried_creates_count(mock_api):
+    api = FakeReservations(statuses={("POST", "/"): 409, ("DELETE", "/o1"): 404})
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    reservations = altscore.cms.clients.reservation_manager(reap_interval=60)
+    handle = reservations.reserve("c1", "dpa", {"sourceId": "o1"})
+    handle.created.result(5)
+    assert handle.status == RESERVATION_RESERVED
+    reservations.close()
+
+    assert handle.status == RESERVATION_RELEASED
+    assert api.requests[-1] == ("DELETE", "/o1", None)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from altscore.common.concurrency import bounded_map, bounded_map_async
+
+
+def test_ordered_bounded_map_stops_reading_behind_a_slow_item():
+    release = threading.Event()
+    pulled = []
+
+    def items():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    def fn(item):
+        if item == 0:
+            release.wait(5)
+        return item
+
+    results = bounded_map(fn, items(), concurrency=4, adaptive=False)
+    first = []
+    reader = threading.Thread(target=lambda: first.append(next(results).index))
+    reader.start()
+    reader.join(0.5)
+    assert len(pulled) <= 8
+    release.set()
+    reader.join(5)
+    assert first == [0]
+    assert [r.result for r in results] == list(range(1, 100))
+
+
+def test_ordered_bounded_map_async_stops_reading_behind_a_slow_item():
+    pulled = []
+
+    async def run():
+        release = asyncio.Event()
+
+        def items():
+            for i in range(100):
+                pulled.append(i)
+                yield i
+
+        async def fn(item):
+            if item == 0:
+                await release.wait()
+            return item
+
+        results = bounded_map_async(fn, items(), concurrency=4, adaptive=False)
+        first = asyncio.ensure_future(results.__anext__())
+        await asyncio.sleep(0.1)
+        assert len(pulled) <= 8
+        release.set()
+        assert (await first).index == 0
+        return [r.result async for r in results]
+
+    assert asyncio.run(run()) == list(range(1, 100))
@@ -0,0 +1,88 @@
+import glob
+import os
+import numpy as np
+import pytest
+from altscore.cms.model.business_calendar import BusinessCalendar
+from altscore.cms.model.dpa_simulation import (DPASimulator, DPATermsParams, conformance_report, load_recordings,
+                                               save_recordings)
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "dpa_simulations", "*.json")))
+
+
+def terms_dict(**overrides):
+    terms = {
+        "amortizationType": "french", "disbursementDate": "2026-01-15", "installments": 6,
+        "interest": {"amount": "0.00", "currency": "USD"}, "interestCalculateType": "simple",
+        "interestRate": {"period": 360, "rate": "0.36"}, "interestTax": 0.12,
+        "principal": {"amount": "1000.00", "currency": "USD"}, "repayEvery": 30,
+    }
+    terms.update(overrides)
+    return terms
+
+
+def request(amount, disbursement_date="2026-01-15", **terms):
+    return {"amount": {"amount": f"{amount:.2f}", "currency": "USD"}, "disbursementDate": disbursement_date,
+            "terms": terms_dict(**terms)}
+
+
+def simulator(calendar=None):
+    return DPASimulator(DPATermsParams("french", 6, 30, 0.36, 360, 0.12), calendars=calendar, currency="USD")
+
+
+@pytest.mark.parametrize("path", FIXTURES or [pytest.param(None, marks=pytest.mark.skip(
+    reason="no recordings, record them with samples/record_dpa_simulations.py"))])
+def test_recorded_simulations_conform(path):
+    recorded_simulator, recordings = load_recordings(path)
+    report = conformance_report(recorded_simulator, recordings)
+    assert report.is_conformant, report.mismatches
+
+
+def test_french_installments_are_equal_and_repay_the_amount():
+    result = simulator().simulate(amount=[1000, 2500.5], disbursement_date="2026-01-15")
+    totals = result.principal + result.interest
+    assert np.allclose(result.principal.sum(axis=1), [1000, 2500.5])
+    # every installment but the last, which absorbs the rounding, is the same up to a cent
+    assert np.all(np.abs(totals[:, :-1] - totals[:, :1]) < 0.011)
+    assert np.allclose(result.taxes, np.round(result.interest * 0.12, 2))
+    assert not result.fees.any()
+
+
+def test_due_dates_roll_to_the_next_business_day():
+    # 2026-02-14 is a Saturday and 2026-03-16 a holiday
+    result = simulator(BusinessCalendar("1111100", ["2026-03-16"])).simulate(1000, "2026-01-15")
+    assert [s["dueDate"] for s in result.schedule(0)][:2] == ["2026-02-16", "2026-03-17"]
+
+
+def test_unmodelled_amortization_types_raise():
+    with pytest.raises(ValueError):
+        DPATermsParams("german", 6, 30, 0.36, 360)
+
+
+def test_fees_raise_unless_ignored():
+    fees = [{"amount": {"amount": "5.00", "currency": "USD"}, "name": "opening", "calculationType": "fixed"}]
+    with pytest.raises(ValueError):
+        simulator().simulate_requests([request(1000, fees=fees)])
+    result = simulator().simulate_requests([request(1000, fees=fees)], ignore_fees=True)
+    assert not result.fees.any()
+
+
+def test_recordings_round_trip(tmp_path):
+    local = simulator(BusinessCalendar("1111100"))
+    requests = [request(1000), request(777.77, "2026-02-27", installments=3)]
+    schedules = local.simulate_requests(requests)
+    recordings = [{"request": r, "response": {"terms": r["terms"], "schedule": schedules.schedule(i)}}
+                  for i, r in enumerate(requests)]
+    save_recordings(str(tmp_path / "recordings.json"), local, recordings)
+    loaded_simulator, loaded = load_recordings(str(tmp_path / "recordings.json"))
+    assert conformance_report(loaded_simulator, loaded).is_conformant
+    loaded[0]["response"]["schedule"][0]["originalAmounts"]["interest"]["amount"] = "0.00"
+    report = conformance_report(loaded_simulator, loaded)
+    assert [(m["index"], [d["field"] for d in m["differences"]]) for m in report.mismatches] == [(0, ["interest"])]
+
+
+def test_each_request_uses_its_own_rate_period():
+    # 3% every 30 days on a simulator whose terms charge the rate every 360 days
+    monthly = request(1000, installments=1, interestRate={"period": 30, "rate": "0.03"}, interestTax=0)
+    result = simulator().simulate_requests([monthly, request(1000, installments=1, interestTax=0)])
+    assert result.interest[:, 0].tolist() == [30.0, 30.0]
+    assert result.inputs["rate_period"].tolist() == [30, 360]
@@ -0,0 +1,113 @@
+import asyncio
+import httpx
+from altscore import AltScore, AltScoreAsync
+from altscore.common.polling import PollStrategy
+
+FAST_POLLS = PollStrategy.fixed(0.001)
+
+
+class FakeBatchAPI:
+    """
+    An execution batch of five items that advances one step every time the batch is read: items 0
+    and 1 finish at the first read, 2 at the second and 3 and 4 at the third, when the batch completes.
+    The output of item 4 is only in the outputs package.
+    """
+
+    FINISHED_AT = {0: 1, 1: 1, 2: 2, 3: 3, 4: 3}
+
+    def __init__(self, batch_of_listed: str = "b1"):
+        self.reads = 0
+        self.batch_of_listed = batch_of_listed
+        self.output_reads = {}
+
+    def finished(self, index: int) -> bool:
+        return self.FINISHED_AT[index] <= self.reads
+
+    def execution(self, index: int):
+        return {"id": f"e{index}", "workflowId": "w1", "workflowAlias": "score", "workflowVersion": "v1",
+                "createdAt": f"2026-01-01T00:00:0{index}", "executionBatch": {"id": self.batch_of_listed,
+                                                                             "itemIndex": index}}
+
+    def __call__(self, request: httpx.Request):
+        path = request.url.path
+        if path == "/v1/execution-batches/b1":
+            self.reads += 1
+            done = [i for i in self.FINISHED_AT if self.finished(i)]
+            complete = len(done) == len(self.FINISHED_AT)
+            return httpx.Response(200, json={
+                "id": "b1", "status": "complete" if complete else "processing", "tags": [],
+                "createdAt": "2026-01-01T00:00:00",
+                "state": {"batchItemsExecutionsSummary": {"expected": 5, "pending": 5 - len(done),
+                                                          "success": len(done), "failed": 0},
+                          "batchItemsOutputsPackageId": "pkg" if complete else None},
+            })
+        if path == "/v1/executions":
+            assert request.url.params["execution-batch-id"] == "b1"
+            assert request.url.params["sort-direction"] == "desc"
+            return httpx.Response(200, json=[self.execution(i) for i in sorted(self.FINISHED_AT, reverse=True)])
+        if path.startswith("/v1/executions/"):
+            index = int(path.split("/")[3][1:])
+            if path.endswith("/input"):
+                return httpx.Response(200, json={"input": {"item": index}})
+            self.output_reads[index] = self.output_reads.get(index, 0) + 1
+            if index == 4 or not self.finished(index):
+                return httpx.Response(404, json={})
+            return httpx.Response(200, json={"isSuccess": True, "output": {"score": index}})
+        if path == "/v1/stores/packages/pkg":
+            return httpx.Response(200, json={"id": "pkg", "borrowerId": None, "label": None, "tags": [],
+                                             "createdAt": "2026-01-01T00:00:00", "hasAttachments": False})
+        if path == "/v1/stores/packages/pkg/content":
+            return httpx.Response(200, json=[{"itemIndex": i, "input": {"item": i}, "output": {"score": i},
+                                              "isSuccess": True} for i in self.FINISHED_AT])
+        return httpx.Response(404, json={})
+
+
+def test_outputs_are_yielded_once_as_items_finish(mock_api):
+    api = FakeBatchAPI()
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+    monitor = altscore.borrower_central.execution_batches.monitor("b1", poll_strategy=FAST_POLLS)
+
+    yielded_at = {item.item_index: api.reads for item in monitor.iter_outputs()}
+
+    # item 4 comes from the outputs package, after the batch is read once more for its package id
+    assert yielded_at == {0: 1, 1: 1, 2: 2, 3: 3, 4: 4}
+    # finished outputs are read once, the package only fills in what the executions did not give
+    assert api.output_reads[0] == 1 and api.output_reads[1] == 1
+    assert monitor.progress.is_finished and monitor.progress.eta == 0.0
+
+
+def test_outputs_come_from_the_package_when_executions_can_not_be_listed_by_batch(mock_api):
+    api = FakeBatchAPI(batch_of_listed="other")
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+    monitor = altscore.borrower_central.execution_batches.monitor("b1", poll_strategy=FAST_POLLS)
+
+    items = list(monitor.iter_outputs(parse=False))
+
+    assert [item["itemIndex"] for item in items] == [0, 1, 2, 3, 4]
+    assert api.output_reads == {}
+
+
+def test_watch_reports_progress_until_the_batch_finishes(mock_api):
+    mock_api(FakeBatchAPI())
+    altscore = AltScore(api_key="test", partner_id="partner")
+    monitor = altscore.borrower_central.execution_batches.monitor("b1", poll_strategy=FAST_POLLS)
+
+    progress = list(monitor.watch())
+
+    assert [p.done for p in progress] == [2, 3, 5]
+    assert [p.is_finished for p in progress] == [False, False, True]
+    assert progress[1].throughput > 0 and progress[1].eta is not None
+
+
+def test_async_outputs_are_yielded_once_as_items_finish(mock_api):
+    api = FakeBatchAPI()
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+
+    async def run():
+        monitor = altscore.borrower_central.execution_batches.monitor("b1", poll_strategy=FAST_POLLS)
+        return {item.item_index: api.reads async for item in monitor.iter_outputs()}
+
+    assert asyncio.run(run()) == {0: 1, 1: 1, 2: 2, 3: 3, 4: 4}
@@ -0,0 +1,84 @@
+import httpx
+import pytest
+from pydantic import ValidationError
+from altscore import AltScore
+from altscore.cms.model.common import Money
+from altscore.cms.model.debts import Client, DebtAPIDTO, Transaction
+from altscore.common.concurrency import bounded_map
+from altscore.common.fast_models import construct_model, fast_reads, fast_reads_enabled
+
+
+def money(amount: str):
+    return {"amount": amount, "currency": "USD", "display": f"$ {amount}"}
+
+
+def debt(debt_id: str = "d1"):
+    amounts = {k: money("10.00") for k in ("fees", "interest", "principal", "taxes", "total")}
+    return {
+        "debtId": debt_id, "flowId": "f1", "tenant": "tenant", "referenceId": "ref-1", "status": "open",
+        "subStatus": "current",
+        "client": {"clientId": "c1", "partnerId": "partner", "externalId": "ext-1", "email": "client@example.com",
+                   "legalName": "Client S.A."},
+        "balance": {**amounts, "penalties": money("0.00")},
+        "closingBalance": money("0.00"),
+        "schedule": [{"dueDate": f"2026-0{n}-15", "number": n, "originalAmounts": amounts} for n in (1, 2)],
+        "terms": {"amortizationType": "french", "disbursementDate": "2026-01-15", "installments": 2,
+                  "interest": money("20.00"), "interestCalculateType": "simple",
+                  "interestRate": {"period": 365, "rate": "0.24"}, "interestTax": 0.12,
+                  "principal": money("1000.00"), "repayEvery": 30},
+        "transactions": [{"transactionId": "tx-1", "breakdown": [amounts], "amount": money("100.00"),
+                          "type": "payment", "date": "2026-02-15", "referenceId": "pay-1"}],
+        "createdAt": "2026-01-15T00:00:00Z", "updatedAt": "2026-02-15T00:00:00Z", "version": "4",
+    }
+
+
+def test_construct_model_builds_the_same_nested_models_as_parse_obj():
+    data = debt()
+
+    constructed = construct_model(DebtAPIDTO, data)
+
+    assert isinstance(constructed.client, Client) and isinstance(constructed.closing_balance, Money)
+    assert isinstance(constructed.transactions[0], Transaction)
+    assert isinstance(constructed.transactions[0].breakdown[0].fees, Money)
+    # a number sent as a string is coerced like parse_obj does
+    assert constructed.version == 4
+    assert constructed.dict() == DebtAPIDTO.parse_obj(data).dict()
+
+
+def test_reads_skip_validation_only_inside_fast_reads(mock_api):
+    invalid = {k: v for k, v in debt().items() if k != "tenant"}
+    mock_api(lambda request: httpx.Response(200, json=invalid))
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    with pytest.raises(ValidationError):
+        altscore.cms.debts.retrieve("d1")
+    with altscore.cms.fast_reads():
+        retrieved = altscore.cms.debts.retrieve("d1")
+
+    assert isinstance(retrieved.data, DebtAPIDTO)
+    assert retrieved.data.id == "d1" and retrieved.data.tenant is None
+
+
+def test_fast_reads_apply_to_bounded_map_workers():
+    with fast_reads():
+        inside = [r.unwrap() for r in bounded_map(lambda _: fast_reads_enabled(), range(4), concurrency=2)]
+    outside = [r.unwrap() for r in bounded_map(lambda _: fast_reads_enabled(), range(4), concurrency=2)]
+
+    assert inside == [True] * 4
+    assert outside == [False] * 4
+
+
+def test_write_responses_are_still_validated_inside_fast_reads(mock_api):
+    # taxId is missing
+    client = {"clientId": "c1", "partnerId": "partner", "status": "enabled", "externalId": "ext-1",
+              "emailAddress": "client@example.com", "dba": "Client", "legalName": "Client S.A.", "address": "Street 1",
+              "createdAt": "2026-01-15T00:00:00Z"}
+    mock_api(lambda request: httpx.Response(200, json=client))
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    with altscore.cms.fast_reads():
+        retrieved = altscore.cms.clients.retrieve("c1")
+        with pytest.raises(ValidationError):
+            retrieved.enable()
+
+    assert retrieved.data.tax_id is None
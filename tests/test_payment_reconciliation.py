@@ -0,0 +1,125 @@
+import asyncio
+import json
+import httpx
+import pytest
+from altscore import AltScore, AltScoreAsync
+from altscore.cms.model import payment_reconciliation
+from altscore.cms.model.payment_reconciliation import (PAYMENT_ALREADY_APPLIED, PAYMENT_DUPLICATE_IN_FILE,
+                                                       PAYMENT_FAILED, PAYMENT_SKIPPED, PAYMENT_SUBMITTED)
+
+
+def payment(reference_id, debt_id="d1"):
+    return {"debtId": debt_id, "amount": "10.00", "currency": "USD", "referenceId": reference_id,
+            "paymentDate": "2026-01-15"}
+
+
+class FakeDebtPayments:
+    """Payments endpoint of the debts: `failures` 503 answers are sent after applying (or not) the payment."""
+
+    def __init__(self, failures=0, apply_failed=False):
+        self.failures = failures
+        self.apply_failed = apply_failed
+        self.applied = {}
+        self.posts = 0
+
+    def __call__(self, request: httpx.Request):
+        debt_id = request.url.path.split("/")[3]
+        payments = self.applied.setdefault(debt_id, [])
+        if request.method == "GET":
+            return httpx.Response(200, json=payments)
+        self.posts += 1
+        payload = json.loads(request.content)
+        if self.failures > 0:
+            self.failures -= 1
+            if self.apply_failed:
+                payments.append(payload)
+            return httpx.Response(503, json={})
+        payments.append(payload)
+        return httpx.Response(201, json={})
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(payment_reconciliation.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(payment_reconciliation.asyncio, "sleep", no_sleep)
+
+
+def statuses(report):
+    return [entry["status"] for entry in sorted(report.entries, key=lambda entry: entry["index"])]
+
+
+def test_payment_applied_before_a_failed_response_is_not_posted_again(mock_api):
+    api = FakeDebtPayments(failures=1, apply_failed=True)
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    report = altscore.cms.debts.submit_payments([payment("p1")])
+
+    assert statuses(report) == [PAYMENT_ALREADY_APPLIED]
+    assert api.posts == 1
+    assert len(api.applied["d1"]) == 1
+
+
+def test_payment_not_applied_after_a_failed_response_is_retried(mock_api):
+    api = FakeDebtPayments(failures=1)
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    report = altscore.cms.debts.submit_payments([payment("p1")])
+
+    assert statuses(report) == [PAYMENT_SUBMITTED]
+    assert api.posts == 2
+    assert len(api.applied["d1"]) == 1
+
+
+def test_conflict_is_reported_as_already_applied(mock_api):
+    mock_api(lambda request: httpx.Response(409, json={}))
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    report = altscore.cms.debts.submit_payments([payment("p1")])
+
+    assert statuses(report) == [PAYMENT_ALREADY_APPLIED]
+
+
+def test_payment_still_failing_is_checked_once_more_and_reported_failed(mock_api):
+    api = FakeDebtPayments(failures=10)
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    report = altscore.cms.debts.submit_payments([payment("p1")], max_retries=1)
+
+    assert statuses(report) == [PAYMENT_FAILED]
+    assert api.posts == 2
+    assert not report.is_success
+
+
+def test_repeated_and_checkpointed_keys_are_not_submitted(mock_api, tmp_path):
+    api = FakeDebtPayments()
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+    checkpoint_path = str(tmp_path / "payments.jsonl")
+
+    first = altscore.cms.debts.submit_payments([payment("p1"), payment("p1")], concurrency=1,
+                                               checkpoint_path=checkpoint_path)
+    second = altscore.cms.debts.submit_payments([payment("p1"), payment("p2")], checkpoint_path=checkpoint_path)
+
+    assert statuses(first) == [PAYMENT_SUBMITTED, PAYMENT_DUPLICATE_IN_FILE]
+    assert statuses(second) == [PAYMENT_SKIPPED, PAYMENT_SUBMITTED]
+    assert [p["referenceId"] for p in api.applied["d1"]] == ["p1", "p2"]
+
+
+def test_async_payment_applied_before_a_failed_response_is_not_posted_again(mock_api, tmp_path):
+    api = FakeDebtPayments(failures=1, apply_failed=True)
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+    csv_path = tmp_path / "payments.csv"
+    csv_path.write_text("debtId,amount,currency,referenceId\nd1,10.00,USD,p1\nd1,5.00,USD,p2\n")
+
+    report = asyncio.run(altscore.cms.debts.submit_payments(str(csv_path)))
+
+    assert statuses(report) == [PAYMENT_ALREADY_APPLIED, PAYMENT_SUBMITTED]
+    assert api.posts == 2
+    assert [p["referenceId"] for p in api.applied["d1"]] == ["p1", "p2"]
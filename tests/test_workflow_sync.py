@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import httpx
+from altscore import AltScore, AltScoreAsync
+from altscore.borrower_central.model.workflows_v2 import (WORKFLOW_SYNC_EXISTS, WORKFLOW_SYNC_INVALID,
+                                                          WORKFLOW_SYNC_PUBLISH_FAILED, WORKFLOW_SYNC_PUBLISHED,
+                                                          WORKFLOW_SYNC_UNCHANGED, WORKFLOW_SYNC_VALID)
+
+PREFIX = "/v2/workflows"
+
+
+def bundle(label: str, code: str, env: str = "dev", status: str = None):
+    """An exported bundle whose ids are the ones assigned by `env`."""
+    workflow = {"id": f"{env}-{label}", "label": label, "alias": label.lower(),
+                "nodes": [{"id": f"{env}-start", "next": f"{env}-task"},
+                          {"id": f"{env}-task", "taskId": f"{env}-t1", "next": f"{env}-end"},
+                          {"id": f"{env}-end"}]}
+    if status is not None:
+        workflow["status"] = status
+    return {"workflow": workflow, "tasks": {f"{env}-t1": {"id": f"{env}-t1", "code": code}}}
+
+
+class FakeWorkflowsAPI:
+    """Workflows V2 of an environment holding `workflows` (label to code) published under the id `prod-<label>`."""
+
+    def __init__(self, workflows=None, failing_publishes=(), barrier: threading.Barrier = None):
+        self.workflows = {f"prod-{label}": (label, code, "ACTIVE") for label, code in (workflows or {}).items()}
+        self.failing_publishes = set(failing_publishes)
+        self.barrier = barrier
+        self.calls = []
+
+    def __call__(self, request: httpx.Request):
+        path = request.url.path[len(PREFIX):]
+        body = json.loads(request.content) if request.content else None
+        if path == "/validate":
+            self.calls.append(("validate", body["workflow"]["label"]))
+            if self.barrier is not None:
+                # every validation waits for the others, sequential calls break the barrier
+                self.barrier.wait()
+            if "BROKEN" in json.dumps(body.get("tasks")):
+                return httpx.Response(200, json={"valid": False, "findings": [{"code": "SYNTAX"}]})
+            return httpx.Response(200, json={"valid": True, "findings": []})
+        if path == "/import":
+            label = body["workflowData"]["workflow"]["label"]
+            self.calls.append(("import", label))
+            if any(existing == label for existing, _, _ in self.workflows.values()):
+                return httpx.Response(409, json={"code": "ALIAS_EXISTS"})
+            workflow_id = f"prod-{label}"
+            self.workflows[workflow_id] = (label, body["workflowData"]["tasks"]["dev-t1"]["code"], "DRAFT")
+            return httpx.Response(201, json={"id": workflow_id})
+        workflow_id, action = path.split("/")[1:]
+        self.calls.append((action, workflow_id))
+        if action == "export":
+            label, code, status = self.workflows[workflow_id]
+            return httpx.Response(200, json=bundle(label, code, env="prod", status=status))
+        if workflow_id in self.failing_publishes:
+            self.failing_publishes.discard(workflow_id)
+            return httpx.Response(423, json={"code": "ALIAS_LOCKED"})
+        label, code, _ = self.workflows[workflow_id]
+        self.workflows[workflow_id] = (label, code, "ACTIVE")
+        return httpx.Response(200, json={"id": workflow_id})
+
+    def count(self, action: str) -> int:
+        return sum(1 for call in self.calls if call[0] == action)
+
+
+def test_unchanged_workflows_are_skipped_and_new_ones_published(mock_api):
+    api = FakeWorkflowsAPI({"Same": "score = 1", "Changed": "score = 1"})
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+    bundles = [bundle("Same", "score = 1"), bundle("Changed", "score = 2"), bundle("New", "score = 3"),
+               bundle("Broken", "BROKEN")]
+
+    results = altscore.borrower_central.workflows_v2.sync_workflows(
+        bundles, workflow_ids={"Same": "prod-Same", "Changed": "prod-Changed"}
+    )
+
+    # the ids of the development environment do not make the bundles differ
+    assert [r.status for r in results] == [WORKFLOW_SYNC_UNCHANGED, WORKFLOW_SYNC_EXISTS, WORKFLOW_SYNC_PUBLISHED,
+                                           WORKFLOW_SYNC_INVALID]
+    assert results[2].workflow_id == "prod-New" and api.workflows["prod-New"][2] == "ACTIVE"
+    assert results[3].findings == [{"code": "SYNTAX"}]
+    assert ("validate", "Same") not in api.calls
+    assert api.count("import") == 2 and api.count("publish") == 1
+
+
+def test_validations_run_concurrently(mock_api):
+    api = FakeWorkflowsAPI(barrier=threading.Barrier(4, timeout=5))
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+
+    results = altscore.borrower_central.workflows_v2.sync_workflows(
+        [bundle(f"W{i}", f"score = {i}") for i in range(4)], concurrency=4, dry_run=True
+    )
+
+    assert [r.status for r in results] == [WORKFLOW_SYNC_VALID] * 4
+    assert api.count("validate") == 4 and api.count("import") == 0
+
+
+def test_a_failed_publish_is_retried_by_the_next_sync_without_importing_again(mock_api):
+    api = FakeWorkflowsAPI(failing_publishes={"prod-New"})
+    mock_api(api)
+    altscore = AltScore(api_key="test", partner_id="partner")
+    bundles = [bundle("New", "score = 3")]
+
+    first = altscore.borrower_central.workflows_v2.sync_workflows(bundles)
+    second = altscore.borrower_central.workflows_v2.sync_workflows(bundles, workflow_ids={"New": first[0].workflow_id})
+
+    assert first[0].status == WORKFLOW_SYNC_PUBLISH_FAILED and not first[0].is_success
+    assert second[0].status == WORKFLOW_SYNC_PUBLISHED
+    assert api.count("import") == 1 and api.count("validate") == 1
+    assert api.workflows["prod-New"][2] == "ACTIVE"
+
+
+def test_async_sync_reads_bundles_from_a_directory(mock_api, tmp_path):
+    api = FakeWorkflowsAPI({"Same": "score = 1"})
+    mock_api(api)
+    altscore = AltScoreAsync(api_key="test", partner_id="partner")
+    for name, exported in (("a.json", bundle("Same", "score = 1")), ("b.json", bundle("New", "score = 2"))):
+        (tmp_path / name).write_text(json.dumps(exported))
+
+    results = asyncio.run(altscore.borrower_central.workflows_v2.sync_workflows(
+        str(tmp_path), workflow_ids={"Same": "prod-Same"}
+    ))
+
+    assert [(r.label, r.status) for r in results] == [("Same", WORKFLOW_SYNC_UNCHANGED),
+                                                      ("New", WORKFLOW_SYNC_PUBLISHED)]